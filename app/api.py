@@ -0,0 +1,198 @@
+"""Plain HTTP endpoints served next to the Reflex backend.
+
+The Starlette app here is passed to ``rx.App(api_transformer=...)``, so its
+routes are answered by the same backend process that serves the websocket.
+Exports read the saved data files rather than session state: CSV is streamed
+in chunks, and prepared export artifacts are served from the export cache.
+``/metrics`` reports storage, import, export and event loop metrics for
+scraping by Prometheus, and ``/diagnostics/...`` reports the memory used by
+a session's state and, while tracing, where new memory was allocated; those
+routes exist only when ``memory.diagnostics_enabled()``.
+"""
+
+import os
+import re
+import time
+
+from reflex.config import get_config
+from reflex.utils.prerequisites import get_and_validate_app
+from starlette.applications import Starlette
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import (
+    FileResponse,
+    JSONResponse,
+    PlainTextResponse,
+    StreamingResponse,
+)
+from starlette.routing import Route
+
+from app import memory, metrics
+from app.export_jobs import (
+    ARCHIVE_FORMATS,
+    CSV_EXPORTS,
+    ExportJob,
+    artifact_path,
+    csv_filename,
+    download_filename,
+    ledger_view,
+    load_export_data,
+)
+from app.ledger import iter_csv_chunks
+from app.storage import StorageError
+
+_ARTIFACT_KEY = re.compile(r"^[0-9a-f]{32}$")
+
+
+def artifact_url(key: str) -> str:
+    """Backend URL that downloads the export artifact stored under ``key``."""
+    return f"{get_config().api_url}/export/artifacts/{key}"
+
+
+async def export_csv(request: Request):
+    """Streams the filtered, sorted view of a ledger as a CSV download.
+
+    Query parameters use the state var names (``search_query``,
+    ``filter_type``, ``sort_by``, ...), so the view matches the page.
+    """
+    start = time.perf_counter()
+    ledger = request.path_params["ledger"]
+    if ledger not in CSV_EXPORTS:
+        return PlainTextResponse("Unknown ledger", status_code=404)
+    data_file, kind_field, _, _, _, columns, _ = CSV_EXPORTS[ledger]
+    try:
+        data, _ = await run_in_threadpool(
+            load_export_data, data_file, kind_field, request.query_params
+        )
+    except (OSError, StorageError, ValueError) as e:
+        return PlainTextResponse(f"Could not read {data_file}: {e}", status_code=503)
+    rows = data["transactions"].rows(ledger_view(ledger, data, request.query_params))
+    filename = download_filename(csv_filename(ledger))
+    return StreamingResponse(
+        _timed_stream(iter_csv_chunks(rows, columns), ledger, start),
+        media_type="text/csv; charset=utf-8",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+def _timed_stream(chunks, ledger: str, start: float):
+    """Passes ``chunks`` through, recording the export time once all are sent."""
+    yield from chunks
+    metrics.EXPORT_SECONDS.observe(time.perf_counter() - start, ledger=ledger, format="csv")
+
+
+def _artifact_response(key: str):
+    path = artifact_path(key) if _ARTIFACT_KEY.match(key) else None
+    if path is None:
+        return PlainTextResponse("Export not found or expired", status_code=404)
+    media_type = "text/csv" if path.endswith(".csv") else "application/zip"
+    return FileResponse(
+        path, media_type=media_type, filename=download_filename(os.path.basename(path))
+    )
+
+
+async def export_archive(request: Request):
+    """Sends the whole ledger as a zip of typed Parquet or Arrow files."""
+    fmt = request.query_params.get("format", "parquet")
+    if fmt not in ARCHIVE_FORMATS:
+        return PlainTextResponse(f"Unsupported format: {fmt}", status_code=400)
+    try:
+        key = await run_in_threadpool(ExportJob("all", fmt).build)
+    except (StorageError, ValueError) as e:
+        return PlainTextResponse(f"Could not export ledger: {e}", status_code=503)
+    return _artifact_response(key)
+
+
+async def download_artifact(request: Request):
+    """Serves a finished export artifact from the cache."""
+    return _artifact_response(request.path_params["key"])
+
+
+async def metrics_endpoint(_request: Request):
+    """Current metrics in the Prometheus text exposition format."""
+    return PlainTextResponse(
+        metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
+def _int_param(request: Request, name: str, default: int) -> int:
+    value = request.query_params.get(name, str(default))
+    if not value.isdigit():
+        raise ValueError(f"{name} must be a positive integer")
+    return int(value)
+
+
+async def session_memory(request: Request):
+    """Approximate memory and serialized size of one session's state vars.
+
+    Without ``session`` (a token from this list) it lists the sessions;
+    ``top`` limits the vars listed (default 20). Sizing runs in a thread so
+    the websocket keeps being served.
+    """
+    try:
+        top = _int_param(request, "top", 20)
+    except ValueError as e:
+        return PlainTextResponse(str(e), status_code=400)
+    states = getattr(get_and_validate_app().app.state_manager, "states", None)
+    if states is None:
+        return PlainTextResponse(
+            "Sessions are not held in this process by the state manager.",
+            status_code=501,
+        )
+    token = request.query_params.get("session", "")
+    if not token:
+        return JSONResponse({"sessions": memory.session_tokens(states)})
+    try:
+        report = await run_in_threadpool(memory.session_report, states, token, top)
+    except RuntimeError:
+        # The session's state changed while it was being walked.
+        return PlainTextResponse("The session changed; try again.", status_code=409)
+    if report is None:
+        return PlainTextResponse("Unknown session", status_code=404)
+    return JSONResponse(report)
+
+
+async def start_tracing(_request: Request):
+    memory.start_tracing()
+    return PlainTextResponse("Tracing allocations.")
+
+
+async def stop_tracing(_request: Request):
+    memory.stop_tracing()
+    return PlainTextResponse("Stopped tracing allocations.")
+
+
+async def allocation_diff(request: Request):
+    """Allocation growth by line since tracing started or the previous call.
+
+    ``limit`` is the number of lines listed (default 25).
+    """
+    try:
+        limit = _int_param(request, "limit", 25)
+    except ValueError as e:
+        return PlainTextResponse(str(e), status_code=400)
+    if not memory.is_tracing():
+        return PlainTextResponse(
+            "Not tracing; POST /diagnostics/tracemalloc/start first.", status_code=409
+        )
+    return JSONResponse({"allocations": memory.allocation_diff(limit)})
+
+
+api = Starlette(
+    routes=[
+        Route("/export/ledger.zip", export_archive),
+        Route("/export/artifacts/{key}", download_artifact),
+        Route("/export/{ledger}.csv", export_csv),
+        Route("/metrics", metrics_endpoint),
+        *(
+            [
+                Route("/diagnostics/memory", session_memory),
+                Route("/diagnostics/tracemalloc", allocation_diff),
+                Route("/diagnostics/tracemalloc/start", start_tracing, methods=["POST"]),
+                Route("/diagnostics/tracemalloc/stop", stop_tracing, methods=["POST"]),
+            ]
+            if memory.diagnostics_enabled()
+            else []
+        ),
+    ]
+)
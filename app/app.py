@@ -1,8 +1,15 @@
 import reflex as rx
+from app.api import api
+from app.metrics import watch_event_loop
+from app.snapshots import snapshot_loop
+from app.warmup import warm_up
 from app.components.sidebar import sidebar
 from app.components.transaction_list import transaction_list
 from app.components.transaction_form import transaction_form_modal
 from app.components.import_modal import import_modal
+from app.components.export_panel import export_panel
+from app.components.undo_banner import undo_banner
+from app.states.transaction_state import TransactionState
 from app.pages.analytics import analytics_page
 from app.pages.settings import settings_page
 
@@ -26,6 +33,8 @@ def index() -> rx.Component:
         ),
         transaction_form_modal(),
         import_modal(),
+        export_panel(),
+        undo_banner(TransactionState),
         rx.window_event_listener(
             on_key_down=rx.call_script("""
                 if (event.ctrlKey || event.metaKey) {
@@ -50,12 +59,20 @@ app = rx.App(
         "/styles.css",
         "https://fonts.googleapis.com/css2?family=Heebo:wght@400;500;600;700&family=Inter:wght@400;500;600;700&display=swap",
     ],
+    api_transformer=api,
 )
-from app.states.transaction_state import TransactionState
+app.register_lifespan_task(watch_event_loop)
+app.register_lifespan_task(warm_up)
+app.register_lifespan_task(snapshot_loop)
 
 app.add_page(index, on_load=TransactionState.on_load)
 app.add_page(analytics_page, route="/analytics", on_load=TransactionState.on_load)
-app.add_page(settings_page, route="/settings", on_load=TransactionState.on_load)
+from app.states.diagnostics_state import DiagnosticsState
+app.add_page(
+    settings_page,
+    route="/settings",
+    on_load=[TransactionState.on_load, DiagnosticsState.refresh_profile],
+)
 
 from app.pages.business_expenses import business_expenses_page
 from app.states.business_expense_state import BusinessExpenseState
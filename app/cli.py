@@ -0,0 +1,330 @@
+"""Command-line access to the ledger without starting the Reflex server.
+
+Reads and writes the same data files as the app, through the same locked,
+versioned storage, so it is safe to run from cron while the server is up.
+Run it from the project root::
+
+    python -m app.cli totals
+    python -m app.cli due
+    python -m app.cli monthly --year 2024
+    python -m app.cli duplicates
+    python -m app.cli ingest statement.csv --dry-run
+    python -m app.cli --business ingest expenses.json
+    python -m app.cli migrate
+    python -m app.cli snapshot
+
+Only reflex-free modules are imported so the tool starts quickly.
+"""
+
+import argparse
+import json
+import os
+import sys
+
+from app import oplog, periods
+from app.importers import (
+    IMPORT_KINDS,
+    DuplicateIndex,
+    discard_spool,
+    format_for_filename,
+    iter_accepted_batches,
+    merge_staged_files,
+    stage_import_file,
+)
+from app.ledger import (
+    duplicate_groups,
+    load_ledger,
+    maaser_summary,
+    monthly_totals,
+    save_ledger,
+)
+from app.money import from_cents
+from app.records import date_ordinal
+from app.segments import with_segments
+from app.snapshots import run_maintenance
+from app.storage import (
+    BUSINESS_DATA_FILE,
+    BUSINESS_OPLOG_FILE,
+    TRANSACTION_DATA_FILE,
+    TRANSACTION_OPLOG_FILE,
+    StorageError,
+)
+
+
+def _data_file(args) -> str:
+    name = BUSINESS_DATA_FILE if args.business else TRANSACTION_DATA_FILE
+    return os.path.join(args.data_dir, name)
+
+
+def _oplog_file(args) -> str:
+    name = BUSINESS_OPLOG_FILE if args.business else TRANSACTION_OPLOG_FILE
+    return os.path.join(args.data_dir, name)
+
+
+def _kind_field(args) -> str:
+    return "status" if args.business else "type"
+
+
+def _load(args) -> tuple[dict, int]:
+    """The ledger for reports, archived years included."""
+    path = _data_file(args)
+    data, version = load_ledger(path, _kind_field(args))
+    return with_segments(data, path, data.get("archive", [])), version
+
+
+def _print(args, value, lines: list[str]):
+    if args.json:
+        print(json.dumps(value, indent=2))
+    else:
+        print("\n".join(lines))
+
+
+def cmd_totals(args) -> int:
+    data, _ = _load(args)
+    transactions = data["transactions"]
+    if args.business:
+        totals = {
+            status: from_cents(transactions.sum_cents(status))
+            for status in ("pending", "reimbursed")
+        }
+        _print(args, totals, [f"{k:<12}{v:>14,.2f}" for k, v in totals.items()])
+        return 0
+    summary = maaser_summary(transactions)
+    _print(
+        args,
+        summary,
+        [
+            f"{'Income':<12}{summary['income']:>14,.2f}",
+            f"{'Maaser':<12}{summary['maaser']:>14,.2f}",
+            f"{'Due':<12}{summary['due']:>14,.2f}",
+            f"{'Given':<12}{summary['percentage']:>13.1f}%",
+        ],
+    )
+    return 0
+
+
+def cmd_due(args) -> int:
+    data, _ = _load(args)
+    due = maaser_summary(data["transactions"])["due"]
+    _print(args, due, [f"{due:.2f}"])
+    return 0
+
+
+def cmd_monthly(args) -> int:
+    data, _ = _load(args)
+    months = monthly_totals(data["transactions"])
+    if args.year:
+        months = [m for m in months if m["month"].startswith(f"{args.year}-")]
+    columns = ["pending", "reimbursed"] if args.business else ["income", "maaser"]
+    lines = [f"{'Month':<10}" + "".join(f"{c.title():>14}" for c in columns)]
+    for m in months:
+        lines.append(
+            f"{m['month']:<10}" + "".join(f"{m.get(c, 0.0):>14,.2f}" for c in columns)
+        )
+    _print(args, months, lines)
+    return 0
+
+
+def cmd_duplicates(args) -> int:
+    data, _ = _load(args)
+    ledger = data["transactions"]
+    if args.business:
+        positions = duplicate_groups(ledger, match_memo=True)
+    else:
+        positions = duplicate_groups(
+            ledger, set(data.get("verified_transactions", []))
+        )
+    groups = [list(ledger.rows(group)) for group in positions]
+    lines = []
+    for group in groups:
+        lines.extend(
+            f"{t['date']}  {t['amount']:>12,.2f}  {t['id']}  {t['memo']}"
+            for t in group
+        )
+        lines.append("")
+    lines.append(f"{len(groups)} group(s) of potential duplicates")
+    _print(args, groups, lines)
+    return 1 if groups and args.fail_on_duplicates else 0
+
+
+def cmd_ingest(args) -> int:
+    kind = "business" if args.business else "transaction"
+    group_by = IMPORT_KINDS[kind][1]
+    data_file = _data_file(args)
+    csv_columns = {
+        field: column
+        for field, column in (
+            ("date", args.csv_date),
+            ("amount", args.csv_amount),
+            ("memo", args.csv_memo),
+            (group_by, args.csv_kind),
+        )
+        if column
+    }
+    data, version = load_ledger(data_file, group_by)
+    results = [
+        stage_import_file(path, format_for_filename(path), kind, csv_columns)
+        for path in args.files
+    ]
+    stage = merge_staged_files(
+        results, group_by, DuplicateIndex(data["transactions"].rows(), group_by)
+    )
+    errors = [
+        f"{path}: {result['error']}"
+        for path, result in zip(args.files, results)
+        if result["error"]
+    ]
+    skip_matches = {"exact"} if not args.keep_exact else set()
+    if args.skip_near:
+        skip_matches.add("near")
+    try:
+        accepted = []
+        for batch in iter_accepted_batches(stage.spool.path, skip_matches):
+            accepted.extend(batch)
+    finally:
+        discard_spool(stage.spool.path)
+    # As in the app, rows dated in a closed period are not imported.
+    through = periods.closed_ordinal(data.get("closed_periods", []))
+    open_rows = [row for row in accepted if date_ordinal(row["date"]) > through]
+    closed = len(accepted) - len(open_rows)
+    accepted = open_rows
+    report = {
+        "staged": stage.spool.count,
+        "new": stage.match_counts["new"],
+        "exact": stage.match_counts["exact"],
+        "near": stage.match_counts["near"],
+        "invalid": dict(stage.invalid_reasons),
+        "errors": errors,
+        "closed": closed,
+        "imported": len(accepted),
+    }
+    if accepted and not args.dry_run:
+        ledger = data["transactions"]
+        start = len(ledger)
+        ledger.extend(accepted)
+        run_maintenance(args.data_dir)
+        save_ledger(data_file, data, version)
+        # Logged like an import in the app, so it can be undone there.
+        oplog.get_log(_oplog_file(args)).record(
+            "import",
+            "Expenses imported" if args.business else "Transactions imported",
+            f"{len(accepted):,} rows",
+            [oplog.inserted([ledger.stored_row(i) for i in range(start, len(ledger))])],
+        )
+    lines = [
+        f"Staged {report['staged']} rows: {report['new']} new, "
+        f"{report['exact']} exact and {report['near']} near duplicates",
+        *(f"Rejected {n}: {reason}" for reason, n in report["invalid"].items()),
+        *errors,
+        *([f"Skipped {closed} dated in a closed period"] if closed else []),
+        f"Dry run: would import {report['imported']} rows; nothing saved"
+        if args.dry_run
+        else f"Imported {report['imported']} rows into {data_file}",
+    ]
+    _print(args, report, lines)
+    return 1 if errors else 0
+
+
+def cmd_migrate(args) -> int:
+    """Rewrites the ledger with integer-cent amounts."""
+    data_file = _data_file(args)
+    if not os.path.exists(data_file):
+        print(f"{data_file} does not exist")
+        return 0
+    data, version = load_ledger(data_file, _kind_field(args))
+    run_maintenance(args.data_dir)
+    new_version = save_ledger(data_file, data, version)
+    _print(
+        args,
+        {"file": data_file, "rows": len(data["transactions"]), "version": new_version},
+        [f"Rewrote {len(data['transactions'])} rows in {data_file}"],
+    )
+    return 0
+
+
+def cmd_snapshot(args) -> int:
+    """Snapshots the changed data files, prunes old snapshots and compacts the undo logs."""
+    result = run_maintenance(args.data_dir)
+    lines = [f"Wrote {name}" for name in result["written"]]
+    lines += [f"Deleted {name}" for name in result["deleted"]]
+    _print(args, result, lines or ["Snapshots are up to date"])
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog="python -m app.cli", description="Maaser tracker ledger tools."
+    )
+    parser.add_argument(
+        "--data-dir", default=".", help="Directory holding the data files."
+    )
+    parser.add_argument(
+        "--business", action="store_true", help="Use the business expense ledger."
+    )
+    parser.add_argument("--json", action="store_true", help="Print JSON output.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("totals", help="Show ledger totals.").set_defaults(
+        func=cmd_totals
+    )
+    commands.add_parser("due", help="Print the maaser due.").set_defaults(func=cmd_due)
+
+    monthly = commands.add_parser("monthly", help="Show totals per month.")
+    monthly.add_argument("--year", type=int, help="Only show this year.")
+    monthly.set_defaults(func=cmd_monthly)
+
+    duplicates = commands.add_parser(
+        "duplicates", help="Report potential duplicate transactions."
+    )
+    duplicates.add_argument(
+        "--fail-on-duplicates",
+        action="store_true",
+        help="Exit with status 1 when duplicates are found.",
+    )
+    duplicates.set_defaults(func=cmd_duplicates)
+
+    ingest = commands.add_parser(
+        "ingest", help="Import JSON, CSV, OFX or QIF files into the ledger."
+    )
+    ingest.add_argument("files", nargs="+")
+    ingest.add_argument(
+        "--dry-run", action="store_true", help="Report without saving."
+    )
+    ingest.add_argument(
+        "--keep-exact", action="store_true", help="Import exact duplicates too."
+    )
+    ingest.add_argument(
+        "--skip-near", action="store_true", help="Skip near duplicates."
+    )
+    ingest.add_argument("--csv-date", help="CSV column holding the date.")
+    ingest.add_argument("--csv-amount", help="CSV column holding the amount.")
+    ingest.add_argument("--csv-memo", help="CSV column holding the memo.")
+    ingest.add_argument(
+        "--csv-kind", help="CSV column holding the type (or status with --business)."
+    )
+    ingest.set_defaults(func=cmd_ingest)
+
+    commands.add_parser(
+        "migrate", help="Rewrite the data file with integer-cent amounts."
+    ).set_defaults(func=cmd_migrate)
+
+    commands.add_parser(
+        "snapshot",
+        help="Snapshot the data files now, as the server does in the background.",
+    ).set_defaults(func=cmd_snapshot)
+    return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+    args = build_parser().parse_args(argv)
+    try:
+        return args.func(args)
+    except BrokenPipeError:  # Output piped into e.g. ``head``.
+        return 0
+    except (StorageError, OSError, ValueError) as e:
+        print(f"Error: {e}", file=sys.stderr)
+        return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
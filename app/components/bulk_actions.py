@@ -0,0 +1,89 @@
+import reflex as rx
+
+_BUTTON_CLASS = "flex items-center px-3 py-1.5 text-sm font-semibold text-[#D8DEE9] bg-[#3B4252] border border-[#434C5E] rounded-lg hover:bg-[#434C5E] hover:border-[#88C0D0]/50 transition-all"
+_FIELD_CLASS = "px-3 py-1.5 text-sm rounded-lg border border-[#434C5E] bg-[#3B4252] text-[#ECEFF4] focus:outline-none focus:border-[#88C0D0] transition-colors"
+
+
+def selection_checkbox(transaction, state_class) -> rx.Component:
+    """Checkbox adding a row to (or removing it from) the selection."""
+    return rx.el.input(
+        type="checkbox",
+        checked=rx.cond(state_class.selected_lookup[transaction["id"].to(str)], True, False),
+        on_change=lambda _: state_class.toggle_selected(transaction["id"]),
+        class_name="w-4 h-4 rounded border-[#4C566A] bg-[#3B4252] accent-[#88C0D0] cursor-pointer",
+        custom_attrs={"aria-label": "Select"},
+    )
+
+
+def bulk_action_button(icon: str, label: str, on_click, danger: bool = False) -> rx.Component:
+    return rx.el.button(
+        rx.icon(icon, class_name="w-4 h-4 mr-1.5"),
+        label,
+        on_click=on_click,
+        class_name=_BUTTON_CLASS
+        + (" hover:text-[#BF616A] hover:border-[#BF616A]/50" if danger else ""),
+    )
+
+
+def bulk_action_bar(state_class, *actions: rx.Component) -> rx.Component:
+    """Batch actions for the selected rows, each saved and undone as one change.
+
+    ``actions`` are the buttons specific to the list, shown before the
+    account, memo and delete actions that every list has.
+    """
+    return rx.el.div(
+        rx.el.div(
+            rx.el.span(
+                state_class.selected_count.to_string() + " selected",
+                class_name="text-sm font-bold text-[#88C0D0] mr-2",
+            ),
+            *actions,
+            rx.el.select(
+                rx.el.option("Move to account…", value="", disabled=True),
+                rx.el.option("Cash", value="cash"),
+                rx.foreach(
+                    state_class.accounts,
+                    lambda acc: rx.el.option(acc["name"], value=acc["id"]),
+                ),
+                value="",
+                on_change=state_class.set_selected_account,
+                class_name=_FIELD_CLASS,
+            ),
+            rx.el.div(
+                rx.el.input(
+                    placeholder="New memo",
+                    value=state_class.batch_memo,
+                    on_change=state_class.set_batch_memo,
+                    class_name=_FIELD_CLASS + " w-40",
+                ),
+                rx.el.button(
+                    "Set memo",
+                    on_click=state_class.apply_batch_memo,
+                    disabled=state_class.batch_memo == "",
+                    class_name=_BUTTON_CLASS + " disabled:opacity-40",
+                ),
+                class_name="flex items-center gap-2",
+            ),
+            bulk_action_button("trash-2", "Delete", state_class.delete_selected, danger=True),
+            class_name="flex flex-wrap items-center gap-2",
+        ),
+        rx.el.div(
+            rx.el.button(
+                "Select all shown",
+                on_click=state_class.select_visible,
+                class_name="text-sm font-medium text-[#81A1C1] hover:text-[#88C0D0]",
+            ),
+            rx.el.button(
+                rx.icon("x", class_name="w-4 h-4"),
+                on_click=state_class.clear_selection,
+                aria_label="Clear selection",
+                class_name="p-1.5 text-[#D8DEE9] rounded-lg hover:bg-[#434C5E] transition-colors",
+            ),
+            class_name="flex items-center gap-3",
+        ),
+        class_name=rx.cond(
+            state_class.selected_count > 0,
+            "flex flex-wrap items-center justify-between gap-3 px-4 py-3 mb-4 rounded-lg border border-[#88C0D0]/40 bg-[#88C0D0]/10",
+            "hidden",
+        ),
+    )
@@ -1,14 +1,21 @@
 import reflex as rx
 from app.states.business_expense_state import BusinessTransaction, BusinessExpenseState
+from app.states.export_state import ExportState
+from app.components.undo_banner import undo_redo_buttons
+from app.components.bulk_actions import bulk_action_bar, bulk_action_button, selection_checkbox
 from app.states.transaction_state import TransactionState # For account names if needed, or we can use BusinessExpenseState if we duplicated it
 
 def business_expense_row(transaction: BusinessTransaction) -> rx.Component:
     """A single row in the business expense list."""
-    is_potential_duplicate = BusinessExpenseState.potential_duplicates.contains(
-        transaction["id"]
-    )
+    is_potential_duplicate = BusinessExpenseState.potential_duplicates[
+        transaction["id"].to(str)
+    ].to(bool)
     
     return rx.el.tr(
+        rx.el.td(
+            selection_checkbox(transaction, BusinessExpenseState),
+            class_name="pl-4 w-8",
+        ),
         rx.el.td(
             rx.el.div(
                 rx.icon(
@@ -112,6 +119,7 @@ def business_expense_list_header() -> rx.Component:
             rx.el.h2(
                 "Business Expenses", class_name="text-xl font-bold text-[#ECEFF4] tracking-tight"
             ),
+            undo_redo_buttons(BusinessExpenseState),
             # Sorting controls could be added here similar to transaction_list
             class_name="flex items-center justify-between w-full",
         ),
@@ -135,7 +143,8 @@ def business_expense_list_header() -> rx.Component:
             rx.el.button(
                 rx.icon("download", class_name="w-4 h-4 mr-2"),
                 "Export CSV",
-                on_click=BusinessExpenseState.export_to_csv,
+                on_click=ExportState.start_export("business", "csv"),
+                disabled=ExportState.is_exporting,
                 class_name="flex items-center px-3 py-2 text-sm font-semibold text-[#D8DEE9] bg-[#3B4252] border border-[#434C5E] rounded-lg hover:bg-[#434C5E] transition-colors",
             ),
             rx.el.button(
@@ -154,12 +163,24 @@ def business_expense_list() -> rx.Component:
     """The main component to display the list of business expenses."""
     return rx.el.div(
         business_expense_list_header(),
+        bulk_action_bar(
+            BusinessExpenseState,
+            bulk_action_button(
+                "circle-check",
+                "Mark reimbursed",
+                BusinessExpenseState.set_selected_status("reimbursed"),
+            ),
+            bulk_action_button(
+                "clock", "Mark pending", BusinessExpenseState.set_selected_status("pending")
+            ),
+        ),
         rx.el.div(
             rx.cond(
-                BusinessExpenseState.sorted_transactions.length() > 0,
+                BusinessExpenseState.visible_count > 0,
                 rx.el.table(
                     rx.el.thead(
                         rx.el.tr(
+                            rx.el.th("", class_name="pl-4 w-8"),
                             rx.el.th("", class_name="p-4 text-left w-16"),
                             rx.el.th("Details", class_name="p-4 text-left"),
                             rx.el.th("Amount", class_name="p-4 text-right"),
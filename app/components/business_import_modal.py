@@ -2,6 +2,138 @@ import reflex as rx
 from app.states.business_expense_state import BusinessExpenseState
 
 
+def csv_column_input(label: str, value: rx.Var, on_change) -> rx.Component:
+    return rx.el.div(
+        rx.el.label(label, class_name="block text-xs font-medium text-slate-400 mb-1"),
+        rx.el.input(
+            default_value=value,
+            on_change=on_change.debounce(300),
+            class_name="w-full px-2 py-1 rounded-md border border-slate-700 bg-slate-900 text-slate-200 text-sm",
+        ),
+    )
+
+
+def csv_column_mapping() -> rx.Component:
+    """Header names used to read CSV statements."""
+    return rx.el.details(
+        rx.el.summary("CSV Column Mapping", class_name="text-sm font-semibold text-slate-400 cursor-pointer hover:text-slate-200 transition-colors"),
+        rx.el.div(
+            csv_column_input("Date column", BusinessExpenseState.csv_date_column, BusinessExpenseState.set_csv_date_column),
+            csv_column_input("Amount column", BusinessExpenseState.csv_amount_column, BusinessExpenseState.set_csv_amount_column),
+            csv_column_input("Memo column", BusinessExpenseState.csv_memo_column, BusinessExpenseState.set_csv_memo_column),
+            csv_column_input("Status column", BusinessExpenseState.csv_status_column, BusinessExpenseState.set_csv_status_column),
+            rx.el.p(
+                "Headers are matched case-insensitively. Without an amount column, "
+                "credit and debit columns are used. Amounts import as positive expenses; without a status column they are pending.",
+                class_name="col-span-2 text-xs text-slate-500",
+            ),
+            class_name="mt-2 p-3 bg-slate-800/50 border border-slate-700 rounded-lg grid grid-cols-2 gap-3",
+        ),
+        class_name="my-4",
+    )
+
+
+def import_summary() -> rx.Component:
+    """Summary statistics for the staged import."""
+    return rx.el.div(
+        rx.el.p(
+            "Date range: ",
+            rx.el.span(
+                f"{BusinessExpenseState.import_min_date} to {BusinessExpenseState.import_max_date}",
+                class_name="font-medium text-white",
+            ),
+        ),
+        rx.el.div(
+            rx.foreach(
+                BusinessExpenseState.import_totals,
+                lambda total: rx.el.span(
+                    f"{total[0].capitalize()}: ${total[1]:.2f}",
+                    class_name="font-medium text-white",
+                ),
+            ),
+            class_name="flex flex-wrap gap-4",
+        ),
+        class_name="p-3 mb-2 rounded-md bg-slate-800/50 border border-slate-700 text-sm text-slate-300 space-y-1",
+    )
+
+
+def invalid_row_summary() -> rx.Component:
+    """Counts of rejected rows grouped by reason."""
+    return rx.cond(
+        BusinessExpenseState.import_skipped > 0,
+        rx.el.div(
+            rx.el.p(
+                f"{BusinessExpenseState.import_skipped} invalid rows will be skipped:",
+                class_name="text-xs text-amber-400 font-semibold",
+            ),
+            rx.foreach(
+                BusinessExpenseState.import_invalid_reasons,
+                lambda r: rx.el.p(
+                    f"{r['reason']}: {r['count']}", class_name="text-xs text-amber-400 ml-2"
+                ),
+            ),
+            class_name="my-2",
+        ),
+        None,
+    )
+
+
+def duplicate_screening() -> rx.Component:
+    """Duplicate counts against the existing ledger and bulk skip choices."""
+    return rx.el.div(
+        rx.el.div(
+            rx.el.span(f"New: {BusinessExpenseState.import_new_count}", class_name="font-medium text-white"),
+            rx.el.span(f"Exact duplicates: {BusinessExpenseState.import_exact_count}", class_name="font-medium text-amber-400"),
+            rx.el.span(f"Near duplicates: {BusinessExpenseState.import_near_count}", class_name="font-medium text-amber-400"),
+            class_name="flex flex-wrap gap-4",
+        ),
+        rx.el.label(
+            rx.el.input(
+                type="checkbox",
+                checked=BusinessExpenseState.import_skip_exact,
+                on_change=lambda _: BusinessExpenseState.set_import_skip_exact(~BusinessExpenseState.import_skip_exact),
+                class_name="w-4 h-4 mr-2 accent-emerald-500",
+            ),
+            "Skip exact duplicates",
+            class_name="flex items-center cursor-pointer",
+        ),
+        rx.el.label(
+            rx.el.input(
+                type="checkbox",
+                checked=BusinessExpenseState.import_skip_near,
+                on_change=lambda _: BusinessExpenseState.set_import_skip_near(~BusinessExpenseState.import_skip_near),
+                class_name="w-4 h-4 mr-2 accent-emerald-500",
+            ),
+            "Skip near duplicates (same amount within a day)",
+            class_name="flex items-center cursor-pointer",
+        ),
+        class_name="p-3 mb-2 rounded-md bg-slate-800/50 border border-slate-700 text-sm text-slate-300 space-y-2",
+    )
+
+
+def import_pager() -> rx.Component:
+    """Previous/next controls for paging through the staged rows."""
+    return rx.el.div(
+        rx.el.button(
+            rx.icon("chevron-left", class_name="w-4 h-4"),
+            on_click=BusinessExpenseState.prev_import_page,
+            disabled=BusinessExpenseState.import_page == 0,
+            class_name="p-1 rounded-md text-slate-400 hover:bg-white/10 disabled:opacity-30",
+        ),
+        rx.el.span(
+            f"Page {BusinessExpenseState.import_page + 1} of {BusinessExpenseState.import_page_count}",
+            class_name="text-xs text-slate-400",
+        ),
+        rx.el.button(
+            rx.icon("chevron-right", class_name="w-4 h-4"),
+            on_click=BusinessExpenseState.next_import_page,
+            disabled=BusinessExpenseState.import_page + 1 >= BusinessExpenseState.import_page_count,
+            class_name="p-1 rounded-md text-slate-400 hover:bg-white/10 disabled:opacity-30",
+        ),
+        class_name="flex items-center justify-end gap-2 mt-2",
+    )
+
+
 def business_import_modal() -> rx.Component:
     return rx.radix.primitives.dialog.root(
         rx.radix.primitives.dialog.portal(
@@ -13,7 +145,7 @@ def business_import_modal() -> rx.Component:
                     "Import Business Expenses", class_name="text-xl font-bold text-white tracking-tight"
                 ),
                 rx.radix.primitives.dialog.description(
-                    "Upload a JSON file or paste JSON content to import expenses.",
+                    "Upload a JSON, CSV, OFX or QIF file, or paste JSON content to import expenses.",
                     class_name="text-sm text-slate-400 mt-1 mb-4",
                 ),
                 rx.radix.primitives.dialog.close(
@@ -24,7 +156,7 @@ def business_import_modal() -> rx.Component:
                 ),
                 rx.el.div(
                     rx.el.h3(
-                        "Upload JSON File",
+                        "Upload Files",
                         class_name="text-md font-semibold text-slate-200 mb-2",
                     ),
                     rx.upload.root(
@@ -32,12 +164,17 @@ def business_import_modal() -> rx.Component:
                             rx.icon(
                                 tag="cloud_upload", class_name="w-8 h-8 text-slate-500"
                             ),
-                            rx.el.p("Drag & drop a JSON file here, or click to select", class_name="text-slate-400"),
+                            rx.el.p("Drag & drop JSON, CSV, OFX or QIF files here, or click to select", class_name="text-slate-400"),
                             class_name="flex flex-col items-center justify-center p-6 border-2 border-dashed border-slate-700 rounded-lg bg-slate-800/50 hover:bg-slate-800/80 transition-colors",
                         ),
                         id="business_json_upload",
-                        accept={"application/json": [".json"]},
-                        multiple=False,
+                        accept={
+                            "application/json": [".json"],
+                            "text/csv": [".csv"],
+                            "application/x-ofx": [".ofx", ".qfx"],
+                            "application/qif": [".qif"],
+                        },
+                        multiple=True,
                         class_name="w-full mb-4 cursor-pointer",
                     ),
                     rx.el.div(
@@ -49,7 +186,7 @@ def business_import_modal() -> rx.Component:
                         )
                     ),
                     rx.el.button(
-                        "Process Uploaded File",
+                        "Process Uploaded Files",
                         on_click=BusinessExpenseState.handle_uploaded_file(
                             rx.upload_files(upload_id="business_json_upload")
                         ),
@@ -76,6 +213,7 @@ def business_import_modal() -> rx.Component:
                     ),
                     class_name="mb-4",
                 ),
+                csv_column_mapping(),
                 rx.el.details(
                     rx.el.summary(
                         "JSON Schema Hint",
@@ -107,23 +245,44 @@ def business_import_modal() -> rx.Component:
                     ),
                     None,
                 ),
+                invalid_row_summary(),
+                rx.cond(
+                    BusinessExpenseState.is_importing,
+                    rx.el.div(
+                        rx.icon("loader-circle", class_name="w-4 h-4 mr-2 animate-spin"),
+                        f"Processing file... {BusinessExpenseState.import_progress}%",
+                        class_name="flex items-center text-sm text-slate-300 my-4",
+                    ),
+                    None,
+                ),
                 rx.cond(
-                    BusinessExpenseState.import_preview.length() > 0,
+                    BusinessExpenseState.import_count > 0,
                     rx.el.div(
                         rx.el.h4(
-                            f"Preview: Found {BusinessExpenseState.import_preview.length()} valid expenses",
+                            f"Preview: Found {BusinessExpenseState.import_count} valid expenses",
                             class_name="text-md font-semibold text-white mb-2",
                         ),
+                        import_summary(),
+                        duplicate_screening(),
                         rx.el.div(
                             rx.foreach(
                                 BusinessExpenseState.import_preview,
                                 lambda tx: rx.el.div(
                                     f"${tx['amount']:.2f} on {tx['date']} - {tx['memo']} ({tx['status']})",
+                                    rx.cond(
+                                        tx["match"] != "new",
+                                        rx.el.span(
+                                            f"{tx['match']} duplicate",
+                                            class_name="ml-2 px-1.5 rounded text-[10px] font-semibold uppercase bg-amber-400/20 text-amber-400",
+                                        ),
+                                        None,
+                                    ),
                                     class_name="text-xs p-2 bg-white/5 rounded text-slate-300",
                                 ),
                             ),
                             class_name="space-y-1 max-h-32 overflow-y-auto p-2 border border-slate-700 rounded-md bg-slate-800/50",
                         ),
+                        import_pager(),
                         class_name="my-4",
                     ),
                     None,
@@ -138,7 +297,7 @@ def business_import_modal() -> rx.Component:
                     rx.el.button(
                         "Confirm Import",
                         on_click=BusinessExpenseState.confirm_import,
-                        disabled=BusinessExpenseState.import_preview.length() == 0,
+                        disabled=BusinessExpenseState.import_count == 0,
                         class_name="px-4 py-2 text-sm font-medium text-white bg-gradient-to-r from-emerald-500 to-teal-500 rounded-md shadow-[0_0_15px_rgba(16,185,129,0.2)] hover:shadow-[0_0_20px_rgba(16,185,129,0.3)] hover:from-emerald-400 hover:to-teal-400 transition-all disabled:opacity-30",
                     ),
                     class_name="flex justify-end gap-3 pt-4 border-t border-white/10 mt-4",
@@ -0,0 +1,89 @@
+import reflex as rx
+from app.states.transaction_state import TransactionState
+
+HEADER_CLASS = "p-3 text-left text-xs font-bold uppercase tracking-wider text-[#81A1C1]"
+CELL_CLASS = "p-3 text-sm text-[#D8DEE9] tabular-nums"
+
+
+def closed_period_row(period: rx.Var[dict[str, str]]) -> rx.Component:
+    return rx.el.tr(
+        rx.el.td(
+            rx.el.p(period["start"] + " – " + period["end"], class_name="font-medium text-[#ECEFF4]"),
+            class_name="p-3",
+        ),
+        rx.el.td(period["rows"], class_name=CELL_CLASS),
+        rx.el.td(period["income"], class_name=CELL_CLASS),
+        rx.el.td(period["maaser"], class_name=CELL_CLASS),
+        rx.el.td(period["carried_due"], class_name=CELL_CLASS),
+        class_name="border-b border-[#434C5E] hover:bg-[#3B4252]/50 transition-colors",
+    )
+
+
+def closed_periods_panel() -> rx.Component:
+    """Close the books through a date, and the periods closed so far."""
+    return rx.el.div(
+        rx.el.div(
+            rx.el.div(
+                rx.el.h2(
+                    "Closed Periods",
+                    class_name="text-xl font-bold text-[#ECEFF4] tracking-tight",
+                ),
+                rx.el.p(
+                    "Closing a period freezes its transactions and carries its totals forward. Reopen the latest period to change it.",
+                    class_name="text-sm text-[#D8DEE9]",
+                ),
+            ),
+            rx.el.div(
+                rx.el.input(
+                    type="date",
+                    value=TransactionState.close_through_date,
+                    on_change=TransactionState.set_close_through_date,
+                    class_name="px-3 py-2 rounded-md border border-[#434C5E] bg-[#3B4252] text-[#ECEFF4] focus:border-[#88C0D0] focus:ring-1 focus:ring-[#88C0D0] shadow-sm transition-colors",
+                ),
+                rx.el.button(
+                    rx.icon("lock", class_name="w-4 h-4 mr-2"),
+                    "Close period",
+                    on_click=TransactionState.close_period,
+                    disabled=TransactionState.close_through_date == "",
+                    class_name="flex items-center px-4 py-2 text-sm font-medium text-[#2E3440] bg-gradient-to-r from-[#88C0D0] to-[#81A1C1] rounded-md shadow-lg hover:from-[#81A1C1] hover:to-[#5E81AC] transition-all disabled:opacity-40",
+                ),
+                rx.cond(
+                    TransactionState.closed_through != "",
+                    rx.el.button(
+                        rx.icon("lock-open", class_name="w-4 h-4 mr-2"),
+                        "Reopen latest",
+                        on_click=TransactionState.reopen_period,
+                        class_name="flex items-center px-4 py-2 text-sm font-medium text-[#D8DEE9] border border-[#434C5E] rounded-md hover:bg-[#434C5E] transition-colors",
+                    ),
+                ),
+                class_name="flex flex-wrap items-center gap-2",
+            ),
+            class_name="flex flex-col md:flex-row md:items-center justify-between gap-4 mb-4",
+        ),
+        rx.cond(
+            TransactionState.closed_period_rows.length() > 0,
+            rx.el.div(
+                rx.el.table(
+                    rx.el.thead(
+                        rx.el.tr(
+                            rx.el.th("Period", class_name=HEADER_CLASS),
+                            rx.el.th("Transactions", class_name=HEADER_CLASS),
+                            rx.el.th("Income", class_name=HEADER_CLASS),
+                            rx.el.th("Maaser", class_name=HEADER_CLASS),
+                            rx.el.th("Due at close", class_name=HEADER_CLASS),
+                        ),
+                        class_name="border-b border-[#434C5E]",
+                    ),
+                    rx.el.tbody(rx.foreach(TransactionState.closed_period_rows, closed_period_row)),
+                    class_name="w-full",
+                ),
+                class_name="max-h-[360px] overflow-auto",
+            ),
+            rx.el.div(
+                rx.icon("calendar-check", class_name="w-12 h-12 text-[#4C566A] mb-3"),
+                rx.el.p("No periods closed yet.", class_name="text-sm text-[#81A1C1]"),
+                class_name="flex flex-col items-center justify-center text-center p-10 border-2 border-dashed border-[#434C5E] rounded-lg",
+            ),
+        ),
+        class_name="p-6 glass-panel rounded-xl mt-8",
+    )
@@ -0,0 +1,100 @@
+import reflex as rx
+from app.profiling import ProfileEntry
+from app.states.diagnostics_state import DiagnosticsState
+
+HEADER_CLASS = "p-3 text-left text-xs font-bold uppercase tracking-wider text-[#81A1C1]"
+CELL_CLASS = "p-3 text-sm text-[#D8DEE9] tabular-nums"
+
+
+def profile_row(entry: ProfileEntry) -> rx.Component:
+    return rx.el.tr(
+        rx.el.td(
+            rx.el.p(entry["name"], class_name="font-medium text-[#ECEFF4]"),
+            rx.el.p(entry["kind"], class_name="text-xs text-[#81A1C1]"),
+            class_name="p-3",
+        ),
+        rx.el.td(entry["calls"], class_name=CELL_CLASS),
+        rx.el.td(entry["total_ms"], class_name=CELL_CLASS),
+        rx.el.td(entry["mean_ms"], class_name=CELL_CLASS),
+        rx.el.td(entry["max_ms"], class_name=CELL_CLASS),
+        rx.el.td(
+            rx.cond(entry["size"].is_not_none(), entry["size"], "—"),
+            class_name=CELL_CLASS,
+        ),
+        class_name="border-b border-[#434C5E] hover:bg-[#3B4252]/50 transition-colors",
+    )
+
+
+def diagnostics_panel() -> rx.Component:
+    """Profiling controls and per-var/handler timings for this backend worker."""
+    return rx.el.div(
+        rx.el.div(
+            rx.el.div(
+                rx.el.h2(
+                    "Diagnostics",
+                    class_name="text-xl font-bold text-[#ECEFF4] tracking-tight",
+                ),
+                rx.el.p(
+                    "Call counts and wall time of computed values, actions and helpers since the last reset. Profiling adds overhead while it is on.",
+                    class_name="text-sm text-[#D8DEE9]",
+                ),
+            ),
+            rx.el.div(
+                rx.el.button(
+                    rx.icon("refresh-cw", class_name="w-4 h-4"),
+                    on_click=DiagnosticsState.refresh_profile,
+                    class_name="p-2 text-[#D8DEE9] hover:text-[#ECEFF4] hover:bg-[#434C5E] rounded-md transition-colors",
+                ),
+                rx.el.button(
+                    "Reset",
+                    on_click=DiagnosticsState.reset_profile,
+                    class_name="px-4 py-2 text-sm font-medium text-[#D8DEE9] border border-[#434C5E] rounded-md hover:bg-[#434C5E] transition-colors",
+                ),
+                rx.el.button(
+                    rx.cond(DiagnosticsState.profiling_enabled, "Stop profiling", "Start profiling"),
+                    on_click=DiagnosticsState.toggle_profiling,
+                    class_name=rx.cond(
+                        DiagnosticsState.profiling_enabled,
+                        "px-4 py-2 text-sm font-medium text-[#ECEFF4] bg-[#BF616A] rounded-md shadow-lg hover:bg-[#BF616A]/80 transition-all",
+                        "px-4 py-2 text-sm font-medium text-[#2E3440] bg-gradient-to-r from-[#88C0D0] to-[#81A1C1] rounded-md shadow-lg hover:from-[#81A1C1] hover:to-[#5E81AC] transition-all",
+                    ),
+                ),
+                class_name="flex items-center gap-2",
+            ),
+            class_name="flex flex-col md:flex-row md:items-center justify-between gap-4 mb-4",
+        ),
+        rx.cond(
+            DiagnosticsState.profile_entries.length() > 0,
+            rx.el.div(
+                rx.el.table(
+                    rx.el.thead(
+                        rx.el.tr(
+                            rx.el.th("Name", class_name=HEADER_CLASS),
+                            rx.el.th("Calls", class_name=HEADER_CLASS),
+                            rx.el.th("Total ms", class_name=HEADER_CLASS),
+                            rx.el.th("Mean ms", class_name=HEADER_CLASS),
+                            rx.el.th("Max ms", class_name=HEADER_CLASS),
+                            rx.el.th("Size", class_name=HEADER_CLASS),
+                        ),
+                        class_name="border-b border-[#434C5E]",
+                    ),
+                    rx.el.tbody(rx.foreach(DiagnosticsState.profile_entries, profile_row)),
+                    class_name="w-full",
+                ),
+                class_name="max-h-[480px] overflow-auto",
+            ),
+            rx.el.div(
+                rx.icon("activity", class_name="w-12 h-12 text-[#4C566A] mb-3"),
+                rx.el.p(
+                    rx.cond(
+                        DiagnosticsState.profiling_enabled,
+                        "Nothing recorded yet. Use the app, then refresh.",
+                        "Profiling is off.",
+                    ),
+                    class_name="text-sm text-[#81A1C1]",
+                ),
+                class_name="flex flex-col items-center justify-center text-center p-10 border-2 border-dashed border-[#434C5E] rounded-lg",
+            ),
+        ),
+        class_name="p-6 glass-panel rounded-xl mt-8",
+    )
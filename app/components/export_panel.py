@@ -0,0 +1,57 @@
+import reflex as rx
+from app.states.export_state import ExportState
+
+
+def export_panel() -> rx.Component:
+    """Floating card showing export progress and the finished download."""
+    return rx.cond(
+        ExportState.is_exporting | (ExportState.export_url != ""),
+        rx.el.div(
+            rx.el.div(
+                rx.el.div(
+                    rx.cond(
+                        ExportState.is_exporting,
+                        rx.spinner(size="2", class_name="text-[#88C0D0]"),
+                        rx.icon("file-check", class_name="w-5 h-5 text-[#A3BE8C]"),
+                    ),
+                    class_name="flex items-center justify-center w-11 h-11 rounded-xl bg-[#88C0D0]/15 shadow-inner",
+                ),
+                rx.el.div(
+                    rx.el.p(
+                        rx.cond(ExportState.is_exporting, "Preparing export", "Export ready"),
+                        class_name="text-xs font-bold uppercase tracking-wider text-[#D8DEE9]/70 leading-none mb-1",
+                    ),
+                    rx.cond(
+                        ExportState.is_exporting,
+                        rx.el.div(
+                            rx.el.div(
+                                class_name="h-full bg-[#88C0D0] rounded-full transition-all",
+                                style={"width": f"{ExportState.export_progress}%"},
+                            ),
+                            class_name="w-48 h-1.5 bg-[#434C5E] rounded-full overflow-hidden mt-1",
+                        ),
+                        rx.el.a(
+                            ExportState.export_filename,
+                            href=ExportState.export_url,
+                            class_name="text-sm font-semibold text-[#88C0D0] hover:underline leading-none",
+                        ),
+                    ),
+                    class_name="flex flex-col justify-center",
+                ),
+                class_name="flex items-center gap-4",
+            ),
+            rx.cond(
+                ExportState.is_exporting,
+                rx.el.span(
+                    f"{ExportState.export_progress}%",
+                    class_name="text-sm font-semibold text-[#D8DEE9]",
+                ),
+                rx.el.button(
+                    rx.icon("x", class_name="w-5 h-5"),
+                    on_click=ExportState.dismiss_export,
+                    class_name="p-2 text-[#D8DEE9] hover:text-[#ECEFF4] transition-colors rounded-xl hover:bg-[#434C5E]",
+                ),
+            ),
+            class_name="fixed bottom-10 right-10 z-[100] flex items-center justify-between gap-8 px-5 py-4 bg-[#2E3440]/98 backdrop-blur-xl border border-[#434C5E] shadow-2xl rounded-2xl min-w-[320px]",
+        ),
+    )
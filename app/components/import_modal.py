@@ -2,6 +2,141 @@ import reflex as rx
 from app.states.transaction_state import Transaction, TransactionState
 
 
+def csv_column_input(label: str, value: rx.Var, on_change) -> rx.Component:
+    return rx.el.div(
+        rx.el.label(label, class_name="block text-xs font-medium text-[#D8DEE9] mb-1"),
+        rx.el.input(
+            default_value=value,
+            on_change=on_change.debounce(300),
+            class_name="w-full px-2 py-1 rounded-md border border-[#434C5E] bg-[#2E3440] text-[#ECEFF4] text-sm",
+        ),
+    )
+
+
+def csv_column_mapping() -> rx.Component:
+    """Header names used to read CSV statements."""
+    return rx.el.details(
+        rx.el.summary("CSV Column Mapping", class_name="text-sm font-semibold text-[#88C0D0] cursor-pointer hover:text-[#81A1C1]"),
+        rx.el.div(
+            csv_column_input("Date column", TransactionState.csv_date_column, TransactionState.set_csv_date_column),
+            csv_column_input("Amount column", TransactionState.csv_amount_column, TransactionState.set_csv_amount_column),
+            csv_column_input("Memo column", TransactionState.csv_memo_column, TransactionState.set_csv_memo_column),
+            csv_column_input("Type column", TransactionState.csv_type_column, TransactionState.set_csv_type_column),
+            rx.el.p(
+                "Headers are matched case-insensitively. Without an amount column, "
+                "credit and debit columns are used; without the memo column, a "
+                "description or payee column. Without income/maaser types, credits "
+                "import as income and debits are rejected: only a type column can "
+                "tell maaser from spending.",
+                class_name="col-span-2 text-xs text-[#81A1C1]",
+            ),
+            class_name="mt-2 p-3 bg-[#3B4252] border border-[#434C5E] rounded-lg grid grid-cols-2 gap-3",
+        ),
+        class_name="my-4",
+    )
+
+
+def import_summary() -> rx.Component:
+    """Summary statistics for the staged import."""
+    return rx.el.div(
+        rx.el.p(
+            "Date range: ",
+            rx.el.span(
+                f"{TransactionState.import_min_date} to {TransactionState.import_max_date}",
+                class_name="font-medium text-[#ECEFF4]",
+            ),
+        ),
+        rx.el.div(
+            rx.foreach(
+                TransactionState.import_totals,
+                lambda total: rx.el.span(
+                    f"{total[0].capitalize()}: ${total[1]:.2f}",
+                    class_name="font-medium text-[#ECEFF4]",
+                ),
+            ),
+            class_name="flex flex-wrap gap-4",
+        ),
+        class_name="p-3 mb-2 rounded-md bg-[#3B4252] border border-[#434C5E] text-sm text-[#D8DEE9] space-y-1",
+    )
+
+
+def invalid_row_summary() -> rx.Component:
+    """Counts of rejected rows grouped by reason."""
+    return rx.cond(
+        TransactionState.import_skipped > 0,
+        rx.el.div(
+            rx.el.p(
+                f"{TransactionState.import_skipped} invalid rows will be skipped:",
+                class_name="text-xs text-[#EBCB8B] font-semibold",
+            ),
+            rx.foreach(
+                TransactionState.import_invalid_reasons,
+                lambda r: rx.el.p(
+                    f"{r['reason']}: {r['count']}", class_name="text-xs text-[#EBCB8B] ml-2"
+                ),
+            ),
+            class_name="my-2",
+        ),
+        None,
+    )
+
+
+def duplicate_screening() -> rx.Component:
+    """Duplicate counts against the existing ledger and bulk skip choices."""
+    return rx.el.div(
+        rx.el.div(
+            rx.el.span(f"New: {TransactionState.import_new_count}", class_name="font-medium text-[#ECEFF4]"),
+            rx.el.span(f"Exact duplicates: {TransactionState.import_exact_count}", class_name="font-medium text-[#EBCB8B]"),
+            rx.el.span(f"Near duplicates: {TransactionState.import_near_count}", class_name="font-medium text-[#EBCB8B]"),
+            class_name="flex flex-wrap gap-4",
+        ),
+        rx.el.label(
+            rx.el.input(
+                type="checkbox",
+                checked=TransactionState.import_skip_exact,
+                on_change=lambda _: TransactionState.set_import_skip_exact(~TransactionState.import_skip_exact),
+                class_name="w-4 h-4 mr-2 accent-[#88C0D0]",
+            ),
+            "Skip exact duplicates",
+            class_name="flex items-center cursor-pointer",
+        ),
+        rx.el.label(
+            rx.el.input(
+                type="checkbox",
+                checked=TransactionState.import_skip_near,
+                on_change=lambda _: TransactionState.set_import_skip_near(~TransactionState.import_skip_near),
+                class_name="w-4 h-4 mr-2 accent-[#88C0D0]",
+            ),
+            "Skip near duplicates (same amount within a day)",
+            class_name="flex items-center cursor-pointer",
+        ),
+        class_name="p-3 mb-2 rounded-md bg-[#3B4252] border border-[#434C5E] text-sm text-[#D8DEE9] space-y-2",
+    )
+
+
+def import_pager() -> rx.Component:
+    """Previous/next controls for paging through the staged rows."""
+    return rx.el.div(
+        rx.el.button(
+            rx.icon("chevron-left", class_name="w-4 h-4"),
+            on_click=TransactionState.prev_import_page,
+            disabled=TransactionState.import_page == 0,
+            class_name="p-1 rounded-md text-[#D8DEE9] hover:bg-[#434C5E] disabled:opacity-30",
+        ),
+        rx.el.span(
+            f"Page {TransactionState.import_page + 1} of {TransactionState.import_page_count}",
+            class_name="text-xs text-[#81A1C1]",
+        ),
+        rx.el.button(
+            rx.icon("chevron-right", class_name="w-4 h-4"),
+            on_click=TransactionState.next_import_page,
+            disabled=TransactionState.import_page + 1 >= TransactionState.import_page_count,
+            class_name="p-1 rounded-md text-[#D8DEE9] hover:bg-[#434C5E] disabled:opacity-30",
+        ),
+        class_name="flex items-center justify-end gap-2 mt-2",
+    )
+
+
 def import_modal() -> rx.Component:
     return rx.radix.primitives.dialog.root(
         rx.radix.primitives.dialog.portal(
@@ -13,7 +148,7 @@ def import_modal() -> rx.Component:
                     "Import Transactions", class_name="text-xl font-bold text-[#ECEFF4]"
                 ),
                 rx.radix.primitives.dialog.description(
-                    "Upload a JSON file or paste JSON content to import transactions.",
+                    "Upload a JSON, CSV, OFX or QIF file, or paste JSON content to import transactions.",
                     class_name="text-sm text-[#D8DEE9] mt-1 mb-4",
                 ),
                 rx.radix.primitives.dialog.close(
@@ -24,7 +159,7 @@ def import_modal() -> rx.Component:
                 ),
                 rx.el.div(
                     rx.el.h3(
-                        "Upload JSON File",
+                        "Upload Files",
                         class_name="text-md font-semibold text-[#ECEFF4] mb-2",
                     ),
                     rx.upload.root(
@@ -32,12 +167,17 @@ def import_modal() -> rx.Component:
                             rx.icon(
                                 tag="cloud_upload", class_name="w-8 h-8 text-[#81A1C1]"
                             ),
-                            rx.el.p("Drag & drop a JSON file here, or click to select", class_name="text-[#D8DEE9]"),
+                            rx.el.p("Drag & drop JSON, CSV, OFX or QIF files here, or click to select", class_name="text-[#D8DEE9]"),
                             class_name="flex flex-col items-center justify-center p-6 border-2 border-dashed border-[#434C5E] rounded-lg bg-[#3B4252] hover:bg-[#434C5E] transition-colors",
                         ),
                         id="json_upload",
-                        accept={"application/json": [".json"]},
-                        multiple=False,
+                        accept={
+                            "application/json": [".json"],
+                            "text/csv": [".csv"],
+                            "application/x-ofx": [".ofx", ".qfx"],
+                            "application/qif": [".qif"],
+                        },
+                        multiple=True,
                         class_name="w-full mb-4 cursor-pointer",
                     ),
                     rx.el.div(
@@ -49,7 +189,7 @@ def import_modal() -> rx.Component:
                         )
                     ),
                     rx.el.button(
-                        "Process Uploaded File",
+                        "Process Uploaded Files",
                         on_click=TransactionState.handle_uploaded_file(
                             rx.upload_files(upload_id="json_upload")
                         ),
@@ -76,6 +216,7 @@ def import_modal() -> rx.Component:
                     ),
                     class_name="mb-4",
                 ),
+                csv_column_mapping(),
                 rx.el.details(
                     rx.el.summary(
                         "JSON Schema Hint",
@@ -107,23 +248,44 @@ def import_modal() -> rx.Component:
                     ),
                     None,
                 ),
+                invalid_row_summary(),
+                rx.cond(
+                    TransactionState.is_importing,
+                    rx.el.div(
+                        rx.icon("loader-circle", class_name="w-4 h-4 mr-2 animate-spin"),
+                        f"Processing file... {TransactionState.import_progress}%",
+                        class_name="flex items-center text-sm text-[#88C0D0] my-4",
+                    ),
+                    None,
+                ),
                 rx.cond(
-                    TransactionState.import_preview.length() > 0,
+                    TransactionState.import_count > 0,
                     rx.el.div(
                         rx.el.h4(
-                            f"Preview: Found {TransactionState.import_preview.length()} valid transactions",
+                            f"Preview: Found {TransactionState.import_count} valid transactions",
                             class_name="text-md font-semibold text-[#ECEFF4] mb-2",
                         ),
+                        import_summary(),
+                        duplicate_screening(),
                         rx.el.div(
                             rx.foreach(
                                 TransactionState.import_preview,
                                 lambda tx: rx.el.div(
                                     f"{tx['type'].capitalize()}: ${tx['amount']:.2f} on {tx['date']} - {tx['memo']}",
+                                    rx.cond(
+                                        tx["match"] != "new",
+                                        rx.el.span(
+                                            f"{tx['match']} duplicate",
+                                            class_name="ml-2 px-1.5 rounded text-[10px] font-semibold uppercase bg-[#EBCB8B]/20 text-[#EBCB8B]",
+                                        ),
+                                        None,
+                                    ),
                                     class_name="text-xs p-2 bg-[#2E3440] rounded text-[#D8DEE9] border border-[#434C5E]",
                                 ),
                             ),
                             class_name="space-y-1 max-h-32 overflow-y-auto p-2 border border-[#434C5E] rounded-md bg-[#3B4252]",
                         ),
+                        import_pager(),
                         class_name="my-4",
                     ),
                     None,
@@ -138,7 +300,7 @@ def import_modal() -> rx.Component:
                     rx.el.button(
                         "Confirm Import",
                         on_click=TransactionState.confirm_import,
-                        disabled=TransactionState.import_preview.length() == 0,
+                        disabled=TransactionState.import_count == 0,
                         class_name="px-4 py-2 text-sm font-medium text-[#2E3440] bg-[#A3BE8C] rounded-md shadow-sm hover:bg-[#A3BE8C]/90 disabled:bg-[#4C566A]",
                     ),
                     class_name="flex justify-end gap-3 pt-4 border-t border-[#434C5E] mt-4",
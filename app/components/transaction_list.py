@@ -1,23 +1,35 @@
 import reflex as rx
 from app.states.transaction_state import Transaction, TransactionState
+from app.states.export_state import ExportState
 from app.components.filter_popover import filter_popover
 from app.components.sorting_controls import sorting_controls
+from app.components.undo_banner import undo_redo_buttons
+from app.components.bulk_actions import bulk_action_bar, bulk_action_button, selection_checkbox
 
 
 def transaction_row(transaction: Transaction) -> rx.Component:
     """A single row in the transaction list."""
-    is_potential_duplicate = TransactionState.potential_duplicates.contains(
-        transaction["id"]
+    # Lookups by id rather than list.contains, which scans the list per row.
+    is_potential_duplicate = TransactionState.potential_duplicates[
+        transaction["id"].to(str)
+    ].to(bool)
+    is_verified = TransactionState.verified_lookup[transaction["id"].to(str)].to(bool)
+    # ISO dates compare as strings.
+    is_closed = (TransactionState.closed_through != "") & (
+        transaction["date"].to(str) <= TransactionState.closed_through
     )
-    is_verified = TransactionState.verified_transactions.contains(transaction["id"])
     return rx.el.tr(
+        rx.el.td(
+            selection_checkbox(transaction, TransactionState),
+            class_name="pl-4 w-8",
+        ),
         rx.el.td(
             rx.cond(
                 is_potential_duplicate,
                 rx.el.div(
                     rx.el.input(
                         type="checkbox",
-                        checked=is_verified,
+                        checked=rx.cond(is_verified, True, False),
                         on_change=lambda _: TransactionState.toggle_verified(
                             transaction["id"]
                         ),
@@ -98,22 +110,30 @@ def transaction_row(transaction: Transaction) -> rx.Component:
             class_name="p-4 text-right",
         ),
         rx.el.td(
-            rx.el.div(
-                rx.el.button(
-                    rx.icon("pencil", class_name="w-4 h-4"),
-                    on_click=lambda: TransactionState.open_edit_transaction_modal(
-                        transaction
-                    ),
-                    class_name="p-2 text-[#D8DEE9] hover:text-[#88C0D0] hover:bg-[#88C0D0]/10 rounded-md transition-colors",
+            rx.cond(
+                is_closed,
+                rx.el.div(
+                    rx.icon("lock", class_name="w-4 h-4 text-[#4C566A]"),
+                    title="In a closed period",
+                    class_name="flex items-center justify-end p-2",
                 ),
-                rx.el.button(
-                    rx.icon("trash-2", class_name="w-4 h-4"),
-                    on_click=lambda: TransactionState.delete_transaction(
-                        transaction["id"]
+                rx.el.div(
+                    rx.el.button(
+                        rx.icon("pencil", class_name="w-4 h-4"),
+                        on_click=lambda: TransactionState.open_edit_transaction_modal(
+                            transaction
+                        ),
+                        class_name="p-2 text-[#D8DEE9] hover:text-[#88C0D0] hover:bg-[#88C0D0]/10 rounded-md transition-colors",
                     ),
-                    class_name="p-2 text-[#D8DEE9] hover:text-[#BF616A] hover:bg-[#BF616A]/10 rounded-md transition-colors",
+                    rx.el.button(
+                        rx.icon("trash-2", class_name="w-4 h-4"),
+                        on_click=lambda: TransactionState.delete_transaction(
+                            transaction["id"]
+                        ),
+                        class_name="p-2 text-[#D8DEE9] hover:text-[#BF616A] hover:bg-[#BF616A]/10 rounded-md transition-colors",
+                    ),
+                    class_name="flex items-center justify-end gap-2",
                 ),
-                class_name="flex items-center justify-end gap-2",
             ),
             class_name="p-4",
         ),
@@ -133,6 +153,7 @@ def transaction_list_header() -> rx.Component:
                 "Recent Transactions", class_name="text-xl font-bold text-[#ECEFF4]"
             ),
             rx.el.div(
+                undo_redo_buttons(TransactionState),
                 rx.el.button(
                     rx.icon("import", class_name="w-4 h-4 mr-2"),
                     "Import",
@@ -142,7 +163,16 @@ def transaction_list_header() -> rx.Component:
                 rx.el.button(
                     rx.icon("download", class_name="w-4 h-4 mr-2"),
                     "Export CSV",
-                    on_click=TransactionState.export_to_csv,
+                    on_click=ExportState.start_export("transactions", "csv"),
+                    disabled=ExportState.is_exporting,
+                    class_name="flex items-center px-3 py-2 text-sm font-medium text-[#D8DEE9] bg-[#3B4252] border border-[#434C5E] rounded-lg hover:bg-[#434C5E] hover:border-[#88C0D0]/50 transition-all",
+                ),
+                rx.el.button(
+                    rx.icon("database", class_name="w-4 h-4 mr-2"),
+                    "Export Parquet",
+                    on_click=ExportState.start_export("all", "parquet"),
+                    disabled=ExportState.is_exporting,
+                    title="Transactions, accounts and business expenses as typed Parquet files",
                     class_name="flex items-center px-3 py-2 text-sm font-medium text-[#D8DEE9] bg-[#3B4252] border border-[#434C5E] rounded-lg hover:bg-[#434C5E] hover:border-[#88C0D0]/50 transition-all",
                 ),
                 rx.el.button(
@@ -183,9 +213,15 @@ def transaction_list() -> rx.Component:
     """The main component to display the list of transactions."""
     return rx.el.div(
         transaction_list_header(),
+        bulk_action_bar(
+            TransactionState,
+            bulk_action_button(
+                "badge-check", "Verify", TransactionState.verify_selected
+            ),
+        ),
         rx.el.div(
             rx.cond(
-                TransactionState.sorted_transactions.length() > 0,
+                TransactionState.visible_count > 0,
                 rx.el.table(
                     rx.el.tbody(
                         rx.foreach(
@@ -209,4 +245,14 @@ def transaction_list() -> rx.Component:
             ),
             class_name="glass-panel rounded-lg overflow-hidden",
         ),
+        rx.cond(
+            TransactionState.archived_through != "",
+            rx.el.p(
+                rx.icon("archive", class_name="w-4 h-4 mr-2 shrink-0"),
+                "Transactions through "
+                + TransactionState.archived_through
+                + " are archived. Search or set a date range to include them.",
+                class_name="flex items-center mt-3 text-xs text-[#81A1C1]",
+            ),
+        ),
     )
\ No newline at end of file
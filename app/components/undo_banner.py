@@ -1,22 +1,38 @@
 import reflex as rx
 
-def undo_banner_item(transaction, state_class) -> rx.Component:
-    """A single undo banner item."""
+_ACTION_CLASS = "flex items-center px-4 py-2.5 text-sm font-bold text-[#88C0D0] hover:text-[#2E3440] transition-all border border-[#88C0D0]/30 rounded-xl bg-[#88C0D0]/10 hover:bg-gradient-to-r hover:from-[#88C0D0] hover:to-[#81A1C1] hover:border-[#88C0D0] shadow-sm"
+_HISTORY_BUTTON_CLASS = "flex items-center justify-center p-2.5 text-[#D8DEE9] border border-[#434C5E] rounded-xl hover:bg-[#434C5E] hover:text-[#ECEFF4] transition-colors disabled:opacity-40 disabled:cursor-not-allowed"
+
+
+def _operation_icon(kind) -> rx.Component:
+    return rx.match(
+        kind,
+        ("add", rx.icon("plus", class_name="w-5 h-5 text-[#A3BE8C]")),
+        ("edit", rx.icon("pencil", class_name="w-5 h-5 text-[#88C0D0]")),
+        ("verify", rx.icon("badge-check", class_name="w-5 h-5 text-[#A3BE8C]")),
+        ("status", rx.icon("repeat", class_name="w-5 h-5 text-[#EBCB8B]")),
+        ("import", rx.icon("import", class_name="w-5 h-5 text-[#88C0D0]")),
+        rx.icon("trash-2", class_name="w-5 h-5 text-[#BF616A]"),
+    )
+
+
+def undo_banner_item(operation, state_class) -> rx.Component:
+    """A single undo banner item: the operation and an Undo (or Redo) button."""
     return rx.el.div(
         rx.el.div(
             rx.el.div(
                 rx.el.div(
                     rx.el.div(
-                        rx.icon("trash-2", class_name="w-5 h-5 text-[#BF616A]"),
-                        class_name="flex items-center justify-center w-11 h-11 rounded-xl bg-[#BF616A]/15 shadow-inner",
+                        _operation_icon(operation["kind"]),
+                        class_name="flex items-center justify-center w-11 h-11 rounded-xl bg-[#434C5E]/60 shadow-inner",
                     ),
                     rx.el.div(
                         rx.el.p(
-                            "Transaction deleted",
+                            operation["title"],
                             class_name="text-xs font-bold uppercase tracking-wider text-[#D8DEE9]/70 leading-none mb-1",
                         ),
                         rx.el.p(
-                            transaction["memo"],
+                            operation["detail"],
                             class_name="text-sm font-semibold text-[#ECEFF4] leading-none",
                         ),
                         class_name="flex flex-col justify-center",
@@ -24,15 +40,24 @@ def undo_banner_item(transaction, state_class) -> rx.Component:
                     class_name="flex items-center gap-4",
                 ),
                 rx.el.div(
-                    rx.el.button(
-                        rx.icon("undo-2", class_name="w-4 h-4 mr-1.5"),
-                        "Undo",
-                        on_click=lambda: state_class.undo_delete(transaction["id"]),
-                        class_name="flex items-center px-4 py-2.5 text-sm font-bold text-[#88C0D0] hover:text-[#2E3440] transition-all border border-[#88C0D0]/30 rounded-xl bg-[#88C0D0]/10 hover:bg-gradient-to-r hover:from-[#88C0D0] hover:to-[#81A1C1] hover:border-[#88C0D0] shadow-sm",
+                    rx.cond(
+                        operation["undone"],
+                        rx.el.button(
+                            rx.icon("redo-2", class_name="w-4 h-4 mr-1.5"),
+                            "Redo",
+                            on_click=lambda: state_class.redo_operation(operation["id"]),
+                            class_name=_ACTION_CLASS,
+                        ),
+                        rx.el.button(
+                            rx.icon("undo-2", class_name="w-4 h-4 mr-1.5"),
+                            "Undo",
+                            on_click=lambda: state_class.undo_operation(operation["id"]),
+                            class_name=_ACTION_CLASS,
+                        ),
                     ),
                     rx.el.button(
                         rx.icon("x", class_name="w-5 h-5"),
-                        on_click=lambda: state_class.close_undo_banner(transaction["id"]),
+                        on_click=lambda: state_class.dismiss_operation(operation["id"]),
                         class_name="p-2 text-[#D8DEE9] hover:text-[#ECEFF4] transition-colors rounded-xl hover:bg-[#434C5E]",
                     ),
                     class_name="flex items-center gap-2",
@@ -48,8 +73,39 @@ def undo_banner(state_class) -> rx.Component:
     """A floating container for stacking undo banner items."""
     return rx.el.div(
         rx.foreach(
-            state_class.deleted_history,
-            lambda t: undo_banner_item(t, state_class)
+            state_class.recent_operations,
+            lambda op: undo_banner_item(op, state_class)
         ),
         class_name="fixed bottom-10 left-1/2 -translate-x-1/2 z-[100] flex flex-col-reverse gap-3",
     )
+
+
+def undo_redo_buttons(state_class) -> rx.Component:
+    """Undo and Redo buttons for the latest operations in the shared history."""
+    return rx.el.div(
+        rx.tooltip(
+            rx.el.button(
+                rx.icon("undo-2", class_name="w-4 h-4"),
+                on_click=state_class.undo_last,
+                disabled=state_class.undo_title == "",
+                aria_label="Undo",
+                class_name=_HISTORY_BUTTON_CLASS,
+            ),
+            content=rx.cond(
+                state_class.undo_title == "", "Nothing to undo", "Undo: " + state_class.undo_title
+            ),
+        ),
+        rx.tooltip(
+            rx.el.button(
+                rx.icon("redo-2", class_name="w-4 h-4"),
+                on_click=state_class.redo_last,
+                disabled=state_class.redo_title == "",
+                aria_label="Redo",
+                class_name=_HISTORY_BUTTON_CLASS,
+            ),
+            content=rx.cond(
+                state_class.redo_title == "", "Nothing to redo", "Redo: " + state_class.redo_title
+            ),
+        ),
+        class_name="flex items-center gap-2",
+    )
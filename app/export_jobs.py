@@ -0,0 +1,223 @@
+"""Export artifacts built in the background and cached on disk.
+
+An ``ExportJob`` describes one export: which ledger, which format and the
+view parameters (filters and sort order). Its artifact is keyed by those and
+by the version stamps of the data files it reads, so a repeat request for
+unchanged data is served from the cache without rebuilding. Artifacts are
+written into a private directory and renamed into place, so a reader in
+another worker never sees a partial file.
+"""
+
+import contextlib
+import datetime
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+
+from app import metrics
+from app.ledger import (
+    BUSINESS_CSV_COLUMNS,
+    BUSINESS_SORT_FIELDS,
+    CSV_CHUNK_ROWS,
+    TRANSACTION_CSV_COLUMNS,
+    TRANSACTION_SORT_FIELDS,
+    filter_business_transactions,
+    filter_segments,
+    filter_transactions,
+    iter_csv_chunks,
+    load_ledger,
+    sort_transactions,
+)
+from app.segments import with_segments
+from app.storage import (
+    BUSINESS_DATA_FILE,
+    TRANSACTION_DATA_FILE,
+    read_version,
+)
+
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "maaser_exports")
+ARTIFACT_TTL = 24 * 60 * 60
+MAX_ARTIFACTS = 50
+
+TRANSACTION_FILTERS = (
+    "search_query",
+    "filter_type",
+    "filter_start_date",
+    "filter_end_date",
+    "filter_min_amount",
+    "filter_max_amount",
+    "filter_account_id",
+)
+BUSINESS_FILTERS = ("search_query", "filter_status")
+
+CSV_EXPORTS = {
+    "transactions": (
+        TRANSACTION_DATA_FILE,
+        "type",
+        filter_transactions,
+        TRANSACTION_FILTERS,
+        TRANSACTION_SORT_FIELDS,
+        TRANSACTION_CSV_COLUMNS,
+        "maaser_transactions",
+    ),
+    "business": (
+        BUSINESS_DATA_FILE,
+        "status",
+        filter_business_transactions,
+        BUSINESS_FILTERS,
+        BUSINESS_SORT_FIELDS,
+        BUSINESS_CSV_COLUMNS,
+        "business_expenses",
+    ),
+}
+ARCHIVE_FORMATS = ("parquet", "arrow")
+
+
+def ledger_view(ledger: str, data: dict, params) -> list[int]:
+    """Positions of the filtered, sorted rows of ``ledger`` for view ``params``."""
+    _, _, filter_fn, filter_names, sort_fields, _, _ = CSV_EXPORTS[ledger]
+    filters = {name: params[name] for name in filter_names if name in params}
+    return sort_transactions(
+        data["transactions"],
+        filter_fn(data["transactions"], **filters),
+        params.get("sort_by", "date"),
+        params.get("sort_order", "desc"),
+        sort_fields,
+    )
+
+
+def load_export_data(path: str, kind_field: str, params=None) -> tuple[dict, int]:
+    """``load_ledger`` plus the archived year segments that the view
+    ``params`` reads, or all of them if ``params`` is None."""
+    data, version = load_ledger(path, kind_field)
+    archived = data.get("archive", [])
+    if params is not None:
+        filters = {name: params[name] for name in TRANSACTION_FILTERS if name in params}
+        archived = filter_segments(archived, **filters)
+    return with_segments(data, path, archived), version
+
+
+def download_filename(name: str) -> str:
+    """``name`` with today's date before its extension. Added when a file is
+    served, since cached artifacts outlive the day they were built."""
+    stem, extension = os.path.splitext(name)
+    return f"{stem}_{datetime.date.today()}{extension}"
+
+
+def csv_filename(ledger: str) -> str:
+    return f"{CSV_EXPORTS[ledger][6]}.csv"
+
+
+def archive_filename(fmt: str) -> str:
+    return f"maaser_ledger_{fmt}.zip"
+
+
+def artifact_path(key: str) -> str | None:
+    """Path of the finished artifact stored under ``key``, if there is one."""
+    directory = os.path.join(EXPORT_DIR, key)
+    with contextlib.suppress(OSError):
+        for name in os.listdir(directory):
+            return os.path.join(directory, name)
+    return None
+
+
+def prune_artifacts(now: float | None = None):
+    """Removes expired artifacts and all but the newest ``MAX_ARTIFACTS``."""
+    now = now or time.time()
+    try:
+        entries = [os.path.join(EXPORT_DIR, name) for name in os.listdir(EXPORT_DIR)]
+    except OSError:
+        return
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for i, entry in enumerate(entries):
+        if i >= MAX_ARTIFACTS or now - os.path.getmtime(entry) > ARTIFACT_TTL:
+            shutil.rmtree(entry, ignore_errors=True)
+
+
+class ExportJob:
+    """One export request; ``progress`` is updated while ``build`` runs."""
+
+    def __init__(self, ledger: str, fmt: str, params: dict[str, str] | None = None):
+        if fmt == "csv":
+            if ledger not in CSV_EXPORTS:
+                raise ValueError(f"Unknown ledger: {ledger}")
+            self.data_files = [CSV_EXPORTS[ledger][0]]
+            self.kind_fields = [CSV_EXPORTS[ledger][1]]
+            self.filename = csv_filename(ledger)
+        elif fmt in ARCHIVE_FORMATS:
+            # Archives always contain the whole ledger; filters do not apply.
+            ledger, params = "all", {}
+            self.data_files = [TRANSACTION_DATA_FILE, BUSINESS_DATA_FILE]
+            self.kind_fields = ["type", "status"]
+            self.filename = archive_filename(fmt)
+        else:
+            raise ValueError(f"Unsupported export format: {fmt}")
+        self.ledger = ledger
+        self.fmt = fmt
+        self.params = params or {}
+        self.progress = 0.0
+
+    def key(self, versions: list[int]) -> str:
+        payload = json.dumps(
+            [self.ledger, self.fmt, self.filename, sorted(self.params.items()), versions]
+        )
+        return hashlib.sha256(payload.encode()).hexdigest()[:32]
+
+    def cached(self) -> str | None:
+        """Returns the key of a finished artifact for the current data, if any."""
+        key = self.key([read_version(path) for path in self.data_files])
+        return key if artifact_path(key) else None
+
+    def _write(self, path: str, loaded: list[dict]):
+        if self.fmt == "csv":
+            positions = ledger_view(self.ledger, loaded[0], self.params)
+            rows = loaded[0]["transactions"].rows(positions)
+            with open(path, "w", newline="", encoding="utf-8") as f:
+                for i, chunk in enumerate(iter_csv_chunks(rows, CSV_EXPORTS[self.ledger][5])):
+                    f.write(chunk)
+                    if positions:
+                        self.progress = min(i * CSV_CHUNK_ROWS / len(positions), 1.0)
+        else:
+            # pyarrow is slow to import, so only load it for archive exports.
+            from app.exporters import write_ledger_archive
+
+            def on_progress(fraction: float):
+                self.progress = fraction
+
+            write_ledger_archive(path, self.fmt, loaded[0], loaded[1], on_progress)
+
+    def build(self) -> str:
+        """Writes the artifact and returns its key. Blocking; run in a thread."""
+        with metrics.EXPORT_SECONDS.time(ledger=self.ledger, format=self.fmt):
+            return self._build()
+
+    def _build(self) -> str:
+        loaded, versions = [], []
+        for path, kind_field in zip(self.data_files, self.kind_fields):
+            data, version = load_export_data(
+                path, kind_field, self.params if self.fmt == "csv" else None
+            )
+            loaded.append(data)
+            versions.append(version)
+        key = self.key(versions)
+        if artifact_path(key):
+            return key
+        os.makedirs(EXPORT_DIR, exist_ok=True)
+        tmp_dir = tempfile.mkdtemp(dir=EXPORT_DIR, prefix=".tmp-")
+        try:
+            self._write(os.path.join(tmp_dir, self.filename), loaded)
+            os.rename(tmp_dir, os.path.join(EXPORT_DIR, key))
+        except OSError:
+            # Another worker finished the same artifact first; keep theirs.
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if not artifact_path(key):
+                raise
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        self.progress = 1.0
+        prune_artifacts()
+        return key
@@ -0,0 +1,211 @@
+"""Typed columnar export of the ledger as Parquet or Arrow IPC files.
+
+Dates are written as ``date32``, amounts as ``decimal128(18, 2)`` and
+transaction types / business statuses as dictionary-encoded strings with a
+fixed dictionary, so every batch shares it and readers get categoricals.
+Rows are converted and written one row group at a time; a full ledger is
+never held as one Arrow table.
+"""
+
+import os
+import tempfile
+import zipfile
+from typing import Callable
+
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
+
+from app.records import Ledger
+
+ROW_GROUP_SIZE = 65536
+EXPORT_FORMATS = {"parquet": ".parquet", "arrow": ".arrow"}
+
+AMOUNT_TYPE = pa.decimal128(18, 2)
+TRANSACTION_TYPES = pa.array(["income", "maaser"])
+BUSINESS_STATUSES = pa.array(["pending", "reimbursed"])
+KIND_TYPE = pa.dictionary(pa.int8(), pa.string())
+_EPOCH_ORDINAL = 719163  # date(1970, 1, 1).toordinal()
+
+TRANSACTION_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("date", pa.date32()),
+        ("type", KIND_TYPE),
+        ("amount", AMOUNT_TYPE),
+        ("memo", pa.string()),
+        ("account_id", pa.string()),
+        ("verified", pa.bool_()),
+    ]
+)
+ACCOUNT_SCHEMA = pa.schema([("id", pa.string()), ("name", pa.string())])
+BUSINESS_SCHEMA = pa.schema(
+    [
+        ("id", pa.string()),
+        ("date", pa.date32()),
+        ("status", KIND_TYPE),
+        ("amount", AMOUNT_TYPE),
+        ("memo", pa.string()),
+        ("account_id", pa.string()),
+    ]
+)
+
+
+def _buffer_array(type_: pa.DataType, values) -> pa.Array:
+    """Wraps an ``array.array``/``bytearray`` of fixed-width values without a copy."""
+    return pa.Array.from_buffers(type_, len(values), [None, pa.py_buffer(values)])
+
+
+def _ledger_column(
+    ledger: Ledger,
+    field: pa.Field,
+    start: int,
+    stop: int,
+    dictionary: pa.Array | None,
+    verified: set[str] | None,
+) -> pa.Array:
+    if field.name == "id":
+        return pa.array([ledger.id_at(i) for i in range(start, stop)], pa.string())
+    if field.name == "verified":
+        return pa.array([ledger.id_at(i) in verified for i in range(start, stop)])
+    if field.type == AMOUNT_TYPE:
+        # Integer cents are the decimal's unscaled value, so reinterpret them
+        # at scale 2 rather than dividing.
+        cents = _buffer_array(pa.int64(), ledger.cents[start:stop])
+        cents = cents.cast(pa.decimal128(19, 0))
+        return cents.view(pa.decimal128(19, 2)).cast(AMOUNT_TYPE)
+    if field.type == pa.date32():
+        ordinals = _buffer_array(pa.int32(), ledger.date_ordinals[start:stop])
+        epoch = pa.scalar(_EPOCH_ORDINAL, pa.int32())
+        return pc.subtract(ordinals, epoch).view(pa.date32())
+    if pa.types.is_dictionary(field.type):
+        # Map the ledger's kind codes onto the fixed dictionary's positions.
+        kinds = pa.array(ledger.kinds, pa.string())
+        positions = pc.index_in(kinds, value_set=dictionary)
+        codes = _buffer_array(pa.uint8(), ledger.kind_codes[start:stop])
+        indices = pc.take(positions.cast(pa.int8()), codes)
+        return pa.DictionaryArray.from_arrays(indices, dictionary)
+    if field.name == "memo":
+        codes = _buffer_array(pa.int32(), ledger.memo_codes[start:stop])
+        return pc.take(pa.array(ledger.memo_values, pa.string()), codes)
+    if field.name == "account_id":
+        codes = _buffer_array(pa.int32(), ledger.account_codes[start:stop])
+        return pc.take(pa.array(ledger.account_ids, pa.string()), codes)
+    raise ValueError(f"No ledger column for field: {field.name}")
+
+
+def iter_ledger_batches(
+    ledger: Ledger,
+    schema: pa.Schema,
+    dictionary: pa.Array,
+    verified: set[str] | None = None,
+    batch_size: int = ROW_GROUP_SIZE,
+):
+    """Yields a ``Ledger`` as typed record batches of at most ``batch_size`` rows.
+
+    Amounts, dates and kinds are converted from the ledger's columns in bulk;
+    no per-row dicts are built.
+    """
+    for start in range(0, len(ledger), batch_size):
+        stop = min(start + batch_size, len(ledger))
+        columns = [
+            _ledger_column(ledger, field, start, stop, dictionary, verified)
+            for field in schema
+        ]
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def iter_record_batches(
+    rows: list[dict], schema: pa.Schema, batch_size: int = ROW_GROUP_SIZE
+):
+    """Yields plain dict ``rows`` as record batches of at most ``batch_size`` rows."""
+    for start in range(0, len(rows), batch_size):
+        chunk = rows[start : start + batch_size]
+        columns = [
+            pa.array([row.get(field.name) for row in chunk], field.type)
+            for field in schema
+        ]
+        yield pa.RecordBatch.from_arrays(columns, schema=schema)
+
+
+def write_table_file(path: str, fmt: str, schema: pa.Schema, batches):
+    """Writes batches to a Parquet (one row group per batch) or Arrow file."""
+    if fmt == "parquet":
+        with pq.ParquetWriter(path, schema, compression="zstd") as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    elif fmt == "arrow":
+        options = pa.ipc.IpcWriteOptions(compression="zstd")
+        with pa.ipc.new_file(path, schema, options=options) as writer:
+            for batch in batches:
+                writer.write_batch(batch)
+    else:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+
+def _reporting(batches, counter: list[int], total: int, on_progress):
+    for batch in batches:
+        yield batch
+        counter[0] += batch.num_rows
+        on_progress(counter[0] / total)
+
+
+def write_ledger_archive(
+    path: str,
+    fmt: str,
+    main_data: dict,
+    business_data: dict,
+    on_progress: Callable[[float], None] | None = None,
+):
+    """Writes transactions, accounts and business expenses into a zip at ``path``.
+
+    ``main_data`` and ``business_data`` are as returned by ``load_ledger``.
+    ``on_progress`` is called with the fraction of rows written after each
+    batch.
+    """
+    extension = EXPORT_FORMATS[fmt]
+    verified = set(main_data.get("verified_transactions", []))
+    total = sum(
+        len(rows)
+        for rows in (
+            main_data["transactions"],
+            main_data.get("accounts", []),
+            business_data["transactions"],
+        )
+    )
+    written = [0]
+    tables = [
+        (
+            "transactions",
+            TRANSACTION_SCHEMA,
+            iter_ledger_batches(
+                main_data["transactions"],
+                TRANSACTION_SCHEMA,
+                TRANSACTION_TYPES,
+                verified,
+            ),
+        ),
+        (
+            "accounts",
+            ACCOUNT_SCHEMA,
+            iter_record_batches(main_data.get("accounts", []), ACCOUNT_SCHEMA),
+        ),
+        (
+            "business_expenses",
+            BUSINESS_SCHEMA,
+            iter_ledger_batches(
+                business_data["transactions"],
+                BUSINESS_SCHEMA,
+                BUSINESS_STATUSES,
+            ),
+        ),
+    ]
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Parquet and Arrow files are already compressed, so store them as-is.
+        with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as archive:
+            for name, schema, batches in tables:
+                if on_progress and total:
+                    batches = _reporting(batches, written, total, on_progress)
+                table_path = os.path.join(tmp_dir, f"{name}{extension}")
+                write_table_file(table_path, fmt, schema, batches)
+                archive.write(table_path, f"{name}{extension}")
@@ -0,0 +1,565 @@
+"""Streaming import of transaction files.
+
+Uploads are parsed item by item as bytes arrive, validated row by row, and
+accepted rows are staged on disk in batches, so memory use stays bounded no
+matter how large the file is. The preview reads pages back from the staged
+file and only summary statistics are kept in memory. Nothing here depends on
+Reflex.
+"""
+
+import asyncio
+import codecs
+import contextlib
+import datetime
+import json
+import logging
+import os
+import tempfile
+import uuid
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING
+from app.money import from_cents, to_cents
+from app.statement_parsers import (
+    DEBIT,
+    STATEMENT_EXTENSIONS,
+    CsvStatementParser,
+    OfxStatementParser,
+    QifStatementParser,
+)
+
+if TYPE_CHECKING:
+    from concurrent.futures import ProcessPoolExecutor
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+IMPORT_BATCH_SIZE = 500
+IMPORT_PAGE_SIZE = 20
+MAX_ITEM_CHARS = 1024 * 1024
+
+_import_pool = None
+
+
+class ImportFormatError(ValueError):
+    """Raised when the imported document is not an array of objects."""
+
+
+class InvalidRowError(ValueError):
+    """Raised by row validators; the message is the reason shown to the user."""
+
+
+class JsonArrayParser:
+    """Incrementally parses a top-level JSON array, one item at a time.
+
+    Feed text in arbitrary slices with ``feed``; each call returns the items
+    completed so far. Call ``close`` once the input is exhausted.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._state = "start"
+
+    def feed(self, text: str, final: bool = False) -> list:
+        buffer = self._buffer + text
+        items = []
+        pos = 0
+        length = len(buffer)
+        while True:
+            while pos < length and buffer[pos] in " \t\r\n":
+                pos += 1
+            if pos >= length:
+                break
+            char = buffer[pos]
+            if self._state == "start":
+                if char != "[":
+                    raise ImportFormatError("Expected a JSON array.")
+                pos += 1
+                self._state = "first"
+            elif self._state in ("first", "item"):
+                if self._state == "first" and char == "]":
+                    pos += 1
+                    self._state = "done"
+                    continue
+                try:
+                    item, end = self._decoder.raw_decode(buffer, pos)
+                except json.JSONDecodeError:
+                    if final:
+                        raise
+                    break
+                if end == length and not final and not isinstance(item, (dict, list)):
+                    # A scalar at the end of the buffer may still be growing.
+                    break
+                items.append(item)
+                pos = end
+                self._state = "sep"
+            elif self._state == "sep":
+                if char == ",":
+                    self._state = "item"
+                elif char == "]":
+                    self._state = "done"
+                else:
+                    raise json.JSONDecodeError("Expected ',' or ']'", buffer, pos)
+                pos += 1
+            else:
+                raise json.JSONDecodeError("Extra data", buffer, pos)
+        self._buffer = buffer[pos:]
+        if len(self._buffer) > MAX_ITEM_CHARS:
+            raise json.JSONDecodeError("Array item too large", self._buffer, 0)
+        return items
+
+    def close(self) -> list:
+        """Flushes the remaining input and checks that the array was closed."""
+        items = self.feed("", final=True)
+        if self._state == "start":
+            raise ImportFormatError("Expected a JSON array.")
+        if self._state != "done":
+            raise json.JSONDecodeError("Unterminated array", self._buffer, 0)
+        return items
+
+
+def make_parser(fmt: str, kind: str, csv_columns: dict[str, str] | None = None):
+    """Returns an incremental parser for ``fmt`` (json, csv, ofx or qif)."""
+    if fmt == "csv":
+        return CsvStatementParser(kind, csv_columns)
+    if fmt == "ofx":
+        return OfxStatementParser(kind)
+    if fmt == "qif":
+        return QifStatementParser(kind)
+    return JsonArrayParser()
+
+
+def format_for_filename(filename: str | None) -> str:
+    """Picks the statement format from a file extension, defaulting to JSON."""
+    extension = os.path.splitext(filename or "")[1].lower()
+    return STATEMENT_EXTENSIONS.get(extension, "json")
+
+
+def _validate_date(item: dict):
+    try:
+        datetime.date.fromisoformat(item["date"])
+    except (TypeError, ValueError):
+        raise InvalidRowError("Date is not YYYY-MM-DD")
+
+
+def _text_fields(item: dict) -> tuple[str, str | None]:
+    """The memo and account id of ``item`` as text; numbers in JSON or
+    numeric statement cells are kept as their digits."""
+    memo, account_id = item.get("memo"), item.get("account_id")
+    for value in (memo, account_id):
+        if value is not None and (
+            isinstance(value, bool) or not isinstance(value, (str, int, float))
+        ):
+            raise InvalidRowError("Memo or account is not text")
+    return (
+        "" if memo is None else str(memo),
+        None if account_id is None else str(account_id),
+    )
+
+
+def parse_transaction_item(item) -> dict:
+    """Validates one imported income/maaser item into a transaction row."""
+    if not isinstance(item, dict):
+        raise InvalidRowError("Not an object")
+    if not all((k in item for k in ["type", "amount", "date"])):
+        raise InvalidRowError("Missing type, amount or date")
+    if item["type"] == DEBIT:
+        raise InvalidRowError(
+            "Debit without a type: only a CSV type column can say if it is maaser"
+        )
+    if item["type"] not in ["income", "maaser"]:
+        raise InvalidRowError("Type is not income or maaser")
+    _validate_date(item)
+    try:
+        cents = to_cents(item["amount"])
+    except (ValueError, TypeError):
+        raise InvalidRowError("Amount is not a number")
+    memo, account_id = _text_fields(item)
+    return {
+        "id": str(uuid.uuid4()),
+        "type": item["type"],
+        "amount": from_cents(cents),
+        "amount_cents": cents,
+        "date": item["date"],
+        "memo": memo,
+        "account_id": account_id,
+    }
+
+
+def parse_business_item(item) -> dict:
+    """Validates one imported business expense item into an expense row."""
+    if not isinstance(item, dict):
+        raise InvalidRowError("Not an object")
+    # Required fields: amount, date. Optional: memo, status, account_id
+    if not all((k in item for k in ["amount", "date"])):
+        raise InvalidRowError("Missing amount or date")
+    _validate_date(item)
+    try:
+        cents = to_cents(item["amount"])
+    except (ValueError, TypeError):
+        raise InvalidRowError("Amount is not a number")
+    memo, account_id = _text_fields(item)
+    status = item.get("status", "pending")
+    if status not in ["pending", "reimbursed"]:
+        status = "pending"
+    return {
+        "id": str(uuid.uuid4()),
+        "amount": from_cents(cents),
+        "amount_cents": cents,
+        "date": item["date"],
+        "memo": memo,
+        "status": status,
+        "account_id": account_id,
+    }
+
+
+IMPORT_KINDS = {
+    "transaction": (parse_transaction_item, "type"),
+    "business": (parse_business_item, "status"),
+}
+
+
+class ImportSpool:
+    """Accepted import rows staged in a JSON-lines temp file, written in batches.
+
+    Records the byte offset of every ``page_size``-th row so any preview page
+    can be read back without scanning the file.
+    """
+
+    def __init__(
+        self, batch_size: int = IMPORT_BATCH_SIZE, page_size: int = IMPORT_PAGE_SIZE
+    ):
+        fd, self.path = tempfile.mkstemp(prefix="maaser_import_", suffix=".jsonl")
+        self._file = os.fdopen(fd, "wb")
+        self._batch_size = batch_size
+        self._page_size = page_size
+        self._batch = []
+        self._offset = 0
+        self.page_offsets = []
+        self.count = 0
+
+    def add(self, row: dict):
+        line = (json.dumps(row) + "\n").encode("utf-8")
+        if self.count % self._page_size == 0:
+            self.page_offsets.append(self._offset)
+        self._batch.append(line)
+        self._offset += len(line)
+        self.count += 1
+        if len(self._batch) >= self._batch_size:
+            self.flush()
+
+    def flush(self):
+        if self._batch:
+            self._file.write(b"".join(self._batch))
+            self._batch = []
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+
+def iter_spool_batches(path: str, batch_size: int = IMPORT_BATCH_SIZE):
+    """Yields staged rows from a spool file in lists of up to ``batch_size``."""
+    batch = []
+    with open(path, "rb") as f:
+        for line in f:
+            batch.append(json.loads(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+
+def iter_accepted_batches(path: str, skip_matches: set[str]):
+    """Yields staged rows in batches, dropping rows whose match class is skipped."""
+    for batch in iter_spool_batches(path):
+        kept = [row for row in batch if row.pop("match", "new") not in skip_matches]
+        if kept:
+            yield kept
+
+
+def read_spool_page(path: str, offset: int, limit: int = IMPORT_PAGE_SIZE) -> list:
+    """Reads up to ``limit`` staged rows starting at byte ``offset``."""
+    rows = []
+    with open(path, "rb") as f:
+        f.seek(offset)
+        for line in f:
+            rows.append(json.loads(line))
+            if len(rows) >= limit:
+                break
+    return rows
+
+
+def normalize_memo(memo: str | None) -> str:
+    return " ".join((memo or "").lower().split())
+
+
+def _date_ordinal(date: str) -> int | None:
+    try:
+        return datetime.date.fromisoformat(date).toordinal()
+    except (TypeError, ValueError):
+        return None
+
+
+class DuplicateIndex:
+    """Fingerprint index of an existing ledger for import-time duplicate screening.
+
+    A row is an exact duplicate when a ledger row has the same date, amount in
+    cents, kind (type or status) and normalized memo. It is a near duplicate
+    when a ledger row has the same amount and kind within one day, which is
+    the rule the ledger's own duplicate check uses. Lookups are O(1).
+    """
+
+    def __init__(self, rows, kind_key: str):
+        self.kind_key = kind_key
+        self._fingerprints = set()
+        self._dates_by_amount = defaultdict(set)
+        for row in rows:
+            self.add(row)
+
+    def _amount_key(self, row: dict) -> tuple:
+        return (row["amount_cents"], row[self.kind_key])
+
+    def add(self, row: dict):
+        amount_key = self._amount_key(row)
+        self._fingerprints.add((row["date"], *amount_key, normalize_memo(row["memo"])))
+        ordinal = _date_ordinal(row["date"])
+        if ordinal is not None:
+            self._dates_by_amount[amount_key].add(ordinal)
+
+    def update(self, other: "DuplicateIndex"):
+        """Adds every fingerprint of ``other`` to this index."""
+        self._fingerprints |= other._fingerprints
+        for amount_key, dates in other._dates_by_amount.items():
+            self._dates_by_amount[amount_key] |= dates
+
+    def classify(self, row: dict) -> str:
+        """Returns ``"exact"``, ``"near"`` or ``"new"`` for an incoming row."""
+        amount_key = self._amount_key(row)
+        if (row["date"], *amount_key, normalize_memo(row["memo"])) in self._fingerprints:
+            return "exact"
+        dates = self._dates_by_amount.get(amount_key)
+        ordinal = _date_ordinal(row["date"])
+        if dates and ordinal is not None:
+            if ordinal in dates or ordinal - 1 in dates or ordinal + 1 in dates:
+                return "near"
+        return "new"
+
+
+def discard_spool(path: str):
+    if path:
+        with contextlib.suppress(OSError):
+            os.unlink(path)
+
+
+class ImportStage:
+    """Validated import rows staged in an ``ImportSpool`` with summary statistics.
+
+    Only summary statistics are kept in memory: the number of valid rows,
+    their date range, amount totals grouped by ``group_by``, a count of
+    rejected rows per reason and, when a ``DuplicateIndex`` is given, how many
+    rows are new, exact or near duplicates. Each staged row carries its
+    classification under ``"match"``.
+    """
+
+    def __init__(self, group_by: str, index: DuplicateIndex | None = None):
+        self._group_by = group_by
+        self._index = index
+        self.spool = ImportSpool()
+        self.min_date = ""
+        self.max_date = ""
+        self.totals_cents = {}
+        self.invalid_reasons = Counter()
+        self.match_counts = Counter()
+
+    @property
+    def totals(self) -> dict[str, float]:
+        return {group: from_cents(cents) for group, cents in self.totals_cents.items()}
+
+    @property
+    def invalid_count(self) -> int:
+        return sum(self.invalid_reasons.values())
+
+    def add(self, row: dict):
+        row["match"] = self._index.classify(row) if self._index else "new"
+        self.match_counts[row["match"]] += 1
+        self.spool.add(row)
+        date = row["date"]
+        if not self.min_date or date < self.min_date:
+            self.min_date = date
+        if date > self.max_date:
+            self.max_date = date
+        group = row[self._group_by]
+        self.totals_cents[group] = self.totals_cents.get(group, 0) + row["amount_cents"]
+
+    def finish(self):
+        self.spool.close()
+
+    def abort(self):
+        self.spool.close()
+        discard_spool(self.spool.path)
+
+
+class StreamingImport(ImportStage):
+    """Streams an import file through a row validator into an ``ImportSpool``.
+
+    ``parser`` is any incremental parser from ``make_parser``; the default
+    parses a JSON array.
+    """
+
+    def __init__(
+        self,
+        validate,
+        group_by: str,
+        index: DuplicateIndex | None = None,
+        parser=None,
+    ):
+        super().__init__(group_by, index)
+        self._validate = validate
+        self._parser = parser or JsonArrayParser()
+        self._text_decoder = codecs.getincrementaldecoder("utf-8")()
+
+    def _accept(self, items: list):
+        for item in items:
+            try:
+                row = self._validate(item)
+            except InvalidRowError as e:
+                self.invalid_reasons[str(e)] += 1
+                continue
+            self.add(row)
+
+    def feed_bytes(self, chunk: bytes):
+        self._accept(self._parser.feed(self._text_decoder.decode(chunk)))
+
+    def feed_text(self, text: str):
+        for start in range(0, len(text), UPLOAD_CHUNK_SIZE):
+            self._accept(self._parser.feed(text[start : start + UPLOAD_CHUNK_SIZE]))
+
+    def finish(self):
+        """Completes parsing and closes the spool; raises on malformed input."""
+        try:
+            self._accept(self._parser.feed(self._text_decoder.decode(b"", final=True)))
+            self._accept(self._parser.close())
+        finally:
+            super().finish()
+
+
+def describe_import_error(e: Exception, fmt: str = "json") -> str:
+    """User-facing message for an import of format ``fmt`` that failed as a whole."""
+    if isinstance(e, UnicodeDecodeError):
+        return "The file is not valid UTF-8 text."
+    if fmt != "json":
+        return f"Invalid {fmt.upper()} statement: {e}"
+    if isinstance(e, ImportFormatError):
+        return "Invalid JSON format: must be an array of objects."
+    if isinstance(e, json.JSONDecodeError):
+        return "Invalid JSON. Please check the syntax."
+    return f"An unexpected error occurred: {e}"
+
+
+def get_import_pool() -> "ProcessPoolExecutor":
+    """Process pool shared by all sessions for parsing uploaded files.
+
+    Workers are spawned rather than forked so they never inherit the server's
+    threads or event loop; this module has no Reflex imports, so they start
+    quickly.
+    """
+    # multiprocessing takes a while to import and most processes never
+    # import a file, so it is loaded with the first pool.
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+
+    global _import_pool
+    if _import_pool is None:
+        _import_pool = ProcessPoolExecutor(
+            mp_context=multiprocessing.get_context("spawn")
+        )
+    return _import_pool
+
+
+async def run_in_import_pool(fn, *args):
+    """Runs ``fn`` in the import pool, replacing the pool if a worker died."""
+    from concurrent.futures.process import BrokenProcessPool
+
+    global _import_pool
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_import_pool(), fn, *args)
+    except BrokenProcessPool:
+        _import_pool = None
+        raise
+
+
+async def copy_upload_to_temp(upload) -> str:
+    """Copies an uploaded file to a temp file in chunks and returns its path."""
+    fd, path = tempfile.mkstemp(prefix="maaser_upload_")
+    with os.fdopen(fd, "wb") as f:
+        while chunk := await upload.read(UPLOAD_CHUNK_SIZE):
+            f.write(chunk)
+    return path
+
+
+def stage_import_file(
+    path: str, fmt: str, kind: str, csv_columns: dict[str, str] | None = None
+) -> dict:
+    """Parses and validates one file into its own spool; runs in a pool worker.
+
+    ``kind`` is ``"transaction"`` or ``"business"``. Returns the spool path
+    (empty on failure), the rejected-row reasons and an error message.
+    """
+    validate, group_by = IMPORT_KINDS[kind]
+    importer = StreamingImport(
+        validate, group_by, parser=make_parser(fmt, kind, csv_columns)
+    )
+    try:
+        with open(path, "rb") as f:
+            while chunk := f.read(UPLOAD_CHUNK_SIZE):
+                importer.feed_bytes(chunk)
+        importer.finish()
+    except Exception as e:
+        logging.warning(f"Could not stage import file {path}: {e}")
+        importer.abort()
+        return {"spool": "", "invalid_reasons": {}, "error": describe_import_error(e, fmt)}
+    return {
+        "spool": importer.spool.path,
+        "invalid_reasons": dict(importer.invalid_reasons),
+        "error": "",
+    }
+
+
+def merge_staged_files(
+    results: list[dict], group_by: str, index: DuplicateIndex
+) -> ImportStage:
+    """Merges per-file spools into one stage and screens them for duplicates.
+
+    Rows are checked against the ledger and against the files merged before
+    them, so overlapping statements are caught too. The per-file spools are
+    deleted, even if merging fails. Blocking; the app runs it in a thread.
+    """
+    stage = ImportStage(group_by, index)
+    try:
+        for result in results:
+            stage.invalid_reasons.update(result["invalid_reasons"])
+            if not result["spool"]:
+                continue
+            file_index = DuplicateIndex([], index.kind_key)
+            for batch in iter_spool_batches(result["spool"]):
+                for row in batch:
+                    stage.add(row)
+                    file_index.add(row)
+            discard_spool(result["spool"])
+            index.update(file_index)
+    except BaseException:
+        stage.abort()
+        raise
+    finally:
+        for result in results:
+            discard_spool(result["spool"])
+    stage.finish()
+    return stage
+
+
+def discard_staged_file(job: "asyncio.Future"):
+    """Done callback of a ``stage_import_file`` job: deletes its spool, for
+    jobs whose result is not merged."""
+    if not job.cancelled() and job.exception() is None:
+        discard_spool(job.result()["spool"])
@@ -0,0 +1,276 @@
+"""Loading, filtering, sorting and CSV rendering of ledger rows.
+
+These are plain functions over a ``records.Ledger`` so that the states'
+computed vars, the export endpoints and command-line tools all produce the
+same view. Nothing here depends on Reflex.
+
+Filters and sorts work on row positions; dicts are only built for the rows
+that are displayed or written out (``Ledger.rows``). Rows are persisted with
+integer ``amount_cents``; files that still store float amounts are migrated
+on load.
+
+The last ledger loaded or saved from each file is kept per process, so
+loading an unchanged file again copies it instead of parsing it.
+"""
+
+import copy
+import csv
+import logging
+import os
+from collections import defaultdict
+
+from app.money import from_cents, to_cents
+from app.records import BUSINESS_KINDS, TRANSACTION_KINDS, Ledger
+from app.segments import Segment, needed
+from app.storage import load_data, read_version, save_data
+
+CSV_CHUNK_ROWS = 1000
+
+TRANSACTION_CSV_COLUMNS = [
+    ("ID", "id"),
+    ("Type", "type"),
+    ("Amount", "amount"),
+    ("Date", "date"),
+    ("Memo", "memo"),
+]
+BUSINESS_CSV_COLUMNS = [
+    ("ID", "id"),
+    ("Date", "date"),
+    ("Memo", "memo"),
+    ("Amount", "amount"),
+    ("Status", "status"),
+]
+TRANSACTION_SORT_FIELDS = ("date", "amount", "type")
+BUSINESS_SORT_FIELDS = ("date", "amount", "status")
+
+
+LEDGER_KINDS = {"type": TRANSACTION_KINDS, "status": BUSINESS_KINDS}
+
+# (absolute path, kind field) -> (file stamp, version, data) of the last load
+# or save. Callers only ever get copies, so no two sessions share a ledger.
+_parsed: dict[tuple[str, str], tuple[tuple, int, dict]] = {}
+
+
+def _file_stamp(path: str) -> tuple:
+    """Changes whenever the file does: its version, size and modification time."""
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return (0,)
+    return (read_version(path), stat.st_size, stat.st_mtime_ns)
+
+
+def _copy_data(data: dict) -> dict:
+    rest = copy.deepcopy({k: v for k, v in data.items() if k != "transactions"})
+    return {**rest, "transactions": data["transactions"].copy()}
+
+
+def load_ledger(path: str, kind_field: str = "type") -> tuple[dict, int]:
+    """Like ``storage.load_data``, with the transactions loaded into a ``Ledger``.
+
+    ``kind_field`` is ``"type"`` for the main ledger and ``"status"`` for
+    business expenses. Files that still store float amounts are migrated.
+    """
+    key = (os.path.abspath(path), kind_field)
+    stamp = _file_stamp(path)
+    cached = _parsed.get(key)
+    if cached is not None and cached[0] == stamp:
+        return _copy_data(cached[2]), cached[1]
+    data, version = load_data(path)
+    data["transactions"] = Ledger.from_rows(
+        data.get("transactions", []), kind_field, LEDGER_KINDS[kind_field]
+    )
+    _remember(key, stamp, version, data)
+    return data, version
+
+
+def _remember(key: tuple[str, str], stamp: tuple, version: int, data: dict):
+    """Caches ``data`` under ``stamp`` if the stamp is of that version.
+
+    The stamp is taken outside the write lock, so another worker may have
+    saved in between; its file must not be taken for ours.
+    """
+    if stamp[0] == version:
+        _parsed[key] = (stamp, version, _copy_data(data))
+    else:
+        _parsed.pop(key, None)
+
+
+def save_ledger(path: str, data: dict, expected_version: int) -> int:
+    """Like ``storage.save_data``, storing the ``Ledger`` rows with integer cents."""
+    ledger = data["transactions"]
+    version = save_data(
+        path, {**data, "transactions": ledger.to_rows()}, expected_version
+    )
+    _remember((os.path.abspath(path), ledger.kind_field), _file_stamp(path), version, data)
+    return version
+
+
+def _amount_cents(value: str) -> int | None:
+    if not value:
+        return None
+    try:
+        return to_cents(value)
+    except ValueError as e:
+        logging.exception(f"Error: {e}")
+        return None
+
+
+def filter_transactions(
+    ledger: Ledger,
+    search_query: str = "",
+    filter_type: str = "all",
+    filter_start_date: str = "",
+    filter_end_date: str = "",
+    filter_min_amount: str = "",
+    filter_max_amount: str = "",
+    filter_account_id: str = "all",
+) -> list[int]:
+    """Positions of the income/maaser transactions matching search and filters."""
+    return ledger.select(
+        search_query,
+        filter_type,
+        filter_start_date,
+        filter_end_date,
+        _amount_cents(filter_min_amount),
+        _amount_cents(filter_max_amount),
+        filter_account_id,
+    )
+
+
+def filter_segments(
+    segments: list[Segment],
+    search_query: str = "",
+    filter_type: str = "all",
+    filter_start_date: str = "",
+    filter_end_date: str = "",
+    filter_min_amount: str = "",
+    filter_max_amount: str = "",
+    filter_account_id: str = "all",
+) -> list[Segment]:
+    """The archived year segments that ``filter_transactions`` has to read."""
+    return needed(
+        segments,
+        search_query,
+        filter_type,
+        filter_start_date,
+        filter_end_date,
+        _amount_cents(filter_min_amount),
+        _amount_cents(filter_max_amount),
+        filter_account_id,
+    )
+
+
+def filter_business_transactions(
+    ledger: Ledger, search_query: str = "", filter_status: str = "all"
+) -> list[int]:
+    """Positions of the business expenses matching search and the status filter."""
+    return ledger.select(search_query, filter_status)
+
+
+def sort_transactions(
+    ledger: Ledger,
+    indices: list[int],
+    sort_by: str = "date",
+    sort_order: str = "desc",
+    fields: tuple[str, ...] = TRANSACTION_SORT_FIELDS,
+) -> list[int]:
+    """Sorts positions by one of ``fields``; unknown fields sort by date."""
+    if sort_by not in fields:
+        sort_by = "date"
+    return ledger.sort(indices, sort_by, sort_order == "desc")
+
+
+def maaser_summary(ledger: Ledger) -> dict[str, float]:
+    """Total income, total maaser, maaser due and the percentage given.
+
+    Sums are exact in cents; the due amount (a tenth of income less maaser)
+    is converted to a float only once, at the end. Anything with a
+    ``sum_cents(kind)`` method works, e.g. an ``analytics.LedgerAnalytics``.
+    """
+    income = ledger.sum_cents("income")
+    maaser = ledger.sum_cents("maaser")
+    if income:
+        percentage = maaser / income * 100
+    else:
+        percentage = 100.0 if maaser > 0 else 0.0
+    return {
+        "income": from_cents(income),
+        "maaser": from_cents(maaser),
+        "due": (income - 10 * maaser) / 1000,
+        "percentage": percentage,
+    }
+
+
+def monthly_totals(ledger: Ledger) -> list[dict]:
+    """Amount totals per ``YYYY-MM`` month and kind, oldest first."""
+    months = ledger.monthly_cents()
+    return [
+        {
+            "month": month,
+            **{kind: from_cents(cents) for kind, cents in months[month].items()},
+        }
+        for month in sorted(months)
+    ]
+
+
+def duplicate_groups(
+    ledger: Ledger, verified: set[str] = frozenset(), match_memo: bool = False
+) -> list[list[int]]:
+    """Groups positions of unverified rows with equal amounts a day or less apart.
+
+    With ``match_memo`` the memos must be equal too. Rows sharing a key are
+    sorted by date and chained while consecutive dates are at most one day
+    apart, so every row in a returned group has a neighbour it may duplicate.
+    """
+    # Reading the columns compacts away deleted rows, which moves positions,
+    # so the verified rows are looked up after.
+    dates, cents, memos = ledger.date_ordinals, ledger.cents, ledger.memo_codes
+    skipped = {ledger.index_of(id_) for id_ in verified}
+    by_key = defaultdict(list)
+    for i in range(len(ledger)):
+        if i in skipped:
+            continue
+        by_key[(cents[i], memos[i]) if match_memo else cents[i]].append(i)
+    groups = []
+    for rows in by_key.values():
+        if len(rows) < 2:
+            continue
+        rows.sort(key=dates.__getitem__)
+        group = [rows[0]]
+        for previous, i in zip(rows, rows[1:]):
+            if dates[i] - dates[previous] > 1:
+                if len(group) > 1:
+                    groups.append(group)
+                group = []
+            group.append(i)
+        if len(group) > 1:
+            groups.append(group)
+    return groups
+
+
+class _LineBuffer:
+    """File-like sink that lets ``csv.writer`` hand back written text."""
+
+    def __init__(self):
+        self.parts = []
+
+    def write(self, text: str):
+        self.parts.append(text)
+
+    def drain(self) -> str:
+        text = "".join(self.parts)
+        self.parts = []
+        return text
+
+
+def iter_csv_chunks(transactions, columns: list[tuple[str, str]]):
+    """Yields CSV text in chunks of ``CSV_CHUNK_ROWS`` rows, header first."""
+    buffer = _LineBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow([header for header, _ in columns])
+    for i, t in enumerate(transactions, start=1):
+        writer.writerow([t[key] for _, key in columns])
+        if i % CSV_CHUNK_ROWS == 0:
+            yield buffer.drain()
+    yield buffer.drain()
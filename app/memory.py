@@ -0,0 +1,212 @@
+"""Memory diagnostics: per-session state var sizes and tracemalloc diffs.
+
+They are served under ``/diagnostics`` only when the backend is started
+with ``MAASER_DIAGNOSTICS=1`` (``diagnostics_enabled``): sizing a session
+walks its whole state, and tracing slows down every allocation.
+
+``session_report`` walks one session held by the backend's state manager
+and sizes every var of every state: its approximate memory footprint
+(following references, like a deep ``sys.getsizeof``) and its serialized
+size, as JSON for vars sent to the browser and as a pickle for backend vars
+(the form a Redis state manager would store). Cached computed var values are
+reported as ``<name> (cached)``. Memory shared between vars is counted once,
+for the var walked first: backend vars, then plain vars, then caches.
+
+``start_tracing`` and ``allocation_diff`` wrap ``tracemalloc`` to show which
+lines allocated the memory that appeared between two calls.
+"""
+
+import os
+import pickle
+import sys
+import tracemalloc
+from types import BuiltinFunctionType, FunctionType, MethodType, ModuleType
+from typing import TypedDict
+
+from reflex.utils.format import json_dumps
+
+# Leaves: counted with getsizeof, nothing inside them is followed.
+_ATOMIC = (str, bytes, bytearray, memoryview, int, float, complex, bool, type(None))
+# Shared by the whole process, not owned by any state.
+_SKIPPED = (type, ModuleType, FunctionType, BuiltinFunctionType, MethodType)
+
+DIAGNOSTICS_ENV = "MAASER_DIAGNOSTICS"
+TRACEMALLOC_FRAMES = 1
+_last_snapshot: tracemalloc.Snapshot | None = None
+
+
+class VarSize(TypedDict):
+    state: str
+    var: str
+    memory_bytes: int
+    serialized_bytes: int | None
+
+
+class SessionSize(TypedDict):
+    token: str
+    memory_bytes: int
+    vars: list[VarSize]
+
+
+class AllocationDiff(TypedDict):
+    location: str
+    size_diff_bytes: int
+    size_bytes: int
+    count_diff: int
+
+
+def diagnostics_enabled() -> bool:
+    """Whether the backend was started with the diagnostics opt-in set."""
+    return os.environ.get(DIAGNOSTICS_ENV) == "1"
+
+
+def _slots(cls: type) -> list[str]:
+    return [
+        slot
+        for klass in cls.__mro__
+        for slot in getattr(klass, "__slots__", ())
+        if slot not in ("__dict__", "__weakref__")
+    ]
+
+
+def deep_sizeof(value, seen: set[int]) -> int:
+    """Bytes used by ``value`` and everything it references that isn't in
+    ``seen``; adds what it counts to ``seen``."""
+    total = 0
+    stack = [value]
+    while stack:
+        obj = stack.pop()
+        if id(obj) in seen or isinstance(obj, _SKIPPED):
+            continue
+        seen.add(id(obj))
+        total += sys.getsizeof(obj)
+        if isinstance(obj, _ATOMIC):
+            continue
+        if isinstance(obj, dict):
+            stack.extend(obj.keys())
+            stack.extend(obj.values())
+        elif isinstance(obj, (list, tuple, set, frozenset)):
+            stack.extend(obj)
+        else:
+            if hasattr(obj, "__dict__"):
+                stack.append(obj.__dict__)
+            for slot in _slots(type(obj)):
+                if hasattr(obj, slot):
+                    stack.append(getattr(obj, slot))
+    return total
+
+
+def _serialized_size(name: str, value) -> int | None:
+    try:
+        if name.startswith("_"):
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        return len(json_dumps(value).encode())
+    except Exception:
+        return None
+
+
+def _state_vars(state):
+    """(name, value) of the backend vars, plain vars and cached computed vars."""
+    cls = type(state)
+    values = state.__dict__
+    for name in cls.backend_vars:
+        if name in values:
+            yield name, values[name]
+    for name in cls.base_vars:
+        if name in values:
+            yield name, values[name]
+    for name, var in cls.computed_vars.items():
+        if var._cache_attr in values:
+            yield f"{name} (cached)", values[var._cache_attr]
+
+
+def _walk_states(state):
+    yield state
+    for substate in state.substates.values():
+        yield from _walk_states(substate)
+
+
+def state_sizes(root) -> list[VarSize]:
+    """Sizes of the vars of ``root`` and all its substates, largest first."""
+    seen: set[int] = set()
+    sizes = []
+    for state in _walk_states(root):
+        for name, value in _state_vars(state):
+            sizes.append({
+                "state": type(state).__name__,
+                "var": name,
+                "memory_bytes": deep_sizeof(value, seen),
+                "serialized_bytes": _serialized_size(name, value),
+            })
+    return sorted(sizes, key=lambda size: size["memory_bytes"], reverse=True)
+
+
+def session_tokens(states: dict) -> list[str]:
+    """Shortened tokens of the sessions in a state manager's ``states``.
+
+    A full token is enough to act as that session, so only a prefix is shown.
+    """
+    return [token[:8] for token in list(states)]
+
+
+def session_report(states: dict, token: str, top: int = 20) -> SessionSize | None:
+    """Sizes of the vars of the session whose token starts with ``token``
+    (a shortened token from ``session_tokens``), or None if there is none."""
+    root = next(
+        (state for full, state in list(states.items()) if full.startswith(token)), None
+    )
+    if not token or root is None:
+        return None
+    sizes = state_sizes(root)
+    return {
+        "token": token,
+        "memory_bytes": sum(size["memory_bytes"] for size in sizes),
+        "vars": sizes[:top],
+    }
+
+
+def _take_snapshot() -> tracemalloc.Snapshot:
+    return tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    ))
+
+
+def start_tracing():
+    """Starts tracemalloc (if needed) and takes the baseline snapshot."""
+    global _last_snapshot
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(TRACEMALLOC_FRAMES)
+    _last_snapshot = _take_snapshot()
+
+
+def stop_tracing():
+    global _last_snapshot
+    tracemalloc.stop()
+    _last_snapshot = None
+
+
+def is_tracing() -> bool:
+    return tracemalloc.is_tracing() and _last_snapshot is not None
+
+
+def allocation_diff(limit: int = 25) -> list[AllocationDiff]:
+    """Lines whose allocations grew most since the previous snapshot.
+
+    The new snapshot becomes the baseline for the next call.
+    """
+    global _last_snapshot
+    if not is_tracing():
+        raise RuntimeError("tracemalloc is not running; start tracing first.")
+    snapshot = _take_snapshot()
+    stats = snapshot.compare_to(_last_snapshot, "lineno")
+    _last_snapshot = snapshot
+    return [
+        {
+            "location": str(stat.traceback),
+            "size_diff_bytes": stat.size_diff,
+            "size_bytes": stat.size,
+            "count_diff": stat.count_diff,
+        }
+        for stat in stats[:limit]
+    ]
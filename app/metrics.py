@@ -0,0 +1,221 @@
+"""Backend counters and histograms in the Prometheus text exposition format.
+
+The ledger states and the export endpoints record into the metrics defined
+here, and ``render()`` formats them for the ``/metrics`` endpoint in
+``app.api``. Data file sizes are read when the endpoint is scraped.
+
+Metrics are kept per process: with several backend workers, each scrape is
+answered by one of them, so run a single worker when scraping.
+"""
+
+import asyncio
+import bisect
+import contextlib
+import math
+import os
+import threading
+import time
+
+from app.storage import BUSINESS_DATA_FILE, TRANSACTION_DATA_FILE
+
+# Upper bounds in seconds, from a fast save of a small ledger to a slow
+# import or export of a large one.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+LOOP_LAG_INTERVAL = 0.5
+
+_lock = threading.Lock()
+_metrics: list["_Metric"] = []
+
+
+def _format_labels(names: tuple[str, ...], values: tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        # label values -> value
+        self._values: dict[tuple[str, ...], object] = {}
+        _metrics.append(self)
+
+    def _key(self, labels: dict[str, str]) -> tuple[str, ...]:
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def _samples(self):
+        """(suffix, label values, extra label, value) for each sample."""
+        for key, value in self._values.items():
+            yield "", key, "", value
+
+    def render(self) -> list[str]:
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+        with _lock:
+            samples = list(self._samples())
+        for suffix, key, extra, value in samples:
+            labels = _format_labels(self.labels, key, extra)
+            lines.append(f"{self.name}{suffix}{labels} {_format_value(value)}")
+        return lines
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: tuple[str, ...] = (),
+        buckets: tuple[float, ...] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, documentation, labels)
+        self.buckets = tuple(buckets) + (math.inf,)
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with _lock:
+            counts = self._values.get(key)
+            if counts is None:
+                # per-bucket counts (not cumulative), then the sum
+                counts = self._values[key] = [0] * len(self.buckets) + [0.0]
+            counts[bisect.bisect_left(self.buckets, value)] += 1
+            counts[-1] += value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observes the wall time of the ``with`` block, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def _samples(self):
+        for key, counts in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield "_bucket", key, f'le="{_format_value(bound)}"', cumulative
+            yield "_sum", key, "", counts[-1]
+            yield "_count", key, "", cumulative
+
+
+SAVE_SECONDS = Histogram(
+    "maaser_save_seconds",
+    "Time to write a ledger data file.",
+    ("ledger",),
+)
+SAVE_FAILURES = Counter(
+    "maaser_save_failures_total",
+    "Saves that were not written: stale (another worker saved first) or error.",
+    ("ledger", "reason"),
+)
+LOAD_SECONDS = Histogram(
+    "maaser_load_seconds",
+    "Time to read and parse a ledger data file.",
+    ("ledger",),
+)
+TRANSACTIONS = Gauge(
+    "maaser_transactions",
+    "Rows in a ledger as last loaded or saved by this worker.",
+    ("ledger",),
+)
+IMPORT_SECONDS = Histogram(
+    "maaser_import_seconds",
+    "Time to add confirmed import rows to a ledger and save it.",
+    ("ledger",),
+)
+IMPORT_ROWS = Counter(
+    "maaser_import_rows_total",
+    "Rows added to a ledger by imports.",
+    ("ledger",),
+)
+EXPORT_SECONDS = Histogram(
+    "maaser_export_seconds",
+    "Time to build (or find in the cache) an export artifact, or to stream a CSV download.",
+    ("ledger", "format"),
+)
+SNAPSHOT_SECONDS = Histogram(
+    "maaser_snapshot_seconds",
+    "Time to snapshot the changed data files, prune old snapshots and compact the undo logs.",
+)
+SNAPSHOT_FAILURES = Counter(
+    "maaser_snapshot_failures_total",
+    "Data files that could not be snapshotted: unreadable, unparsable or not verified.",
+    ("file",),
+)
+EVENT_LOOP_LAG_SECONDS = Histogram(
+    "maaser_event_loop_lag_seconds",
+    "How late the event loop ran a timer: the time a received event waits "
+    "while other handlers hold the loop.",
+    buckets=LOOP_LAG_BUCKETS,
+)
+_DATA_FILE_BYTES = Gauge(
+    "maaser_data_file_bytes",
+    "Size of a data file on disk.",
+    ("file",),
+)
+
+
+def _update_file_sizes():
+    for path in (TRANSACTION_DATA_FILE, BUSINESS_DATA_FILE):
+        try:
+            _DATA_FILE_BYTES.set(os.path.getsize(path), file=path)
+        except OSError:
+            pass
+
+
+def render() -> str:
+    """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+    _update_file_sizes()
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+async def watch_event_loop():
+    """Lifespan task sampling event loop lag into ``EVENT_LOOP_LAG_SECONDS``.
+
+    Reflex runs plain event handlers on the loop, so a slow one delays every
+    other session's events by about this much.
+    """
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        EVENT_LOOP_LAG_SECONDS.observe(
+            max(time.perf_counter() - start - LOOP_LAG_INTERVAL, 0.0)
+        )
@@ -0,0 +1,34 @@
+"""Exact money amounts as integer cents.
+
+Amounts are stored, compared and summed as integer cents (``amount_cents``).
+Floats only appear at the edges: user input and imports are converted with
+``to_cents``, and rows carry a float ``amount`` derived from the cents for
+display.
+"""
+
+from decimal import ROUND_HALF_UP, Decimal, InvalidOperation
+
+
+def to_cents(value) -> int:
+    """Converts a number or numeric string to integer cents, rounding half up.
+
+    Floats are converted through their shortest repr, so ``0.1`` becomes 10
+    cents rather than the binary value just below it. Raises ``ValueError``
+    (or ``TypeError`` for non-numeric types) if ``value`` is not an amount.
+    """
+    if isinstance(value, bool) or not isinstance(value, (int, float, str, Decimal)):
+        raise TypeError(f"Not an amount: {value!r}")
+    if isinstance(value, int):
+        return value * 100
+    try:
+        amount = Decimal(str(value).strip())
+    except InvalidOperation:
+        raise ValueError(f"Not an amount: {value!r}")
+    if not amount.is_finite():
+        raise ValueError(f"Not an amount: {value!r}")
+    return int((amount * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents: int) -> float:
+    """The display amount for ``cents``."""
+    return cents / 100
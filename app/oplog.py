@@ -0,0 +1,350 @@
+"""Bounded, persistent undo/redo log of ledger operations.
+
+Every add, edit, delete, verification toggle, status toggle and import is
+recorded as one operation holding only what changed:
+
+* ``{"insert": rows}`` and ``{"remove": rows}`` hold the stored rows that
+  were added or removed (an import is one ``insert`` of all its rows);
+* ``{"update": id, "before": fields, "after": fields}`` holds only the
+  fields an edit changed;
+* ``{"verify": ids, "value": bool}`` flips the verified mark of ``ids``.
+
+Operations are looked up by id in a dict, so undoing or redoing any of them
+is a single lookup plus the size of its change. A change is only undone (or
+redone) if the rows it touches are still as it left them; otherwise
+``ConflictError`` is raised and nothing is changed. Recording a new
+operation discards the undone ones, as in any editor.
+
+The log of each data file is an append-only JSON lines file beside it, so it
+survives restarts and is shared by all sessions and workers. It keeps the
+last ``MAX_OPERATIONS`` operations and at most ``MAX_ROWS`` logged rows
+(inserted, removed, updated or verified);
+the file is rewritten without the dropped records once it has grown to
+``COMPACT_RECORDS`` lines.
+"""
+
+import contextlib
+import datetime
+import json
+import logging
+import os
+import tempfile
+import uuid
+from typing import TypedDict
+
+from app.records import Ledger
+from app.storage import StorageError, file_lock
+
+MAX_OPERATIONS = 100
+MAX_ROWS = 20_000
+COMPACT_RECORDS = 4 * MAX_OPERATIONS
+
+
+class ConflictError(ValueError):
+    """Raised when the rows an operation touched have changed since."""
+
+
+class Operation(TypedDict):
+    id: str
+    kind: str
+    title: str
+    detail: str
+    at: str
+    changes: list[dict]
+    undone: bool
+
+
+class OperationSummary(TypedDict):
+    id: str
+    kind: str
+    title: str
+    detail: str
+    undone: bool
+
+
+def inserted(rows: list[dict]) -> dict:
+    return {"insert": rows}
+
+
+def removed(rows: list[dict]) -> dict:
+    return {"remove": rows}
+
+
+def updated(before: dict, after: dict) -> dict | None:
+    """The fields that differ between two versions of a stored row, if any."""
+    fields = [key for key in after if before.get(key) != after[key]]
+    if not fields:
+        return None
+    return {
+        "update": after["id"],
+        "before": {key: before.get(key) for key in fields},
+        "after": {key: after[key] for key in fields},
+    }
+
+
+def verified(ids: list[str], value: bool) -> dict:
+    return {"verify": ids, "value": value}
+
+
+def _inverse(change: dict) -> dict:
+    if "insert" in change:
+        return removed(change["insert"])
+    if "remove" in change:
+        return inserted(change["remove"])
+    if "update" in change:
+        return {"update": change["update"], "before": change["after"], "after": change["before"]}
+    return verified(change["verify"], not change["value"])
+
+
+def _check(ledger: Ledger, change: dict):
+    if "insert" in change:
+        if ledger.positions_of(row["id"] for row in change["insert"]):
+            raise ConflictError("Some of these transactions already exist.")
+    elif "remove" in change:
+        rows = change["remove"]
+        positions = ledger.positions_of(row["id"] for row in rows)
+        if len(positions) != len(rows) or any(
+            ledger.stored_row(positions[row["id"]]) != row for row in rows
+        ):
+            raise ConflictError("Some of these transactions were changed or deleted since.")
+    elif "update" in change:
+        i = ledger.index_of(change["update"])
+        if i == -1:
+            raise ConflictError("This transaction was deleted since.")
+        row = ledger.stored_row(i)
+        if any(row.get(key) != value for key, value in change["before"].items()):
+            raise ConflictError("This transaction was changed since.")
+
+
+def _apply(ledger: Ledger, change: dict, verified_ids: set[str] | None):
+    if "insert" in change:
+        ledger.extend(change["insert"])
+    elif "remove" in change:
+        positions = ledger.positions_of(row["id"] for row in change["remove"])
+        ledger.delete_many(positions.values())
+    elif "update" in change:
+        i = ledger.index_of(change["update"])
+        ledger.replace(i, {**ledger.stored_row(i), **change["after"]})
+    elif verified_ids is not None:
+        if change["value"]:
+            verified_ids.update(change["verify"])
+        else:
+            verified_ids.difference_update(change["verify"])
+
+
+def apply_changes(
+    ledger: Ledger,
+    changes: list[dict],
+    verified_ids: set[str] | None = None,
+    undo: bool = False,
+):
+    """Replays ``changes`` on ``ledger`` (and ``verified_ids``), or reverts them.
+
+    Every change is checked before any is applied, so a ``ConflictError``
+    leaves the ledger untouched.
+    """
+    steps = [_inverse(change) for change in reversed(changes)] if undo else changes
+    for step in steps:
+        _check(ledger, step)
+    for step in steps:
+        _apply(ledger, step, verified_ids)
+
+
+def summary(operation: Operation) -> OperationSummary:
+    return {
+        "id": operation["id"],
+        "kind": operation["kind"],
+        "title": operation["title"],
+        "detail": operation["detail"],
+        "undone": operation["undone"],
+    }
+
+
+def label(operation: Operation | None) -> str:
+    """``"Title: detail"`` for buttons and tooltips; empty for no operation."""
+    if operation is None:
+        return ""
+    if operation["detail"]:
+        return f"{operation['title']}: {operation['detail']}"
+    return operation["title"]
+
+
+def _row_count(operation: Operation) -> int:
+    """Rows an operation holds: inserted, removed, updated or (un)verified."""
+    count = 0
+    for change in operation["changes"]:
+        if "update" in change:
+            count += 1
+        else:
+            count += len(change.get("insert", change.get("remove", change.get("verify", ()))))
+    return count
+
+
+def _file_stamp(path: str) -> tuple | None:
+    try:
+        stat = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+
+class OpLog:
+    """The operation log of one data file, as kept in ``path``."""
+
+    def __init__(self, path: str):
+        self.path = path
+        # id -> operation, oldest first
+        self._operations: dict[str, Operation] = {}
+        # ids of the undone operations, in the order they were undone
+        self._undone: dict[str, None] = {}
+        self._rows = 0
+        self._records = 0
+        self._stamp = None
+        # The file ends in a partly written line, to be cut off by the next write.
+        self._torn = False
+
+    def _drop(self, operation_id: str):
+        self._rows -= _row_count(self._operations.pop(operation_id))
+        self._undone.pop(operation_id, None)
+
+    def _add(self, operation: Operation):
+        for operation_id in [i for i, op in self._operations.items() if op["undone"]]:
+            self._drop(operation_id)
+        self._operations[operation["id"]] = operation
+        self._rows += _row_count(operation)
+        while len(self._operations) > 1 and (
+            len(self._operations) > MAX_OPERATIONS or self._rows > MAX_ROWS
+        ):
+            self._drop(next(iter(self._operations)))
+
+    def _mark(self, operation_id: str, undone: bool):
+        operation = self._operations.get(operation_id)
+        if operation is not None:
+            operation["undone"] = undone
+            self._undone.pop(operation_id, None)
+            if undone:
+                self._undone[operation_id] = None
+
+    def _replay(self, record: dict):
+        if "op" in record:
+            self._add({**record["op"], "undone": False})
+        elif "undo" in record:
+            self._mark(record["undo"], True)
+        elif "redo" in record:
+            self._mark(record["redo"], False)
+
+    def _read_unlocked(self):
+        self._operations.clear()
+        self._undone.clear()
+        self._rows = 0
+        self._records = 0
+        self._torn = False
+        with contextlib.suppress(FileNotFoundError), open(self.path) as f:
+            for line in f:
+                self._torn = not line.endswith("\n")
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # A write cut short by a crash; the rest is intact.
+                    continue
+                self._replay(record)
+                self._records += 1
+        self._stamp = _file_stamp(self.path)
+
+    def sync(self):
+        """Re-reads the file if another process wrote to it."""
+        if _file_stamp(self.path) != self._stamp:
+            with file_lock(self.path, shared=True):
+                self._read_unlocked()
+
+    def _write(self, record: dict):
+        with file_lock(self.path):
+            if _file_stamp(self.path) != self._stamp:
+                self._read_unlocked()
+            with open(self.path, "a") as f:
+                if self._torn:
+                    f.write("\n")
+                    self._torn = False
+                f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            self._replay(record)
+            self._records += 1
+            if self._records > COMPACT_RECORDS:
+                self._compact_unlocked()
+            self._stamp = _file_stamp(self.path)
+
+    def _compact_unlocked(self):
+        records = [
+            {"op": {k: v for k, v in op.items() if k != "undone"}}
+            for op in self._operations.values()
+        ]
+        records += [{"undo": i} for i in self._undone]
+        fd, tmp_path = tempfile.mkstemp(
+            dir=os.path.dirname(os.path.abspath(self.path)),
+            prefix=f".{os.path.basename(self.path)}.",
+            suffix=".tmp",
+        )
+        try:
+            with os.fdopen(fd, "w") as f:
+                for record in records:
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+            os.replace(tmp_path, self.path)
+        except BaseException:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_path)
+            raise
+        self._records = len(records)
+
+    def compact(self):
+        """Rewrites the file with only the operations still kept, if it holds
+        any other records."""
+        with file_lock(self.path):
+            self._read_unlocked()
+            if self._torn or self._records > len(self._operations) + len(self._undone):
+                self._compact_unlocked()
+                self._stamp = _file_stamp(self.path)
+
+    def record(self, kind: str, title: str, detail: str, changes: list[dict]) -> Operation:
+        """Logs ``changes``, already applied and saved, as one operation."""
+        operation = {
+            "id": uuid.uuid4().hex,
+            "kind": kind,
+            "title": title,
+            "detail": detail,
+            "at": datetime.datetime.now().isoformat(timespec="seconds"),
+            "changes": changes,
+        }
+        self._write({"op": operation})
+        return self._operations[operation["id"]]
+
+    def mark(self, operation_id: str, undone: bool):
+        """Logs that an operation was undone (or redone) and saved."""
+        self._write({"undo" if undone else "redo": operation_id})
+
+    def get(self, operation_id: str) -> Operation | None:
+        return self._operations.get(operation_id)
+
+    def latest(self, undone: bool) -> Operation | None:
+        """The newest operation that can be undone or, if ``undone``, the one
+        undone last, so redoing replays the undos in reverse."""
+        if undone:
+            return self._operations[next(reversed(self._undone))] if self._undone else None
+        for operation in reversed(self._operations.values()):
+            if operation["undone"] == undone:
+                return operation
+        return None
+
+
+_logs: dict[str, OpLog] = {}
+
+
+def get_log(path: str) -> OpLog:
+    """The log kept in ``path``, shared by the sessions of this process."""
+    key = os.path.abspath(path)
+    log = _logs.get(key)
+    if log is None:
+        log = _logs[key] = OpLog(path)
+    try:
+        log.sync()
+    except (OSError, StorageError) as e:
+        logging.error(f"Error reading {path}: {e}")
+    return log
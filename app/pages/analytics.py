@@ -73,6 +73,14 @@ def analytics_chart() -> rx.Component:
                 stack_id="1",
                 fill_opacity=0.3,
             ),
+            rx.recharts.area(
+                data_key="due",
+                name="maaser due (running)",
+                type_="natural",
+                fill="#EBCB8B", # nord13 Yellow
+                stroke="#EBCB8B",
+                fill_opacity=0.1,
+            ),
             data=TransactionState.chart_data,
             height=300,
             margin={"left": -20, "top": 10},
@@ -97,6 +105,7 @@ def analytics_page() -> rx.Component:
                         TransactionState.total_income,
                         "arrow_up",
                         "text-[#A3BE8C]", # nord14 given
+                        subtext=TransactionState.income_spread_label,
                     ),
                     kpi_card(
                         "Maaser Given",
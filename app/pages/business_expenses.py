@@ -6,6 +6,7 @@ from app.components.business_import_modal import business_import_modal
 
 
 from app.components.undo_banner import undo_banner
+from app.components.export_panel import export_panel
 from app.states.business_expense_state import BusinessExpenseState
 
 def business_expenses_page() -> rx.Component:
@@ -28,5 +29,6 @@ def business_expenses_page() -> rx.Component:
         business_expense_form_modal(),
         business_import_modal(),
         undo_banner(BusinessExpenseState),
+        export_panel(),
         class_name="flex min-h-screen w-full bg-[#2E3440] text-slate-100 selection:bg-[#88C0D0] selection:text-[#2E3440]",
     )
@@ -1,6 +1,9 @@
 import reflex as rx
 from app.states.transaction_state import TransactionState, BankAccount
 from app.components.sidebar import sidebar
+from app.components.closed_periods import closed_periods_panel
+from app.components.diagnostics_panel import diagnostics_panel
+from app.memory import diagnostics_enabled
 
 
 def account_row(account: BankAccount) -> rx.Component:
@@ -69,7 +72,7 @@ def add_account_form() -> rx.Component:
 
 
 def settings_page() -> rx.Component:
-    """The settings page for managing accounts."""
+    """The settings page for managing accounts and, if enabled, viewing diagnostics."""
     return rx.el.div(
         sidebar(),
         rx.el.main(
@@ -118,6 +121,8 @@ def settings_page() -> rx.Component:
                     add_account_form(),
                     class_name="grid grid-cols-1 lg:grid-cols-2 gap-8 items-start",
                 ),
+                closed_periods_panel(),
+                *([diagnostics_panel()] if diagnostics_enabled() else []),
                 class_name="flex-1 p-6 md:p-8 lg:p-10",
             ),
             class_name="flex flex-col flex-1 min-h-screen bg-[#2E3440] text-[#ECEFF4]",
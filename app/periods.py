@@ -0,0 +1,116 @@
+"""Closed periods: settled date ranges frozen as balance checkpoints.
+
+Closing the books through a date stores a ``Checkpoint`` in the main data
+file (under ``"closed_periods"``) with the period's totals per kind and the
+running totals carried forward from the first transaction. Periods are
+contiguous: each one starts the day after the previous one ended, so the
+latest checkpoint alone holds everything before the open period.
+
+Totals are then the latest checkpoint's carried totals plus the rows dated
+after it (``balance``), and rows on or before its end date are frozen: the
+states refuse to add, change or delete them (``touches_closed``) until the
+latest period is reopened.
+"""
+
+import datetime
+from typing import TypedDict
+
+from app.analytics import LedgerAnalytics
+from app.records import Ledger, date_ordinal
+
+
+class Checkpoint(TypedDict):
+    start: str  # first day of the period; "" for everything before ``end``
+    end: str  # last day of the period, inclusive
+    closed_at: str
+    rows: int
+    cents: dict[str, int]  # totals of the period, per kind
+    carried_cents: dict[str, int]  # totals through ``end``, per kind
+
+
+def closed_through(checkpoints: list[Checkpoint]) -> str:
+    """The last closed day, or ``""`` if no period is closed."""
+    return checkpoints[-1]["end"] if checkpoints else ""
+
+
+def closed_ordinal(checkpoints: list[Checkpoint]) -> int:
+    """Day ordinal of the last closed day; 0 (before any date) if none is."""
+    return date_ordinal(checkpoints[-1]["end"]) if checkpoints else 0
+
+
+def close(
+    analytics: LedgerAnalytics, checkpoints: list[Checkpoint], end: str
+) -> Checkpoint:
+    """The checkpoint closing the open period through ``end``.
+
+    Raises ``ValueError`` if ``end`` is not a date after the last closed day
+    and no later than today.
+    """
+    try:
+        end_ordinal = datetime.date.fromisoformat(end).toordinal()
+    except (TypeError, ValueError):
+        raise ValueError("Choose the last day of the period to close.") from None
+    after = closed_ordinal(checkpoints)
+    if end_ordinal <= after:
+        raise ValueError(f"The books are already closed through {closed_through(checkpoints)}.")
+    if end_ordinal > datetime.date.today().toordinal():
+        raise ValueError("A period can't be closed before it has ended.")
+    rows, cents = analytics.kind_totals_between(after, end_ordinal)
+    carried = dict(checkpoints[-1]["carried_cents"]) if checkpoints else {}
+    for kind, amount in cents.items():
+        carried[kind] = carried.get(kind, 0) + amount
+    return {
+        "start": (
+            datetime.date.fromordinal(after + 1).isoformat() if checkpoints else ""
+        ),
+        "end": end,
+        "closed_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "rows": rows,
+        "cents": cents,
+        "carried_cents": carried,
+    }
+
+
+class Totals(dict):
+    """Cents per kind. Has ``sum_cents(kind)``, so ``ledger.maaser_summary``
+    accepts it."""
+
+    def sum_cents(self, kind: str) -> int:
+        return self.get(kind, 0)
+
+
+def balance(
+    analytics: LedgerAnalytics, checkpoints: list[Checkpoint]
+) -> LedgerAnalytics | Totals:
+    """Totals per kind: the latest checkpoint's carried totals plus the rows
+    of the open period (all rows if no period is closed)."""
+    if not checkpoints:
+        return analytics
+    carried = checkpoints[-1]["carried_cents"]
+    _, open_cents = analytics.kind_totals_between(closed_ordinal(checkpoints))
+    return Totals({
+        kind: carried.get(kind, 0) + open_cents.get(kind, 0)
+        for kind in {*carried, *open_cents}
+    })
+
+
+def _row_closed(row: dict, through: int) -> bool:
+    return "date" in row and date_ordinal(row["date"]) <= through
+
+
+def touches_closed(ledger: Ledger, changes: list[dict], through: int) -> bool:
+    """Whether applying (or undoing) ``changes`` would touch a closed day."""
+    if not through:
+        return False
+    for change in changes:
+        rows = change.get("insert", change.get("remove"))
+        if rows is not None:
+            if any(_row_closed(row, through) for row in rows):
+                return True
+        elif "update" in change:
+            i = ledger.index_of(change["update"])
+            if i != -1 and date_ordinal(ledger.date_at(i)) <= through:
+                return True
+            if _row_closed(change["before"], through) or _row_closed(change["after"], through):
+                return True
+    return False
@@ -0,0 +1,214 @@
+"""Opt-in call counts and timings for state vars, event handlers and helpers.
+
+States are registered with the ``profiled`` class decorator and module
+functions with ``profile_function``. ``enable()`` swaps timing wrappers in
+for the getters of their computed vars, their event handlers (including the
+generated setters) and their other methods; ``disable()`` puts the originals
+back, so nothing is slowed down while profiling is off. Since it patches
+Reflex's own objects for every session, it can only be enabled in a backend
+started with ``MAASER_DIAGNOSTICS=1`` (see ``memory.diagnostics_enabled``).
+
+Each entry records the number of calls, total and maximum wall time and, for
+computed vars, the size (``len``) of the last result. Generator and async
+handlers are timed from start to finish, including the time they spend
+suspended. Stats are kept per process: with several backend workers, each
+one reports the sessions it served.
+"""
+
+import functools
+import inspect
+import sys
+import time
+from types import FunctionType
+from typing import Callable, TypedDict
+
+from app.memory import DIAGNOSTICS_ENV, diagnostics_enabled
+
+_enabled = False
+_states: list[type] = []
+_functions: list[tuple[str, str]] = []
+# Callables that put an original back, filled while profiling is enabled.
+_restore: list[Callable[[], None]] = []
+# name -> [kind, calls, total seconds, max seconds, last result size]
+_stats: dict[str, list] = {}
+
+
+class ProfileEntry(TypedDict):
+    name: str
+    kind: str
+    calls: int
+    total_ms: float
+    mean_ms: float
+    max_ms: float
+    size: int | None
+
+
+def _record(name: str, kind: str, elapsed: float, size: int | None = None):
+    entry = _stats.get(name)
+    if entry is None:
+        entry = _stats[name] = [kind, 0, 0.0, 0.0, None]
+    entry[1] += 1
+    entry[2] += elapsed
+    entry[3] = max(entry[3], elapsed)
+    if size is not None:
+        entry[4] = size
+
+
+def _size(value) -> int | None:
+    return len(value) if hasattr(value, "__len__") else None
+
+
+def _timed(fn: Callable, name: str, kind: str) -> Callable:
+    """Wraps ``fn`` in a timer of the same kind (plain, generator or async),
+    since Reflex tells handlers apart by that."""
+    if inspect.isasyncgenfunction(fn):
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                async for value in fn(*args, **kwargs):
+                    yield value
+            finally:
+                _record(name, kind, time.perf_counter() - start)
+
+    elif inspect.iscoroutinefunction(fn):
+
+        @functools.wraps(fn)
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await fn(*args, **kwargs)
+            finally:
+                _record(name, kind, time.perf_counter() - start)
+
+    elif inspect.isgeneratorfunction(fn):
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return (yield from fn(*args, **kwargs))
+            finally:
+                _record(name, kind, time.perf_counter() - start)
+
+    else:
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            result = None
+            try:
+                result = fn(*args, **kwargs)
+                return result
+            finally:
+                _record(
+                    name,
+                    kind,
+                    time.perf_counter() - start,
+                    _size(result) if kind == "var" else None,
+                )
+
+    # Reflex's var dependency tracker looks through ``.func`` (as it does for
+    # functools.partial), so it keeps reading the original getter.
+    wrapper.func = fn
+    return wrapper
+
+
+def _patch_attribute(owner, attribute: str, fn: Callable, name: str, kind: str):
+    """Replaces ``owner.attribute`` (a function) with a timed wrapper."""
+    # Reflex keeps computed vars and event handlers in frozen dataclasses.
+    object.__setattr__(owner, attribute, _timed(fn, name, kind))
+    _restore.append(lambda: object.__setattr__(owner, attribute, fn))
+
+
+def _patch_state(cls: type):
+    for name, var in cls.computed_vars.items():
+        # Reflex registers a copy of each var; the class attribute is the
+        # descriptor that instances read through.
+        descriptor = vars(cls).get(name)
+        if descriptor is not None:
+            _patch_attribute(
+                descriptor, "_fget", descriptor._fget, f"{cls.__name__}.{name}", "var"
+            )
+    for name, handler in cls.event_handlers.items():
+        _patch_attribute(handler, "fn", handler.fn, f"{cls.__name__}.{name}", "event")
+    for name, value in list(vars(cls).items()):
+        if (
+            isinstance(value, FunctionType)
+            and not name.startswith("__")
+            and name not in cls.event_handlers
+        ):
+            setattr(cls, name, _timed(value, f"{cls.__name__}.{name}", "method"))
+            _restore.append(functools.partial(setattr, cls, name, value))
+
+
+def _patch_function(module_name: str, name: str):
+    module = sys.modules[module_name]
+    fn = getattr(module, name)
+    setattr(module, name, _timed(fn, fn.__qualname__, "function"))
+    _restore.append(functools.partial(setattr, module, name, fn))
+
+
+def profiled(cls: type) -> type:
+    """Class decorator registering a state for profiling."""
+    _states.append(cls)
+    if _enabled:
+        _patch_state(cls)
+    return cls
+
+
+def profile_function(module_name: str, name: str):
+    """Registers the function ``name`` of a module for profiling.
+
+    Modules that import the function by name register their own binding.
+    """
+    _functions.append((module_name, name))
+    if _enabled:
+        _patch_function(module_name, name)
+
+
+def is_enabled() -> bool:
+    return _enabled
+
+
+def enable():
+    """Starts profiling; raises ``RuntimeError`` unless diagnostics are enabled."""
+    global _enabled
+    if _enabled:
+        return
+    if not diagnostics_enabled():
+        raise RuntimeError(f"Profiling needs the backend started with {DIAGNOSTICS_ENV}=1.")
+    _enabled = True
+    for cls in _states:
+        _patch_state(cls)
+    for module_name, name in _functions:
+        _patch_function(module_name, name)
+
+
+def disable():
+    global _enabled
+    _enabled = False
+    while _restore:
+        _restore.pop()()
+
+
+def reset():
+    _stats.clear()
+
+
+def snapshot() -> list[ProfileEntry]:
+    """Recorded entries, the most total time first."""
+    entries = [
+        {
+            "name": name,
+            "kind": kind,
+            "calls": calls,
+            "total_ms": round(total * 1000, 3),
+            "mean_ms": round(total * 1000 / calls, 3),
+            "max_ms": round(longest * 1000, 3),
+            "size": size,
+        }
+        for name, (kind, calls, total, longest, size) in _stats.items()
+    ]
+    return sorted(entries, key=lambda entry: entry["total_ms"], reverse=True)
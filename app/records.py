@@ -0,0 +1,454 @@
+"""Compact, column-oriented in-memory ledger.
+
+A ``Ledger`` keeps one typed column per field instead of one dict per row:
+
+* ids as 16 raw UUID bytes in a ``bytearray`` (other ids go to a side table),
+* dates as ``array('i')`` day ordinals,
+* amounts as ``array('q')`` integer cents,
+* the kind (transaction type or business status) as a byte code,
+* the account and the memo as ``array('i')`` indexes into the distinct
+  account ids and memo strings seen so far.
+
+That is under 40 bytes per row plus the distinct memos, against several
+hundred for a dict with string values. Dicts are only built at the edges, by
+``row`` (display rows, including the float ``amount``) and ``to_rows``
+(stored rows).
+
+Rows are found by id through a dict from id bytes to position, built on the
+first lookup and kept up to date by every mutation. ``delete`` and
+``delete_many`` only mark rows as deleted (tombstones), so positions stay
+valid and each deleted row costs O(1); the columns are compacted in one pass
+by the next call that reads the whole ledger (``len``, ``select``, the
+column properties, ...).
+"""
+
+import copy
+import datetime
+import uuid
+from array import array
+
+from app.money import from_cents, to_cents
+from app.statement_parsers import normalize_date
+
+ID_BYTES = 16
+# Ids that are not canonical UUID strings are stored as this prefix followed
+# by their index in the side table. Byte 6 of a UUID holds its version, and
+# no UUID version uses 0xF, so the prefix cannot collide with a real UUID
+# (the all-ones "max" UUID is itself sent to the side table).
+_EXTRA_ID_PREFIX = b"\xff" * 8
+
+# Up to this many deleted rows are compacted by deleting them from each
+# column in place (a memmove each); more are compacted by rebuilding the
+# columns from the rows kept.
+COMPACT_IN_PLACE = 256
+
+TRANSACTION_KINDS = ("income", "maaser")
+BUSINESS_KINDS = ("pending", "reimbursed")
+
+
+def date_ordinal(date: str) -> int:
+    """Day ordinal of a YYYY-MM-DD date (or a format ``normalize_date`` knows)."""
+    try:
+        return datetime.date.fromisoformat(date).toordinal()
+    except (TypeError, ValueError):
+        return datetime.date.fromisoformat(normalize_date(date or "")).toordinal()
+
+
+class Ledger:
+    """Transactions of one kind field (``type`` or ``status``) stored in columns."""
+
+    __slots__ = (
+        "kind_field",
+        "kinds",
+        "_kind_codes",
+        "_ids",
+        "_extra_ids",
+        "_extra_codes",
+        "_dates",
+        "_cents",
+        "_kind_column",
+        "_memo_column",
+        "_memo_values",
+        "_memo_codes",
+        "_accounts",
+        "_account_ids",
+        "_account_codes",
+        "_positions",
+        "_deleted",
+    )
+
+    def __init__(self, kind_field: str = "type", kinds: tuple[str, ...] = TRANSACTION_KINDS):
+        self.kind_field = kind_field
+        self.kinds = list(kinds)
+        self._kind_codes = {kind: code for code, kind in enumerate(self.kinds)}
+        self._ids = bytearray()
+        self._extra_ids = []
+        self._extra_codes = {}
+        self._dates = array("i")
+        self._cents = array("q")
+        self._kind_column = bytearray()
+        self._memo_column = array("i")
+        self._memo_values = []
+        self._memo_codes = {}
+        self._accounts = array("i")
+        self._account_ids = [None]
+        self._account_codes = {None: 0}
+        # id bytes -> position, built on first use
+        self._positions = None
+        # positions of deleted rows, until the next compaction
+        self._deleted = set()
+
+    @classmethod
+    def from_rows(cls, rows, kind_field: str = "type", kinds=TRANSACTION_KINDS):
+        ledger = cls(kind_field, kinds)
+        ledger.extend(rows)
+        return ledger
+
+    def copy(self) -> "Ledger":
+        """An independent ledger with the same rows."""
+        clone = Ledger.__new__(Ledger)
+        for slot in self.__slots__:
+            # Every column holds immutable values, so shallow copies suffice.
+            setattr(clone, slot, copy.copy(getattr(self, slot)))
+        return clone
+
+    def __len__(self) -> int:
+        self._compact()
+        return len(self._cents)
+
+    def _compact(self):
+        """Drops the rows marked deleted, rebuilding each column once."""
+        if not self._deleted:
+            return
+        deleted = self._deleted
+        if len(deleted) <= COMPACT_IN_PLACE:
+            columns = (
+                self._dates, self._cents, self._kind_column, self._memo_column, self._accounts
+            )
+            for i in sorted(deleted, reverse=True):
+                del self._ids[i * ID_BYTES : (i + 1) * ID_BYTES]
+                for values in columns:
+                    del values[i]
+        else:
+            keep = [i for i in range(len(self._cents)) if i not in deleted]
+            column = bytes(self._ids)
+            self._ids = bytearray().join(
+                column[i * ID_BYTES : (i + 1) * ID_BYTES] for i in keep
+            )
+            self._kind_column = bytearray(self._kind_column[i] for i in keep)
+            for slot in ("_dates", "_cents", "_memo_column", "_accounts"):
+                values = getattr(self, slot)
+                setattr(self, slot, array(values.typecode, [values[i] for i in keep]))
+        self._deleted = set()
+        self._positions = None
+
+    def _index(self) -> dict[bytes, int]:
+        # Rows are only marked deleted once the index exists, so building it
+        # never has tombstones to skip.
+        if self._positions is None:
+            column = bytes(self._ids)
+            keys = [column[i : i + ID_BYTES] for i in range(0, len(column), ID_BYTES)]
+            # Backwards, so the first of several rows with one id wins.
+            self._positions = dict(zip(reversed(keys), range(len(keys) - 1, -1, -1)))
+        return self._positions
+
+    # Encoding helpers
+
+    def _id_key(self, id_: str, add: bool = False) -> bytes | None:
+        try:
+            value = uuid.UUID(id_)
+            if str(value) == id_ and value.bytes[:8] != _EXTRA_ID_PREFIX:
+                return value.bytes
+        except (TypeError, ValueError, AttributeError):
+            pass
+        index = self._extra_codes.get(id_)
+        if index is None:
+            if not add:
+                return None
+            self._extra_ids.append(id_)
+            index = self._extra_codes[id_] = len(self._extra_ids) - 1
+        return _EXTRA_ID_PREFIX + index.to_bytes(8, "big")
+
+    def _kind_code(self, kind: str) -> int:
+        code = self._kind_codes.get(kind)
+        if code is None:
+            self.kinds.append(kind)
+            code = self._kind_codes[kind] = len(self.kinds) - 1
+        return code
+
+    def _memo_code(self, memo: str) -> int:
+        code = self._memo_codes.get(memo)
+        if code is None:
+            self._memo_values.append(memo)
+            code = self._memo_codes[memo] = len(self._memo_values) - 1
+        return code
+
+    def _account_code(self, account_id: str | None) -> int:
+        code = self._account_codes.get(account_id)
+        if code is None:
+            self._account_ids.append(account_id)
+            code = self._account_codes[account_id] = len(self._account_ids) - 1
+        return code
+
+    @staticmethod
+    def _row_cents(row: dict) -> int:
+        if "amount_cents" in row:
+            return row["amount_cents"]
+        return to_cents(row["amount"])
+
+    # Row access
+
+    def id_at(self, i: int) -> str:
+        key = bytes(self._ids[i * ID_BYTES : (i + 1) * ID_BYTES])
+        if key[:8] == _EXTRA_ID_PREFIX:
+            return self._extra_ids[int.from_bytes(key[8:], "big")]
+        return str(uuid.UUID(bytes=key))
+
+    def kind_at(self, i: int) -> str:
+        return self.kinds[self._kind_column[i]]
+
+    def cents_at(self, i: int) -> int:
+        return self._cents[i]
+
+    def date_at(self, i: int) -> str:
+        return datetime.date.fromordinal(self._dates[i]).isoformat()
+
+    def memo_at(self, i: int) -> str:
+        return self._memo_values[self._memo_column[i]]
+
+    def account_at(self, i: int) -> str | None:
+        return self._account_ids[self._accounts[i]]
+
+    def stored_row(self, i: int) -> dict:
+        """Row ``i`` as it is saved to disk."""
+        row = {"id": self.id_at(i)}
+        if self.kind_field == "type":
+            row["type"] = self.kind_at(i)
+        row["amount_cents"] = self._cents[i]
+        row["date"] = self.date_at(i)
+        row["memo"] = self.memo_at(i)
+        if self.kind_field != "type":
+            row[self.kind_field] = self.kind_at(i)
+        row["account_id"] = self.account_at(i)
+        return row
+
+    def row(self, i: int) -> dict:
+        """Row ``i`` for display, with the float ``amount`` added."""
+        row = self.stored_row(i)
+        row["amount"] = from_cents(self._cents[i])
+        return row
+
+    def rows(self, indices=None):
+        """Yields display rows for ``indices`` (all rows by default), one at a time."""
+        for i in range(len(self)) if indices is None else indices:
+            yield self.row(i)
+
+    def to_rows(self) -> list[dict]:
+        return [self.stored_row(i) for i in range(len(self))]
+
+    def index_of(self, id_: str) -> int:
+        """Position of the row with ``id_``, or -1."""
+        key = self._id_key(id_)
+        if key is None:
+            return -1
+        return self._index().get(key, -1)
+
+    def positions_of(self, ids) -> dict[str, int]:
+        """Positions of the rows with ``ids``; missing ids are left out."""
+        positions = {}
+        for id_ in ids:
+            i = self.index_of(id_)
+            if i != -1:
+                positions[id_] = i
+        return positions
+
+    # Mutation
+
+    def append(self, row: dict):
+        cents = self._row_cents(row)
+        ordinal = date_ordinal(row["date"])
+        key = self._id_key(row["id"], add=True)
+        if self._positions is not None:
+            self._positions.setdefault(key, len(self._cents))
+        self._ids += key
+        self._dates.append(ordinal)
+        self._cents.append(cents)
+        self._kind_column.append(self._kind_code(row[self.kind_field]))
+        self._memo_column.append(self._memo_code(row.get("memo") or ""))
+        self._accounts.append(self._account_code(row.get("account_id")))
+
+    def extend(self, rows):
+        for row in rows:
+            self.append(row)
+
+    def extend_ledger(self, other: "Ledger"):
+        """Appends the rows of ``other`` column by column, recoding its kinds,
+        memos and accounts. Compacts this ledger first."""
+        self._compact()
+        other._compact()
+        kinds = bytes(self._kind_code(kind) for kind in other.kinds)
+        memos = [self._memo_code(memo) for memo in other._memo_values]
+        accounts = [self._account_code(account) for account in other._account_ids]
+        if other._extra_ids:
+            for i in range(len(other._cents)):
+                self._ids += self._id_key(other.id_at(i), add=True)
+        else:
+            self._ids += other._ids
+        self._dates += other._dates
+        self._cents += other._cents
+        self._kind_column += other._kind_column.translate(kinds.ljust(256, b"\0"))
+        self._memo_column.extend(memos[code] for code in other._memo_column)
+        self._accounts.extend(accounts[code] for code in other._accounts)
+        self._positions = None
+
+    def replace(self, i: int, row: dict):
+        """Overwrites row ``i``; ``row`` keeps or changes the id."""
+        cents = self._row_cents(row)
+        ordinal = date_ordinal(row["date"])
+        key = self._id_key(row["id"], add=True)
+        old_key = bytes(self._ids[i * ID_BYTES : (i + 1) * ID_BYTES])
+        if self._positions is not None and key != old_key:
+            if self._positions.get(old_key) == i:
+                del self._positions[old_key]
+            self._positions.setdefault(key, i)
+        self._ids[i * ID_BYTES : (i + 1) * ID_BYTES] = key
+        self._dates[i] = ordinal
+        self._cents[i] = cents
+        self._kind_column[i] = self._kind_code(row[self.kind_field])
+        self._memo_column[i] = self._memo_code(row.get("memo") or "")
+        self._accounts[i] = self._account_code(row.get("account_id"))
+
+    def set_kind(self, i: int, kind: str):
+        self._kind_column[i] = self._kind_code(kind)
+
+    def delete(self, i: int) -> dict:
+        """Marks row ``i`` deleted and returns it as a display row."""
+        row = self.row(i)
+        self.delete_many((i,))
+        return row
+
+    def delete_many(self, positions):
+        """Marks the rows at ``positions`` deleted; they keep their positions
+        (and the other rows theirs) until the next compaction."""
+        index = self._index()
+        for i in positions:
+            if i in self._deleted:
+                continue
+            key = bytes(self._ids[i * ID_BYTES : (i + 1) * ID_BYTES])
+            if index.get(key) == i:
+                del index[key]
+            self._deleted.add(i)
+
+    # Queries
+
+    def select(
+        self,
+        search_query: str = "",
+        kind: str = "all",
+        start_date: str = "",
+        end_date: str = "",
+        min_cents: int | None = None,
+        max_cents: int | None = None,
+        account_id: str = "all",
+    ) -> list[int]:
+        """Positions of the rows matching every given filter, in ledger order.
+
+        ``search_query`` matches the memo (case-insensitively) or the display
+        amount; ``account_id`` is an id, ``"cash"`` for rows without one, or
+        ``"all"``.
+        """
+        indices = range(len(self))
+        if search_query:
+            search_lower = search_query.lower()
+            memos, cents = self._memo_column, self._cents
+            # Match each distinct memo once, then compare codes.
+            matching = {
+                code
+                for code, memo in enumerate(self._memo_values)
+                if search_lower in memo.lower()
+            }
+            indices = [
+                i
+                for i in indices
+                if memos[i] in matching or search_lower in str(from_cents(cents[i]))
+            ]
+        if kind != "all":
+            code = self._kind_codes.get(kind)
+            column = self._kind_column
+            indices = [i for i in indices if column[i] == code]
+        if start_date:
+            start = date_ordinal(start_date)
+            indices = [i for i in indices if self._dates[i] >= start]
+        if end_date:
+            end = date_ordinal(end_date)
+            indices = [i for i in indices if self._dates[i] <= end]
+        if min_cents is not None:
+            indices = [i for i in indices if self._cents[i] >= min_cents]
+        if max_cents is not None:
+            indices = [i for i in indices if self._cents[i] <= max_cents]
+        if account_id != "all":
+            code = self._account_codes.get(None if account_id == "cash" else account_id)
+            indices = [i for i in indices if self._accounts[i] == code]
+        return list(indices)
+
+    def sort(self, indices: list[int], sort_by: str, descending: bool) -> list[int]:
+        """Sorts ``indices`` by date, amount or kind; ties keep ledger order."""
+        if sort_by == "amount":
+            key = self._cents.__getitem__
+        elif sort_by == self.kind_field:
+            key = self.kind_at
+        else:
+            key = self._dates.__getitem__
+        return sorted(indices, key=key, reverse=descending)
+
+    def sum_cents(self, kind: str) -> int:
+        self._compact()
+        code = self._kind_codes.get(kind)
+        column = self._kind_column
+        return sum(c for i, c in enumerate(self._cents) if column[i] == code)
+
+    def monthly_cents(self) -> dict[str, dict[str, int]]:
+        """Cents per ``YYYY-MM`` month and kind."""
+        self._compact()
+        months = {}
+        for ordinal, cents, code in zip(self._dates, self._cents, self._kind_column):
+            date = datetime.date.fromordinal(ordinal)
+            month = months.setdefault(f"{date.year:04d}-{date.month:02d}", {})
+            kind = self.kinds[code]
+            month[kind] = month.get(kind, 0) + cents
+        return months
+
+    # Columns, for vectorized consumers such as the columnar export
+
+    @property
+    def date_ordinals(self) -> array:
+        self._compact()
+        return self._dates
+
+    @property
+    def cents(self) -> array:
+        self._compact()
+        return self._cents
+
+    @property
+    def kind_codes(self) -> bytearray:
+        self._compact()
+        return self._kind_column
+
+    @property
+    def memo_codes(self) -> array:
+        self._compact()
+        return self._memo_column
+
+    @property
+    def memo_values(self) -> list[str]:
+        return self._memo_values
+
+    @property
+    def account_codes(self) -> array:
+        self._compact()
+        return self._accounts
+
+    @property
+    def account_ids(self) -> list[str | None]:
+        return self._account_ids
@@ -0,0 +1,252 @@
+"""Year segments: the cold tier of the maaser ledger.
+
+Once the books are closed through the end of a year (see ``periods``) and
+the year is older than the last ``HOT_YEARS`` calendar years, its rows are
+moved out of the data file into a segment file of their own, in the
+``<data file>_archive`` directory beside it. Day-to-day loads then parse only
+the recent rows.
+
+A segment file holds two lines: a summary header (``Segment``: row count,
+date and amount range, accounts, cents per kind and per month) and the rows
+as a JSON array. Its name ends in a hash of the rows, so a segment is never
+rewritten in place. The data file lists the headers of the current segments
+under ``"archive"``; that manifest is saved with the data, so moving rows to
+or from segments commits in the same atomic save, and segment files that
+the saved manifest does not list are deleted afterwards (``discard``).
+
+Views only read a segment when they have a date range or a search whose
+filters its header cannot rule out (``needed``), and each segment is parsed
+once per process. Closed rows cannot change, so neither can segments;
+reopening a period moves its archived years back into the data file.
+"""
+
+import contextlib
+import datetime
+import functools
+import hashlib
+import json
+import os
+import tempfile
+from typing import TypedDict
+
+from app.records import Ledger, date_ordinal
+from app.storage import StorageError
+
+# Calendar years (the current one included) that always stay in the data file.
+HOT_YEARS = 2
+# Parsed segments kept per process.
+CACHED_SEGMENTS = 32
+
+
+class Segment(TypedDict):
+    year: int
+    file: str
+    sha256: str  # of the rows line
+    rows: int
+    first: str
+    last: str
+    min_cents: int
+    max_cents: int
+    accounts: list[str | None]
+    cents: dict[str, int]  # per kind
+    months: dict[str, dict[str, int]]  # YYYY-MM -> kind -> cents
+
+
+def archive_dir(data_file: str) -> str:
+    """The segment directory of ``data_file``: ``data.json`` -> ``data_archive``."""
+    return os.path.splitext(data_file)[0] + "_archive"
+
+
+def archived_through(segments: list[Segment]) -> str:
+    """Last day of the latest archived year, or ``""`` if none is archived."""
+    return f"{segments[-1]['year']}-12-31" if segments else ""
+
+
+def archive_through(closed_ordinal: int, today: datetime.date) -> int:
+    """Day ordinal of the last day that may be archived: the end of the
+    latest year that is both closed through ``closed_ordinal`` and older than
+    the hot years. 0 if there is none."""
+    through = min(closed_ordinal, datetime.date(today.year - HOT_YEARS, 12, 31).toordinal())
+    if through <= 0:
+        return 0
+    year = datetime.date.fromordinal(through).year
+    if datetime.date(year, 12, 31).toordinal() > through:
+        year -= 1
+    return datetime.date(year, 12, 31).toordinal() if year > 0 else 0
+
+
+def _summary(year: int, rows: list[dict], kind_field: str) -> dict:
+    cents, months, accounts = {}, {}, {}
+    for row in rows:
+        kind, amount = row[kind_field], row["amount_cents"]
+        cents[kind] = cents.get(kind, 0) + amount
+        month = months.setdefault(row["date"][:7], {})
+        month[kind] = month.get(kind, 0) + amount
+        accounts[row.get("account_id")] = True
+    amounts = [row["amount_cents"] for row in rows]
+    dates = [row["date"] for row in rows]
+    return {
+        "year": year,
+        "rows": len(rows),
+        "first": min(dates),
+        "last": max(dates),
+        "min_cents": min(amounts),
+        "max_cents": max(amounts),
+        "accounts": list(accounts),
+        "cents": cents,
+        "months": dict(sorted(months.items())),
+    }
+
+
+def write_segment(directory: str, year: int, rows: list[dict], kind_field: str) -> Segment:
+    """Writes ``rows`` (stored rows, all dated in ``year``) as a new segment file."""
+    body = (json.dumps(rows, separators=(",", ":")) + "\n").encode()
+    digest = hashlib.sha256(body).hexdigest()
+    segment = {
+        **_summary(year, rows, kind_field),
+        "file": f"{year}-{digest[:16]}.jsonl",
+        "sha256": digest,
+    }
+    path = os.path.join(directory, segment["file"])
+    if os.path.exists(path):
+        return segment
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{year}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(json.dumps(segment, separators=(",", ":")).encode() + b"\n")
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+    return segment
+
+
+def read_rows(directory: str, segment: Segment) -> list[dict]:
+    """The stored rows of ``segment``; raises ``StorageError`` if the file
+    does not hold the rows its manifest entry describes."""
+    with open(os.path.join(directory, segment["file"]), "rb") as f:
+        f.readline()  # the header
+        body = f.read()
+    if hashlib.sha256(body).hexdigest() != segment["sha256"]:
+        raise StorageError(f"Segment {segment['file']} does not match its checksum")
+    return json.loads(body)
+
+
+@functools.lru_cache(maxsize=CACHED_SEGMENTS)
+def _parsed(directory: str, file: str, sha256: str, kind_field: str) -> Ledger:
+    return Ledger.from_rows(read_rows(directory, {"file": file, "sha256": sha256}), kind_field)
+
+
+def load_segment(directory: str, segment: Segment, kind_field: str = "type") -> Ledger:
+    """``segment`` as a ledger, parsed once per process. Shared: do not modify it."""
+    return _parsed(os.path.abspath(directory), segment["file"], segment["sha256"], kind_field)
+
+
+def needed(
+    segments: list[Segment],
+    search_query: str = "",
+    kind: str = "all",
+    start_date: str = "",
+    end_date: str = "",
+    min_cents: int | None = None,
+    max_cents: int | None = None,
+    account_id: str = "all",
+) -> list[Segment]:
+    """The segments a view with these filters (as for ``Ledger.select``) has
+    to read: none unless it has a date range or a search, otherwise those
+    whose header does not rule every row out."""
+    if not (search_query or start_date or end_date):
+        return []
+    account = None if account_id == "cash" else account_id
+    return [
+        segment
+        for segment in segments
+        if (not start_date or segment["last"] >= start_date)
+        and (not end_date or segment["first"] <= end_date)
+        and (kind == "all" or kind in segment["cents"])
+        and (min_cents is None or segment["max_cents"] >= min_cents)
+        and (max_cents is None or segment["min_cents"] <= max_cents)
+        and (account_id == "all" or account in segment["accounts"])
+    ]
+
+
+def view_ledger(ledger: Ledger, directory: str, segments: list[Segment]) -> Ledger:
+    """``ledger`` followed by the rows of ``segments``. Without segments this
+    is ``ledger`` itself; otherwise a new ledger whose first rows are
+    ``ledger``'s, compacted."""
+    if not segments:
+        return ledger
+    view = ledger.copy()
+    for segment in segments:
+        view.extend_ledger(load_segment(directory, segment, ledger.kind_field))
+    return view
+
+
+def archive(
+    directory: str, ledger: Ledger, segments: list[Segment], through: int
+) -> tuple[list[Segment], list[int]]:
+    """Writes the rows of ``ledger`` dated on or before the day ordinal
+    ``through`` to year segments, merged with any segment of the same year.
+
+    Returns the new manifest and the positions of the archived rows, which
+    the caller deletes from ``ledger`` and saves along with the manifest.
+    """
+    if not through:
+        return segments, []
+    by_year = {}
+    for i in ledger.select(end_date=datetime.date.fromordinal(through).isoformat()):
+        by_year.setdefault(ledger.date_at(i)[:4], []).append(i)
+    if not by_year:
+        return segments, []
+    kept = {segment["year"]: segment for segment in segments}
+    for year, positions in by_year.items():
+        rows = [ledger.stored_row(i) for i in positions]
+        if int(year) in kept:
+            rows = read_rows(directory, kept[int(year)]) + rows
+        kept[int(year)] = write_segment(directory, int(year), rows, ledger.kind_field)
+    return (
+        sorted(kept.values(), key=lambda segment: segment["year"]),
+        [i for positions in by_year.values() for i in positions],
+    )
+
+
+def restore(
+    directory: str, segments: list[Segment], closed_ordinal: int
+) -> tuple[list[Segment], list[dict]]:
+    """Splits off the segments of years that are no longer closed through
+    their last day. Returns the segments kept and the rows of the others."""
+    kept, rows = [], []
+    for segment in segments:
+        if date_ordinal(f"{segment['year']}-12-31") <= closed_ordinal:
+            kept.append(segment)
+        else:
+            rows.extend(read_rows(directory, segment))
+    return kept, rows
+
+
+def discard(directory: str, segments: list[Segment], keep: list[Segment]):
+    """Deletes the files of ``segments`` that ``keep`` does not list."""
+    files = {segment["file"] for segment in keep}
+    for segment in segments:
+        if segment["file"] not in files:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(os.path.join(directory, segment["file"]))
+
+
+def monthly_cents(segments: list[Segment]) -> list[tuple[str, dict[str, int]]]:
+    """``(YYYY-MM, cents per kind)`` for each archived month, oldest first."""
+    return [month for segment in segments for month in segment["months"].items()]
+
+
+def with_segments(data: dict, data_file: str, segments: list[Segment]) -> dict:
+    """``data`` (as from ``ledger.load_ledger``) with the rows of ``segments``
+    added to its transactions."""
+    return {
+        **data,
+        "transactions": view_ledger(data["transactions"], archive_dir(data_file), segments),
+    }
@@ -0,0 +1,225 @@
+"""Compressed, content-hashed snapshots of the data files, taken in the background.
+
+``snapshot_loop`` is registered as a lifespan task. Every
+``SNAPSHOT_INTERVAL`` seconds it runs ``run_maintenance`` in a worker
+thread, off the request path. For each data file, that:
+
+* skips the file if its version stamp (read from the file's tail) is the one
+  last snapshotted, so an unchanged ledger costs one small read;
+* otherwise reads it under a shared lock, checks that it parses, and writes
+  it gzip-compressed to ``snapshots/<name>-v<version>-<hash>.json.gz``,
+  the hash being the SHA-256 of the uncompressed file; the archived year
+  segments it lists (see ``segments``) never change, so each is copied once;
+* reads every file it wrote back and checks the hash before listing the
+  snapshot in ``snapshots/index.json``.
+
+It then deletes the snapshots the retention policy drops (it keeps the newest
+``KEEP_RECENT`` of each file plus the newest of each of the last
+``KEEP_DAYS`` days) and the segment copies no kept snapshot lists, and
+compacts the undo logs.
+
+A save that writes a corrupt file cannot spoil the history: the file fails to
+parse and is not snapshotted, and earlier snapshots are only deleted by age.
+To restore, stop the server and decompress a snapshot over its data file (and
+its segments into the archive directory).
+"""
+
+import asyncio
+import contextlib
+import datetime
+import gzip
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from typing import TypedDict
+
+from app import metrics, oplog
+from app.segments import archive_dir
+from app.storage import (
+    BUSINESS_DATA_FILE,
+    BUSINESS_OPLOG_FILE,
+    TRANSACTION_DATA_FILE,
+    TRANSACTION_OPLOG_FILE,
+    StorageError,
+    file_lock,
+    load_data,
+    read_version,
+    save_data,
+)
+
+SNAPSHOT_DIR = "snapshots"
+INDEX_FILE = "index.json"
+DATA_FILES = (TRANSACTION_DATA_FILE, BUSINESS_DATA_FILE)
+OPLOG_FILES = (TRANSACTION_OPLOG_FILE, BUSINESS_OPLOG_FILE)
+# Seconds between runs; the first waits out start-up.
+SNAPSHOT_INTERVAL = 15 * 60
+SNAPSHOT_START_DELAY = 60
+KEEP_RECENT = 12
+KEEP_DAYS = 30
+# The data files shrink about 4x at level 1 and 4.6x at the default level 6,
+# which takes twice the CPU.
+COMPRESS_LEVEL = 1
+
+
+class Snapshot(TypedDict):
+    file: str
+    source: str
+    version: int
+    sha256: str  # of the uncompressed data file
+    bytes: int
+    compressed_bytes: int
+    taken_at: str
+    segments: list[str]  # archived segment files the data file lists
+
+
+def _write_verified(path: str, raw: bytes):
+    """Writes ``raw`` gzip-compressed to ``path``, then reads it back and
+    checks it; raises ``StorageError`` (and removes the file) if it differs."""
+    fd, tmp_path = tempfile.mkstemp(
+        dir=os.path.dirname(path), prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(gzip.compress(raw, compresslevel=COMPRESS_LEVEL, mtime=0))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+    with gzip.open(path, "rb") as f:
+        copy = f.read()
+    if hashlib.sha256(copy).digest() != hashlib.sha256(raw).digest():
+        os.unlink(path)
+        raise StorageError(f"Snapshot {path} does not match the data it was written from")
+
+
+def _segment_copies(directory: str, data_file: str) -> str:
+    return os.path.join(directory, os.path.basename(archive_dir(data_file)))
+
+
+def take_snapshot(path: str, directory: str, last: Snapshot | None = None) -> Snapshot | None:
+    """Snapshots the data file ``path`` into ``directory``, unless it is
+    missing or unchanged since ``last``. Raises ``ValueError`` if the file
+    does not parse."""
+    if not os.path.exists(path):
+        return None
+    if last is not None and read_version(path) == last["version"]:
+        return None
+    with file_lock(path, shared=True):
+        with open(path, "rb") as f:
+            raw = f.read()
+    data = json.loads(raw)
+    digest = hashlib.sha256(raw).hexdigest()
+    if last is not None and digest == last["sha256"]:
+        return None
+    segments = [segment["file"] for segment in data.get("archive", [])]
+    copies = _segment_copies(directory, path)
+    for file in segments:
+        copy_path = os.path.join(copies, f"{file}.gz")
+        if not os.path.exists(copy_path):
+            os.makedirs(copies, exist_ok=True)
+            with open(os.path.join(archive_dir(path), file), "rb") as f:
+                _write_verified(copy_path, f.read())
+    version = data.get("version", 0)
+    stem = os.path.splitext(os.path.basename(path))[0]
+    name = f"{stem}-v{version}-{digest[:16]}.json.gz"
+    _write_verified(os.path.join(directory, name), raw)
+    return {
+        "file": name,
+        "source": os.path.basename(path),
+        "version": version,
+        "sha256": digest,
+        "bytes": len(raw),
+        "compressed_bytes": os.path.getsize(os.path.join(directory, name)),
+        "taken_at": datetime.datetime.now().isoformat(timespec="seconds"),
+        "segments": segments,
+    }
+
+
+def retained(snapshots: list[Snapshot], today: datetime.date) -> list[Snapshot]:
+    """The snapshots the retention policy keeps, oldest first: of each data
+    file, the newest ``KEEP_RECENT`` and the newest of each of the last
+    ``KEEP_DAYS`` days."""
+    by_source = {}
+    for snapshot in snapshots:
+        by_source.setdefault(snapshot["source"], []).append(snapshot)
+    kept = []
+    for group in by_source.values():
+        days = set()
+        for i, snapshot in enumerate(sorted(group, key=lambda s: s["taken_at"], reverse=True)):
+            day = snapshot["taken_at"][:10]
+            recent = (today - datetime.date.fromisoformat(day)).days < KEEP_DAYS
+            if i < KEEP_RECENT or (recent and day not in days):
+                kept.append(snapshot)
+            days.add(day)
+    return sorted(kept, key=lambda s: s["taken_at"])
+
+
+def _prune_segment_copies(directory: str, kept: list[Snapshot]):
+    for name in DATA_FILES:
+        copies = _segment_copies(directory, name)
+        listed = {f"{file}.gz" for s in kept if s["source"] == name for file in s["segments"]}
+        with contextlib.suppress(FileNotFoundError):
+            for file in os.listdir(copies):
+                if file not in listed:
+                    os.unlink(os.path.join(copies, file))
+
+
+def run_maintenance(
+    data_dir: str = ".", today: datetime.date | None = None
+) -> dict[str, list[str]]:
+    """Snapshots the changed data files in ``data_dir``, prunes old
+    snapshots and compacts the undo logs. Blocking; returns the snapshot
+    files ``written`` and ``deleted``."""
+    directory = os.path.join(data_dir, SNAPSHOT_DIR)
+    os.makedirs(directory, exist_ok=True)
+    index_path = os.path.join(directory, INDEX_FILE)
+    written = []
+    # One run at a time across workers; the lock file is not the index's.
+    with metrics.SNAPSHOT_SECONDS.time(), file_lock(os.path.join(directory, "maintenance")):
+        index, version = load_data(index_path)
+        snapshots = index.get("snapshots", [])
+        for name in DATA_FILES:
+            last = next((s for s in reversed(snapshots) if s["source"] == name), None)
+            try:
+                snapshot = take_snapshot(os.path.join(data_dir, name), directory, last)
+            except (OSError, StorageError, ValueError) as e:
+                metrics.SNAPSHOT_FAILURES.inc(file=name)
+                logging.error(f"Error snapshotting {name}: {e}")
+                continue
+            if snapshot is not None:
+                snapshots.append(snapshot)
+                written.append(snapshot["file"])
+        kept = retained(snapshots, today or datetime.date.today())
+        kept_files = {s["file"] for s in kept}
+        deleted = [s["file"] for s in snapshots if s["file"] not in kept_files]
+        if written or deleted:
+            # The index is saved first, so it never lists a deleted file.
+            save_data(index_path, {"snapshots": kept}, version)
+        for file in deleted:
+            with contextlib.suppress(FileNotFoundError):
+                os.unlink(os.path.join(directory, file))
+        _prune_segment_copies(directory, kept)
+        for name in OPLOG_FILES:
+            path = os.path.join(data_dir, name)
+            if os.path.exists(path):
+                try:
+                    oplog.get_log(path).compact()
+                except (OSError, StorageError) as e:
+                    logging.error(f"Error compacting {name}: {e}")
+    return {"written": written, "deleted": deleted}
+
+
+async def snapshot_loop():
+    """Lifespan task running ``run_maintenance`` every ``SNAPSHOT_INTERVAL`` seconds."""
+    await asyncio.sleep(SNAPSHOT_START_DELAY)
+    while True:
+        try:
+            await asyncio.to_thread(run_maintenance)
+        except Exception as e:
+            logging.exception(f"Error in snapshot maintenance: {e}")
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
@@ -0,0 +1,267 @@
+"""Incremental parsers for CSV, OFX and QIF bank statements.
+
+Each parser has the same interface as ``importers.JsonArrayParser``: ``feed``
+text in arbitrary slices and get back the items completed so far, then call
+``close``. Items use the JSON import schema, so they go through the same row
+validators. Statements carry signed amounts: for the maaser ledger credits
+become income, while a debit may be maaser or ordinary spending, so it is
+typed ``DEBIT`` and rejected by the validator unless a mapped type column
+classifies it; business expenses use the absolute amount.
+"""
+
+import csv
+import io
+import datetime
+import re
+
+# Type of a maaser-ledger debit that no type column classifies.
+DEBIT = "debit"
+DEFAULT_CSV_COLUMNS = {
+    "date": "date",
+    "amount": "amount",
+    "memo": "memo",
+    "type": "type",
+    "status": "status",
+    "debit": "debit",
+    "credit": "credit",
+}
+# Headers tried for the memo when the mapped memo column is not in the file.
+MEMO_HEADERS = ("description", "payee", "name", "details", "narrative")
+# Values of a bank's own type column, which give the direction of an amount
+# rather than an income/maaser type: credit is +1, debit -1.
+DIRECTIONS = {"credit": 1, "cr": 1, "debit": -1, "dr": -1}
+STATEMENT_EXTENSIONS = {
+    ".json": "json",
+    ".csv": "csv",
+    ".ofx": "ofx",
+    ".qfx": "ofx",
+    ".qif": "qif",
+}
+
+_DATE_FORMATS = ("%Y-%m-%d", "%m/%d/%Y", "%m/%d/%y", "%Y/%m/%d", "%d.%m.%Y")
+_OFX_FIELD = re.compile(r"<(\w+)>([^<\r\n]*)")
+
+
+def normalize_date(text: str) -> str:
+    """Converts common statement date formats to YYYY-MM-DD.
+
+    Unrecognized values are returned unchanged so the row validator can
+    reject them with a reason.
+    """
+    value = text.strip()
+    # OFX: YYYYMMDD[HHMMSS[.XXX]][[-5:EST]]; QIF: M/D'YY
+    if len(value) >= 8 and value[:8].isdigit():
+        value = f"{value[:4]}-{value[4:6]}-{value[6:8]}"
+    value = value.replace("'", "/").replace(" ", "")
+    for fmt in _DATE_FORMATS:
+        try:
+            return datetime.datetime.strptime(value, fmt).date().isoformat()
+        except ValueError:
+            continue
+    return text.strip()
+
+
+def parse_amount(text: str):
+    """Parses ``$1,234.50``, ``-12``, ``(12.00)`` and similar into a float.
+
+    Unparseable values are returned unchanged for the row validator to reject.
+    """
+    value = text.strip().replace("$", "").replace(",", "").replace(" ", "")
+    negative = value.startswith("(") and value.endswith(")")
+    if negative:
+        value = value[1:-1]
+    try:
+        amount = float(value)
+    except ValueError:
+        return text
+    return -amount if negative else amount
+
+
+def statement_item(kind: str, date: str, amount, memo: str) -> dict:
+    """Maps one signed statement line onto the JSON import schema."""
+    item = {"amount": amount, "date": date, "memo": memo}
+    if kind != "business":
+        item["type"] = DEBIT if isinstance(amount, float) and amount < 0 else "income"
+    if isinstance(amount, float):
+        item["amount"] = abs(amount)
+    return item
+
+
+class CsvStatementParser:
+    """Parses a CSV statement with a header row, using a column mapping.
+
+    ``columns`` maps import fields (date, amount, memo, type, status, debit,
+    credit) to header names, matched case-insensitively. Without an amount
+    column, ``credit - debit`` is used. Without the mapped memo column, the
+    first of ``MEMO_HEADERS`` in the file is used. A type or status column
+    is passed through instead of being derived from the amount's sign,
+    unless it holds a bank's credit/debit direction, which signs the amount.
+    """
+
+    def __init__(self, kind: str, columns: dict[str, str] | None = None):
+        self._kind = kind
+        self._columns = {**DEFAULT_CSV_COLUMNS, **(columns or {})}
+        self._positions = None
+        self._pending = ""
+
+    def _resolve_header(self, header: list[str]):
+        names = [h.strip().lstrip("\ufeff").lower() for h in header]
+        self._positions = {}
+        for field, column in self._columns.items():
+            column = (column or "").strip().lower()
+            if column in names:
+                self._positions[field] = names.index(column)
+        if "memo" not in self._positions:
+            for column in MEMO_HEADERS:
+                if column in names:
+                    self._positions["memo"] = names.index(column)
+                    break
+
+    def _cell(self, record: list[str], field: str) -> str | None:
+        position = self._positions.get(field)
+        if position is None or position >= len(record):
+            return None
+        return record[position]
+
+    def _item(self, record: list[str]) -> dict:
+        date = normalize_date(self._cell(record, "date") or "")
+        memo = (self._cell(record, "memo") or "").strip()
+        amount_text = self._cell(record, "amount")
+        if amount_text is not None:
+            amount = parse_amount(amount_text)
+        else:
+            credit = parse_amount(self._cell(record, "credit") or "0") or 0.0
+            debit = parse_amount(self._cell(record, "debit") or "0") or 0.0
+            if isinstance(credit, float) and isinstance(debit, float):
+                amount = credit - abs(debit)
+            else:
+                amount = ""
+        kind_field = "status" if self._kind == "business" else "type"
+        explicit_kind = (self._cell(record, kind_field) or "").strip().lower()
+        direction = DIRECTIONS.get(explicit_kind)
+        if direction and isinstance(amount, float):
+            amount = direction * abs(amount)
+        item = statement_item(self._kind, date, amount, memo)
+        if explicit_kind and not direction:
+            item[kind_field] = explicit_kind
+        return item
+
+    def _parse_records(self, text: str) -> list:
+        items = []
+        for record in csv.reader(io.StringIO(text)):
+            if not record or not any(cell.strip() for cell in record):
+                continue
+            if self._positions is None:
+                self._resolve_header(record)
+                continue
+            items.append(self._item(record))
+        return items
+
+    def feed(self, text: str) -> list:
+        buffer = self._pending + text
+        cut = buffer.rfind("\n") + 1
+        # A newline inside a quoted cell is not a record boundary; wait until
+        # the quotes in the complete part are balanced.
+        while cut and buffer.count('"', 0, cut) % 2:
+            cut = buffer.rfind("\n", 0, cut - 1) + 1
+        self._pending = buffer[cut:]
+        return self._parse_records(buffer[:cut])
+
+    def close(self) -> list:
+        items = self._parse_records(self._pending)
+        self._pending = ""
+        return items
+
+
+class OfxStatementParser:
+    """Parses ``<STMTTRN>`` blocks from OFX/QFX files (SGML or XML flavour)."""
+
+    def __init__(self, kind: str):
+        self._kind = kind
+        self._buffer = ""
+
+    def _item(self, block: str) -> dict:
+        fields = {k.upper(): v.strip() for k, v in _OFX_FIELD.findall(block)}
+        name = fields.get("NAME", "")
+        memo = fields.get("MEMO", "")
+        if name and memo and memo != name:
+            memo = f"{name} - {memo}"
+        return statement_item(
+            self._kind,
+            normalize_date(fields.get("DTPOSTED", "")),
+            parse_amount(fields.get("TRNAMT", "")),
+            memo or name,
+        )
+
+    def feed(self, text: str) -> list:
+        buffer = self._buffer + text
+        upper = buffer.upper()
+        items = []
+        pos = 0
+        while True:
+            start = upper.find("<STMTTRN>", pos)
+            if start < 0:
+                # Keep a tail in case the opening tag is split across slices.
+                pos = max(pos, len(buffer) - len("<STMTTRN>"))
+                break
+            end = upper.find("</STMTTRN>", start)
+            if end < 0:
+                pos = start
+                break
+            items.append(self._item(buffer[start:end]))
+            pos = end + len("</STMTTRN>")
+        self._buffer = buffer[pos:]
+        return items
+
+    def close(self) -> list:
+        self._buffer = ""
+        return []
+
+
+class QifStatementParser:
+    """Parses QIF records (``D`` date, ``T``/``U`` amount, ``P`` payee, ``M`` memo)."""
+
+    def __init__(self, kind: str):
+        self._kind = kind
+        self._pending = ""
+        self._fields = {}
+
+    def _item(self) -> dict:
+        payee = self._fields.get("P", "")
+        memo = self._fields.get("M", "")
+        if payee and memo and memo != payee:
+            memo = f"{payee} - {memo}"
+        return statement_item(
+            self._kind,
+            normalize_date(self._fields.get("D", "")),
+            parse_amount(self._fields.get("T", self._fields.get("U", ""))),
+            memo or payee,
+        )
+
+    def _parse_lines(self, lines: list[str]) -> list:
+        items = []
+        for line in lines:
+            line = line.strip()
+            if not line or line.startswith("!"):
+                continue
+            if line.startswith("^"):
+                if self._fields:
+                    items.append(self._item())
+                self._fields = {}
+                continue
+            self._fields.setdefault(line[0], line[1:].strip())
+        return items
+
+    def feed(self, text: str) -> list:
+        buffer = self._pending + text
+        cut = buffer.rfind("\n") + 1
+        self._pending = buffer[cut:]
+        return self._parse_lines(buffer[:cut].splitlines())
+
+    def close(self) -> list:
+        items = self._parse_lines(self._pending.splitlines())
+        self._pending = ""
+        if self._fields:
+            items.append(self._item())
+            self._fields = {}
+        return items
@@ -3,28 +3,71 @@ from typing import TypedDict, Literal
 import datetime
 import uuid
 import logging
-import os
-import shutil
-import json
+import asyncio
 from app.states.transaction_state import BankAccount, get_hebrew_date_string
-
-DATA_FILE = "business_data.json"
-BACKUP_FILE = "business_data_backup.json"
+from app.states.transaction_state import DATA_FILE as MAIN_DATA_FILE
+from app.states.transaction_state import RECENT_OPERATIONS, count_label
+from app.storage import (
+    BUSINESS_DATA_FILE,
+    BUSINESS_OPLOG_FILE,
+    StaleWriteError,
+    StorageError,
+)
+from app.analytics import LedgerAnalytics
+from app.ledger import (
+    BUSINESS_SORT_FIELDS,
+    duplicate_groups,
+    filter_business_transactions,
+    load_ledger,
+    save_ledger,
+    sort_transactions,
+)
+from app.money import from_cents, to_cents
+from app import metrics, oplog
+from app.profiling import profile_function, profiled
+from app.oplog import OperationSummary
+from app.records import BUSINESS_KINDS, Ledger
+from app.importers import (
+    DuplicateIndex,
+    ImportStage,
+    StreamingImport,
+    copy_upload_to_temp,
+    describe_import_error,
+    discard_spool,
+    discard_staged_file,
+    format_for_filename,
+    iter_accepted_batches,
+    merge_staged_files,
+    run_in_import_pool,
+    stage_import_file,
+    read_spool_page,
+    parse_business_item,
+)
+
+profile_function(__name__, "get_hebrew_date_string")
+
+DATA_FILE = BUSINESS_DATA_FILE
+OPLOG_FILE = BUSINESS_OPLOG_FILE
 
 
 class BusinessTransaction(TypedDict):
     id: str
-    amount: float
+    amount: float  # Display value derived from amount_cents; never saved.
+    amount_cents: int
     date: str
     memo: str
     status: Literal["pending", "reimbursed"]
     account_id: str | None
 
 
+class BusinessImportPreviewRow(BusinessTransaction):
+    match: Literal["new", "exact", "near"]
+
+
+@profiled
 class BusinessExpenseState(rx.State):
     """Manages all business expense related data and logic."""
 
-    transactions: list[BusinessTransaction] = []
     accounts: list[BankAccount] = []  # We might need to load accounts here too or share them
     show_form_modal: bool = False
     is_editing: bool = False
@@ -46,53 +89,74 @@ class BusinessExpenseState(rx.State):
     # Import State
     show_import_modal: bool = False
     import_json_text: str = ""
-    import_preview: list[BusinessTransaction] = []
+    import_preview: list[BusinessImportPreviewRow] = []
+    import_count: int = 0
+    import_skipped: int = 0
+    import_progress: int = 0
+    import_page: int = 0
+    import_page_count: int = 0
+    import_min_date: str = ""
+    import_max_date: str = ""
+    import_totals: dict[str, float] = {}
+    import_invalid_reasons: list[dict] = []
+    import_new_count: int = 0
+    import_exact_count: int = 0
+    import_near_count: int = 0
+    import_skip_exact: bool = True
+    import_skip_near: bool = False
+    csv_date_column: str = "date"
+    csv_amount_column: str = "amount"
+    csv_memo_column: str = "memo"
+    csv_status_column: str = "status"
+    is_importing: bool = False
     import_error: str = ""
-    deleted_history: list[BusinessTransaction] = []
+    recent_operations: list[OperationSummary] = []
+    undo_title: str = ""
+    redo_title: str = ""
+    selected_lookup: dict[str, bool] = {}
+    batch_memo: str = ""
+    _ledger: Ledger = Ledger("status", BUSINESS_KINDS)
+    _data_version: int = 0
+    _import_spool: str = ""
+    _import_page_offsets: list[int] = []
+
+    @rx.var
+    def _analytics(self) -> LedgerAnalytics:
+        """NumPy snapshot of the ledger that the analytics vars read from."""
+        return LedgerAnalytics(self._ledger)
 
     @rx.var
     def total_pending(self) -> float:
         """Calculates the total pending reimbursement amount."""
-        return sum((t["amount"] for t in self.transactions if t["status"] == "pending"))
+        return from_cents(self._analytics.sum_cents("pending"))
 
     @rx.var
-    def filtered_transactions(self) -> list[BusinessTransaction]:
-        """Applies search and filters to the transactions list."""
-        transactions = self.transactions
-        if self.search_query:
-            search_lower = self.search_query.lower()
-            transactions = [
-                t
-                for t in transactions
-                if search_lower in t["memo"].lower() or search_lower in str(t["amount"])
-            ]
-        if self.filter_status != "all":
-            transactions = [t for t in transactions if t["status"] == self.filter_status]
-        
-        return transactions
+    def _view_positions(self) -> list[int]:
+        """Ledger positions of the filtered expenses, in display order."""
+        return sort_transactions(
+            self._ledger,
+            filter_business_transactions(
+                self._ledger, self.search_query, self.filter_status
+            ),
+            self.sort_by,
+            self.sort_order,
+            BUSINESS_SORT_FIELDS,
+        )
 
     @rx.var
-    def sorted_transactions(self) -> list[BusinessTransaction]:
-        """Transactions sorted based on selected field and order."""
-        key_map = {
-            "date": lambda t: t["date"],
-            "amount": lambda t: t["amount"],
-            "status": lambda t: t["status"],
-        }
-        sort_key = key_map.get(self.sort_by, key_map["date"])
-        reverse = self.sort_order == "desc"
-        return sorted(self.filtered_transactions, key=sort_key, reverse=reverse)
+    def visible_count(self) -> int:
+        """Number of expenses matching the search and status filter."""
+        return len(self._view_positions)
 
     @rx.var
     def transactions_with_hebrew_dates(self) -> list[dict]:
         """Returns transactions with Hebrew date and account name added."""
         accounts_map = {acc["id"]: acc["name"] for acc in self.accounts}
         result = []
-        for t in self.sorted_transactions:
-            t_copy = dict(t)
-            t_copy["hebrew_date"] = get_hebrew_date_string(t["date"])
-            t_copy["account_name"] = accounts_map.get(t.get("account_id"), "")
-            result.append(t_copy)
+        for t in self._ledger.rows(self._view_positions):
+            t["hebrew_date"] = get_hebrew_date_string(t["date"])
+            t["account_name"] = accounts_map.get(t["account_id"], "")
+            result.append(t)
         return result
 
     @rx.var
@@ -103,62 +167,26 @@ class BusinessExpenseState(rx.State):
         return get_hebrew_date_string(self.form_date)
 
     @rx.var
-    def potential_duplicates(self) -> list[str]:
-        """Identifies potential duplicate transactions."""
-        duplicates = set()
-        # For business expenses, we might not have a 'verified' list yet, 
-        # but we can check for identical amount/date/memo
-        for i, t1 in enumerate(self.transactions):
-            if t1["id"] in duplicates:
-                continue
-            for j in range(i + 1, len(self.transactions)):
-                t2 = self.transactions[j]
-                if t1["id"] == t2["id"]:
-                    continue
-                if t1["amount"] == t2["amount"] and t1["memo"] == t2["memo"]:
-                    try:
-                        date1 = datetime.date.fromisoformat(t1['date'])
-                        date2 = datetime.date.fromisoformat(t2['date'])
-                        if abs(date1 - date2) <= datetime.timedelta(days=1):
-                            duplicates.add(t1["id"])
-                            duplicates.add(t2["id"])
-                    except ValueError:
-                        pass
-        return sorted(list(duplicates))
+    def potential_duplicates(self) -> dict[str, bool]:
+        """Ids of potential duplicate expenses, as a lookup for the rows."""
+        return {
+            self._ledger.id_at(i): True
+            for group in duplicate_groups(self._ledger, match_memo=True)
+            for i in group
+        }
 
     @rx.var
     def transaction_patterns(self) -> list[dict]:
         """Analyzes historical data to identify transaction patterns for suggestions."""
-        from collections import defaultdict, Counter
-        from datetime import datetime
-
-        patterns = defaultdict(list)
-        for t in self.transactions:
-            patterns[t["memo"].lower().strip()].append(t)
-        
         ranked_patterns = []
-        today = datetime.now()
-        
-        for memo, transactions in patterns.items():
-            if not memo:
-                continue
-            frequency = len(transactions)
-            last_used_date = max((datetime.fromisoformat(t["date"]) for t in transactions))
-            recency_days = (today - last_used_date).days
-            recency_score = 0.9 ** (recency_days / 7)
-            
-            amounts = [t["amount"] for t in transactions]
-            avg_amount = sum(amounts) / len(amounts)
-            
-            score = frequency * 0.4 + recency_score * 0.6
-            
+        for p in self._analytics.memo_patterns(False, datetime.date.today()):
+            recency_score = 0.9 ** (p["recency_days"] / 7)
             ranked_patterns.append({
-                "memo": memo.capitalize(),
-                "frequency": frequency,
-                "avg_amount": avg_amount,
-                "score": score
+                "memo": p["memo"].capitalize(),
+                "frequency": p["frequency"],
+                "avg_amount": p["avg_amount"],
+                "score": p["frequency"] * 0.4 + recency_score * 0.6
             })
-            
         ranked_patterns.sort(key=lambda p: p["score"], reverse=True)
         return ranked_patterns
 
@@ -176,47 +204,103 @@ class BusinessExpenseState(rx.State):
     async def on_load(self):
         """Load data from local JSON file on app startup."""
         async with self:
-            if os.path.exists(DATA_FILE):
-                try:
-                    with open(DATA_FILE, "r") as f:
-                        data = json.load(f)
-                        self.transactions = data.get("transactions", [])
-                except Exception as e:
-                    logging.exception(f"Error loading business data: {e}")
-            else:
-                self.transactions = []
-            
-            # Load accounts from the main data file if needed, or just rely on TransactionState
-            # For now, let's assume we might want to read accounts from the main data file 
-            # to populate the dropdown, or we can just fetch them if we import TransactionState
-            # But importing TransactionState here might cause circular imports if not careful.
-            # Let's read the main data file just for accounts to be safe and independent.
-            if os.path.exists("data.json"):
-                 try:
-                    with open("data.json", "r") as f:
-                        main_data = json.load(f)
-                        self.accounts = main_data.get("accounts", [])
-                 except Exception:
-                     pass
+            self._load_data()
+            # Accounts are owned by TransactionState; read them from the main
+            # data file so this state stays independent of it.
+            try:
+                main_data, _ = load_ledger(MAIN_DATA_FILE)
+                self.accounts = main_data.get("accounts", [])
+            except Exception:
+                pass
+
+    def _load_data(self):
+        """Replaces in-memory data with the latest saved version."""
+        try:
+            with metrics.LOAD_SECONDS.time(ledger="business"):
+                data, self._data_version = load_ledger(DATA_FILE, "status")
+        except Exception as e:
+            logging.exception(f"Error loading business data: {e}")
+            return
+        self._ledger = data["transactions"]
+        metrics.TRANSACTIONS.set(len(self._ledger), ledger="business")
+        self._refresh_history()
 
     def _save_data(self):
-        """Saves all data to a local JSON file with backup."""
+        """Saves all data to a local JSON file (snapshotted by ``app.snapshots``).
+
+        If another worker saved first, the stale write is dropped and the
+        latest data is reloaded so the user can repeat the change.
+        """
+        # The ledger is changed in place; reassign it so the vars derived
+        # from it are recomputed.
+        self._ledger = self._ledger
         data = {
-            "transactions": self.transactions,
+            "transactions": self._ledger,
         }
-        
-        if os.path.exists(DATA_FILE):
-            try:
-                shutil.copy2(DATA_FILE, BACKUP_FILE)
-            except Exception as e:
-                logging.error(f"Error creating backup: {e}")
-            
         try:
-            with open(DATA_FILE, "w") as f:
-                json.dump(data, f, indent=2)
+            with metrics.SAVE_SECONDS.time(ledger="business"):
+                self._data_version = save_ledger(DATA_FILE, data, self._data_version)
+            metrics.TRANSACTIONS.set(len(self._ledger), ledger="business")
+        except StaleWriteError as e:
+            metrics.SAVE_FAILURES.inc(ledger="business", reason="stale")
+            logging.warning(f"Rejected stale save: {e}")
+            self._load_data()
+            return rx.toast.warning(
+                "Expenses were changed in another window and have been reloaded. "
+                "Please repeat your last change."
+            )
         except Exception as e:
+            metrics.SAVE_FAILURES.inc(ledger="business", reason="error")
             logging.error(f"Error saving data: {e}")
 
+    def _refresh_history(self):
+        log = oplog.get_log(OPLOG_FILE)
+        self.undo_title = oplog.label(log.latest(undone=False))
+        self.redo_title = oplog.label(log.latest(undone=True))
+
+    def _record(self, kind: str, title: str, detail: str, changes: list[dict | None]):
+        """Saves the data, then logs ``changes`` as one operation to undo."""
+        changes = [change for change in changes if change]
+        version = self._data_version
+        conflict = self._save_data()
+        if not changes or self._data_version == version:
+            return conflict
+        try:
+            operation = oplog.get_log(OPLOG_FILE).record(kind, title, detail, changes)
+        except (OSError, StorageError) as e:
+            logging.error(f"Error logging operation: {e}")
+            return
+        self.recent_operations = [
+            oplog.summary(operation),
+            *self.recent_operations,
+        ][:RECENT_OPERATIONS]
+        self._refresh_history()
+
+    def _change_operation(self, operation_id: str, undone: bool):
+        """Undoes (or redoes) a logged operation and saves the result."""
+        log = oplog.get_log(OPLOG_FILE)
+        operation = log.get(operation_id)
+        if operation is None or operation["undone"] == undone:
+            self._refresh_history()
+            return rx.toast.info("That change is no longer in the undo history.")
+        try:
+            oplog.apply_changes(self._ledger, operation["changes"], undo=undone)
+        except oplog.ConflictError as e:
+            return rx.toast.error(f"{'Undo' if undone else 'Redo'} failed: {e}")
+        version = self._data_version
+        conflict = self._save_data()
+        if self._data_version == version:
+            return conflict
+        try:
+            log.mark(operation_id, undone)
+        except (OSError, StorageError) as e:
+            logging.error(f"Error logging operation: {e}")
+        self.recent_operations = [
+            {**op, "undone": undone} if op["id"] == operation_id else op
+            for op in self.recent_operations
+        ]
+        self._refresh_history()
+
     @rx.event
     def open_new_transaction_modal(self):
         self._reset_form_fields()
@@ -263,99 +347,193 @@ class BusinessExpenseState(rx.State):
             self.form_error = "Amount and Date are required."
             return
         try:
-            amount = float(self.form_amount)
+            cents = to_cents(self.form_amount)
         except ValueError:
             self.form_error = "Amount must be a valid number."
             return
 
         transaction_data = {
-            "amount": amount,
+            "amount_cents": cents,
             "date": self.form_date,
             "memo": self.form_memo,
             "status": self.form_status,
             "account_id": self.form_account_id if self.form_account_id != "cash" else None,
         }
 
+        changes = []
         if self.is_editing and self.current_transaction_id:
-            for i, t in enumerate(self.transactions):
-                if t["id"] == self.current_transaction_id:
-                    self.transactions[i] = {
-                        "id": self.current_transaction_id,
-                        **transaction_data
-                    }
-                    break
+            index = self._ledger.index_of(self.current_transaction_id)
+            if index != -1:
+                before = self._ledger.stored_row(index)
+                self._ledger.replace(
+                    index, {"id": self.current_transaction_id, **transaction_data}
+                )
+                changes.append(oplog.updated(before, self._ledger.stored_row(index)))
+            kind, title = "edit", "Expense edited"
         else:
-            new_transaction: BusinessTransaction = {
-                "id": str(uuid.uuid4()),
-                **transaction_data
-            }
-            self.transactions.append(new_transaction)
-        
+            self._ledger.append({"id": str(uuid.uuid4()), **transaction_data})
+            changes.append(oplog.inserted([self._ledger.stored_row(len(self._ledger) - 1)]))
+            kind, title = "add", "Expense added"
+
         self.close_form_modal()
-        self._save_data()
+        return self._record(kind, title, transaction_data["memo"], changes)
 
     @rx.event
     def delete_transaction(self, transaction_id: str):
-        """Deletes a transaction by its ID and adds it to history."""
-        for t in self.transactions:
-            if t["id"] == transaction_id:
-                self.deleted_history.append(t)
-                break
-        
-        self.transactions = [t for t in self.transactions if t["id"] != transaction_id]
-        self._save_data()
+        """Deletes a transaction by its ID, as an operation that can be undone."""
+        index = self._ledger.index_of(transaction_id)
+        if index == -1:
+            return self._save_data()
+        row = self._ledger.stored_row(index)
+        self._ledger.delete(index)
+        return self._record("delete", "Expense deleted", row["memo"], [oplog.removed([row])])
+
+    @rx.event
+    def undo_operation(self, operation_id: str):
+        return self._change_operation(operation_id, undone=True)
+
+    @rx.event
+    def redo_operation(self, operation_id: str):
+        return self._change_operation(operation_id, undone=False)
+
+    @rx.event
+    def undo_last(self):
+        operation = oplog.get_log(OPLOG_FILE).latest(undone=False)
+        if operation:
+            return self._change_operation(operation["id"], undone=True)
 
     @rx.event
-    def undo_delete(self, transaction_id: str):
-        """Restores a specific transaction from history."""
-        restored = None
-        for t in self.deleted_history:
-            if t["id"] == transaction_id:
-                restored = t
-                break
-        
-        if restored:
-            self.transactions.append(restored)
-            self.deleted_history = [t for t in self.deleted_history if t["id"] != transaction_id]
-            self._save_data()
+    def redo_last(self):
+        operation = oplog.get_log(OPLOG_FILE).latest(undone=True)
+        if operation:
+            return self._change_operation(operation["id"], undone=False)
 
     @rx.event
-    def close_undo_banner(self, transaction_id: str):
-        """Removes a transaction from the undo history."""
-        self.deleted_history = [t for t in self.deleted_history if t["id"] != transaction_id]
+    def dismiss_operation(self, operation_id: str):
+        """Hides an operation from the undo banner; it stays in the history."""
+        self.recent_operations = [
+            op for op in self.recent_operations if op["id"] != operation_id
+        ]
 
     @rx.event
     def toggle_status(self, transaction_id: str):
-        for i, t in enumerate(self.transactions):
-            if t["id"] == transaction_id:
-                new_status = "reimbursed" if t["status"] == "pending" else "pending"
-                self.transactions[i]["status"] = new_status
-                break
-        self._save_data()
+        index = self._ledger.index_of(transaction_id)
+        if index == -1:
+            return self._save_data()
+        before = self._ledger.stored_row(index)
+        status = "reimbursed" if before["status"] == "pending" else "pending"
+        self._ledger.set_kind(index, status)
+        return self._record(
+            "status",
+            f"Marked {status}",
+            before["memo"],
+            [oplog.updated(before, self._ledger.stored_row(index))],
+        )
+
+    @rx.var
+    def selected_count(self) -> int:
+        return len(self.selected_lookup)
 
     @rx.event
-    def export_to_csv(self) -> rx.event.EventSpec:
-        import csv
-        from io import StringIO
-
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["ID", "Date", "Memo", "Amount", "Status"])
-        for t in self.sorted_transactions:
-            writer.writerow(
-                [t["id"], t["date"], t["memo"], t["amount"], t["status"]]
-            )
-        csv_data = output.getvalue()
-        return rx.download(
-            data=csv_data, filename=f"business_expenses_{datetime.date.today()}.csv"
+    def toggle_selected(self, transaction_id: str):
+        if transaction_id in self.selected_lookup:
+            self.selected_lookup.pop(transaction_id)
+        else:
+            self.selected_lookup[transaction_id] = True
+
+    @rx.event
+    def select_visible(self):
+        """Adds every row matching the search and filters to the selection."""
+        self.selected_lookup = {
+            **self.selected_lookup,
+            **dict.fromkeys(map(self._ledger.id_at, self._view_positions), True),
+        }
+
+    @rx.event
+    def clear_selection(self):
+        self.selected_lookup = {}
+
+    def _update_selected(self, kind: str, title: str, fields: dict):
+        """Sets ``fields`` on every selected row as one save and one operation."""
+        positions = self._ledger.positions_of(self.selected_lookup)
+        if not positions:
+            self.selected_lookup = {}
+            return
+        changes = []
+        for i in positions.values():
+            before = self._ledger.stored_row(i)
+            self._ledger.replace(i, {**before, **fields})
+            changes.append(oplog.updated(before, self._ledger.stored_row(i)))
+        return self._record(kind, title, count_label(len(positions), "expense"), changes)
+
+    @rx.event
+    def set_selected_account(self, account_id: str):
+        return self._update_selected(
+            "edit",
+            "Account changed",
+            {"account_id": account_id if account_id != "cash" else None},
         )
 
+    @rx.event
+    def apply_batch_memo(self):
+        if not self.batch_memo:
+            return
+        memo, self.batch_memo = self.batch_memo, ""
+        return self._update_selected("edit", "Memo changed", {"memo": memo})
+
+    @rx.event
+    def set_selected_status(self, status: str):
+        return self._update_selected("status", f"Marked {status}", {"status": status})
+
+    @rx.event
+    def delete_selected(self):
+        """Deletes the selected expenses as one save and one operation."""
+        positions = self._ledger.positions_of(self.selected_lookup)
+        self.selected_lookup = {}
+        if not positions:
+            return
+        rows = [self._ledger.stored_row(i) for i in positions.values()]
+        self._ledger.delete_many(positions.values())
+        return self._record(
+            "delete",
+            "Expenses deleted",
+            count_label(len(rows), "expense"),
+            [oplog.removed(rows)],
+        )
+
+    def _export_params(self) -> dict[str, str]:
+        """View parameters that export jobs use to reproduce the list."""
+        return {
+            "search_query": self.search_query,
+            "filter_status": self.filter_status,
+            "sort_by": self.sort_by,
+            "sort_order": self.sort_order,
+        }
+
     def _reset_import_state(self):
         self.import_json_text = ""
-        self.import_preview = []
+        self._clear_import_results()
         self.import_error = ""
         return rx.clear_selected_files("business_json_upload")
 
+    def _clear_import_results(self):
+        discard_spool(self._import_spool)
+        self._import_spool = ""
+        self.import_preview = []
+        self.import_count = 0
+        self.import_skipped = 0
+        self.import_progress = 0
+        self.import_page = 0
+        self.import_page_count = 0
+        self.import_min_date = ""
+        self.import_max_date = ""
+        self.import_totals = {}
+        self.import_invalid_reasons = []
+        self.import_new_count = 0
+        self.import_exact_count = 0
+        self.import_near_count = 0
+        self._import_page_offsets = []
+
     @rx.event
     def open_import_modal(self):
         self.show_import_modal = True
@@ -366,61 +544,139 @@ class BusinessExpenseState(rx.State):
         self.show_import_modal = False
         return self._reset_import_state()
 
-    def _validate_and_parse_json(self, json_content: str):
-        import json
+    def _csv_columns(self) -> dict[str, str]:
+        return {
+            "date": self.csv_date_column,
+            "amount": self.csv_amount_column,
+            "memo": self.csv_memo_column,
+            "status": self.csv_status_column,
+        }
 
-        self.import_preview = []
+    def _start_import(self) -> StreamingImport:
+        self._clear_import_results()
         self.import_error = ""
+        return StreamingImport(
+            parse_business_item,
+            group_by="status",
+            index=DuplicateIndex(self._ledger.rows(), "status"),
+        )
+
+    def _finish_import(self, stage: ImportStage):
+        """Completes a staged import and exposes its preview and counts."""
+        stage.finish()
+        self._import_spool = stage.spool.path
+        self._import_page_offsets = stage.spool.page_offsets
+        self.import_count = stage.spool.count
+        self.import_skipped = stage.invalid_count
+        self.import_min_date = stage.min_date
+        self.import_max_date = stage.max_date
+        self.import_totals = stage.totals
+        self.import_invalid_reasons = [
+            {"reason": reason, "count": count}
+            for reason, count in stage.invalid_reasons.most_common()
+        ]
+        self.import_new_count = stage.match_counts["new"]
+        self.import_exact_count = stage.match_counts["exact"]
+        self.import_near_count = stage.match_counts["near"]
+        self.import_page_count = len(stage.spool.page_offsets)
+        self.import_progress = 100
+        if self.import_count:
+            self._load_import_page(0)
+        else:
+            self.import_error = "No valid transactions found."
+
+    def _fail_import(self, stage: ImportStage, e: Exception):
+        """Discards a failed import and reports why it failed."""
+        stage.abort()
+        self.import_error = describe_import_error(e)
+
+    def _validate_and_parse_json(self, json_content: str):
+        importer = self._start_import()
         try:
-            data = json.loads(json_content)
-            if not isinstance(data, list):
-                self.import_error = "Invalid JSON format: must be an array of objects."
-                return
-            preview_list = []
-            for item in data:
-                if not isinstance(item, dict):
-                    continue
-                # Required fields: amount, date. Optional: memo, status, account_id
-                if not all((k in item for k in ["amount", "date"])):
-                    continue
-                
-                try:
-                    amount = float(item["amount"])
-                except (ValueError, TypeError):
-                    continue
-                
-                new_transaction: BusinessTransaction = {
-                    "id": str(uuid.uuid4()),
-                    "amount": amount,
-                    "date": item.get("date", datetime.date.today().isoformat()),
-                    "memo": item.get("memo", ""),
-                    "status": item.get("status", "pending"),
-                    "account_id": item.get("account_id"),
-                }
-                # Validate status
-                if new_transaction["status"] not in ["pending", "reimbursed"]:
-                    new_transaction["status"] = "pending"
-
-                preview_list.append(new_transaction)
-            
-            if not preview_list:
-                self.import_error = "No valid transactions found in the provided JSON."
-            self.import_preview = preview_list
-        except json.JSONDecodeError:
-            self.import_error = "Invalid JSON. Please check the syntax."
+            importer.feed_text(json_content)
+            self._finish_import(importer)
         except Exception as e:
-            self.import_error = f"An unexpected error occurred: {e}"
+            self._fail_import(importer, e)
 
     @rx.event
     async def handle_uploaded_file(self, files: list[rx.UploadFile]):
+        """Parses uploaded JSON, CSV, OFX or QIF files in parallel worker processes.
+
+        Each file is staged by its own worker; the results are merged and
+        screened for duplicates against the ledger and each other.
+        """
         if not files:
             self.import_error = "No file selected."
             return
+        self._clear_import_results()
+        self.import_error = ""
+        self.is_importing = True
+        yield
+        paths = []
+        jobs = []
         try:
-            file_content = await files[0].read()
-            self._validate_and_parse_json(file_content.decode("utf-8"))
+            for upload in files:
+                paths.append(await copy_upload_to_temp(upload))
+            jobs = [
+                asyncio.ensure_future(
+                    run_in_import_pool(
+                        stage_import_file,
+                        path,
+                        format_for_filename(upload.filename),
+                        "business",
+                        self._csv_columns(),
+                    )
+                )
+                for path, upload in zip(paths, files)
+            ]
+            for done, job in enumerate(asyncio.as_completed(jobs), start=1):
+                await job
+                self.import_progress = min(99, done * 100 // len(jobs))
+                yield
+            results = [job.result() for job in jobs]
+            # Indexing the ledger and reading back every staged row would
+            # block the event loop for seconds on large imports.
+            stage = await asyncio.to_thread(
+                lambda: merge_staged_files(
+                    results, "status", DuplicateIndex(self._ledger.rows(), "status")
+                )
+            )
+            self._finish_import(stage)
+            errors = [
+                f"{upload.filename}: {result['error']}"
+                for upload, result in zip(files, results)
+                if result["error"]
+            ]
+            if errors:
+                self.import_error = " ".join(errors)
         except Exception as e:
+            logging.exception(f"Error reading uploaded files: {e}")
             self.import_error = f"Error reading file: {e}"
+        finally:
+            for path in paths:
+                discard_spool(path)
+            # Files staged before a failure, or still being staged, are not
+            # merged; their spools go once their jobs are done.
+            for job in jobs:
+                job.add_done_callback(discard_staged_file)
+            self.is_importing = False
+
+    def _load_import_page(self, page: int):
+        """Reads one page of staged rows back from the import spool."""
+        self.import_page = page
+        self.import_preview = read_spool_page(
+            self._import_spool, self._import_page_offsets[page]
+        )
+
+    @rx.event
+    def next_import_page(self):
+        if self.import_page + 1 < self.import_page_count:
+            self._load_import_page(self.import_page + 1)
+
+    @rx.event
+    def prev_import_page(self):
+        if self.import_page > 0:
+            self._load_import_page(self.import_page - 1)
 
     @rx.event
     def validate_and_preview_json(self):
@@ -431,12 +687,36 @@ class BusinessExpenseState(rx.State):
 
     @rx.event
     def confirm_import(self):
-        if not self.import_preview:
+        if not self.import_count:
             return
-        self.transactions.extend(self.import_preview)
-        self._save_data()
+        skip_matches = set()
+        if self.import_skip_exact:
+            skip_matches.add("exact")
+        if self.import_skip_near:
+            skip_matches.add("near")
+        imported_count = 0
+        start = len(self._ledger)
+        with metrics.IMPORT_SECONDS.time(ledger="business"):
+            for batch in iter_accepted_batches(self._import_spool, skip_matches):
+                self._ledger.extend(batch)
+                imported_count += len(batch)
+            if imported_count:
+                rows = [self._ledger.stored_row(i) for i in range(start, len(self._ledger))]
+                conflict = self._record(
+                    "import",
+                    "Expenses imported",
+                    f"{imported_count:,} rows",
+                    [oplog.inserted(rows)],
+                )
+        if not imported_count:
+            self._reset_import_state()
+            self.show_import_modal = False
+            return rx.toast.info("Nothing to import: every row was a skipped duplicate.")
         self._reset_import_state()
         self.show_import_modal = False
+        if conflict:
+            return conflict
+        metrics.IMPORT_ROWS.inc(imported_count, ledger="business")
         return rx.toast.success(
-            f"Successfully imported {len(self.import_preview)} transactions."
+            f"Successfully imported {imported_count} transactions."
         )
@@ -0,0 +1,36 @@
+import reflex as rx
+from app import profiling
+from app.profiling import ProfileEntry
+
+
+class DiagnosticsState(rx.State):
+    """Switches profiling on and off and shows what it recorded.
+
+    Profiling is process-wide: turning it on times every session served by
+    this backend worker, not just the current one. So it is only offered,
+    and only starts, when diagnostics are enabled at startup.
+    """
+
+    profiling_enabled: bool = False
+    profile_entries: list[ProfileEntry] = []
+
+    @rx.event
+    def refresh_profile(self):
+        self.profiling_enabled = profiling.is_enabled()
+        self.profile_entries = profiling.snapshot()
+
+    @rx.event
+    def toggle_profiling(self):
+        if profiling.is_enabled():
+            profiling.disable()
+        else:
+            try:
+                profiling.enable()
+            except RuntimeError as e:
+                return rx.toast.error(str(e))
+        self.refresh_profile()
+
+    @rx.event
+    def reset_profile(self):
+        profiling.reset()
+        self.refresh_profile()
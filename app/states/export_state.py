@@ -0,0 +1,64 @@
+import reflex as rx
+import asyncio
+import logging
+from app.api import artifact_url
+from app.export_jobs import ExportJob, download_filename
+from app.states.transaction_state import TransactionState
+from app.states.business_expense_state import BusinessExpenseState
+
+PROGRESS_INTERVAL = 0.25
+
+
+class ExportState(rx.State):
+    """Runs export jobs in the background and offers the finished file."""
+
+    is_exporting: bool = False
+    export_progress: int = 0
+    export_url: str = ""
+    export_filename: str = ""
+
+    @rx.event(background=True)
+    async def start_export(self, ledger: str, fmt: str):
+        """Builds (or reuses) the export artifact for ``ledger`` in ``fmt``.
+
+        ``ledger`` is "transactions" or "business" for a CSV of the current
+        view, or "all" with "parquet"/"arrow" for the whole ledger.
+        """
+        async with self:
+            if self.is_exporting:
+                return
+            self.is_exporting = True
+            self.export_progress = 0
+            self.export_url = ""
+            params = {}
+            if ledger == "transactions":
+                params = (await self.get_state(TransactionState))._export_params()
+            elif ledger == "business":
+                params = (await self.get_state(BusinessExpenseState))._export_params()
+        try:
+            job = ExportJob(ledger, fmt, params)
+            key = await asyncio.to_thread(job.cached)
+            if key is None:
+                build = asyncio.ensure_future(asyncio.to_thread(job.build))
+                while not build.done():
+                    await asyncio.wait({build}, timeout=PROGRESS_INTERVAL)
+                    async with self:
+                        self.export_progress = int(job.progress * 100)
+                key = build.result()
+        except Exception as e:
+            logging.exception(f"Error exporting {ledger} as {fmt}: {e}")
+            async with self:
+                self.is_exporting = False
+            return rx.toast.error(f"Export failed: {e}")
+        url = artifact_url(key)
+        filename = download_filename(job.filename)
+        async with self:
+            self.is_exporting = False
+            self.export_progress = 100
+            self.export_url = url
+            self.export_filename = filename
+        return rx.download(url=rx.Var.create(url), filename=filename)
+
+    @rx.event
+    def dismiss_export(self):
+        self.export_url = ""
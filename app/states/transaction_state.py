@@ -1,14 +1,54 @@
 import reflex as rx
 from typing import TypedDict, Literal
 import datetime
+import functools
 import uuid
 import logging
-import os
-import shutil
-import json
+import asyncio
 from pyluach import dates as hebrew_dates
+from app.storage import (
+    TRANSACTION_DATA_FILE,
+    TRANSACTION_OPLOG_FILE,
+    StaleWriteError,
+    StorageError,
+)
+from app.analytics import LedgerAnalytics
+from app.ledger import (
+    duplicate_groups,
+    filter_segments,
+    filter_transactions,
+    load_ledger,
+    maaser_summary,
+    save_ledger,
+    sort_transactions,
+)
+from app.money import from_cents, to_cents
+from app import metrics, oplog, periods, segments
+from app.profiling import profile_function, profiled
+from app.oplog import OperationSummary
+from app.periods import Checkpoint
+from app.records import Ledger, date_ordinal
+from app.segments import Segment
+from app.importers import (
+    DuplicateIndex,
+    ImportStage,
+    StreamingImport,
+    copy_upload_to_temp,
+    describe_import_error,
+    discard_spool,
+    discard_staged_file,
+    format_for_filename,
+    iter_accepted_batches,
+    merge_staged_files,
+    run_in_import_pool,
+    stage_import_file,
+    read_spool_page,
+    parse_transaction_item,
+)
 
 
+# Ledgers repeat the same few thousand dates, and every render converts them.
+@functools.lru_cache(maxsize=16384)
 def get_hebrew_date_string(gregorian_date_str: str, hebrew_chars: bool = True) -> str:
     """Convert YYYY-MM-DD to Hebrew date string."""
     if not gregorian_date_str:
@@ -24,8 +64,17 @@ def get_hebrew_date_string(gregorian_date_str: str, hebrew_chars: bool = True) -
     except Exception:
         return ""
 
-DATA_FILE = "data.json"
-BACKUP_FILE = "data_backup.json"
+profile_function(__name__, "get_hebrew_date_string")
+
+DATA_FILE = TRANSACTION_DATA_FILE
+OPLOG_FILE = TRANSACTION_OPLOG_FILE
+ARCHIVE_DIR = segments.archive_dir(DATA_FILE)
+# Operations shown in a session's undo banner.
+RECENT_OPERATIONS = 3
+
+
+def count_label(count: int, noun: str) -> str:
+    return f"{count:,} {noun}" if count == 1 else f"{count:,} {noun}s"
 
 
 class BankAccount(TypedDict):
@@ -36,17 +85,21 @@ class BankAccount(TypedDict):
 class Transaction(TypedDict):
     id: str
     type: Literal["income", "maaser"]
-    amount: float
+    amount: float  # Display value derived from amount_cents; never saved.
+    amount_cents: int
     date: str
     memo: str
     account_id: str | None
 
 
+class ImportPreviewRow(Transaction):
+    match: Literal["new", "exact", "near"]
+
+
+@profiled
 class TransactionState(rx.State):
     """Manages all transaction-related data and logic."""
 
-    transactions: list[Transaction] = []
-    verified_transactions: list[str] = []
     accounts: list[BankAccount] = []
     show_form_modal: bool = False
     is_editing: bool = False
@@ -70,102 +123,95 @@ class TransactionState(rx.State):
     sort_order: str = "desc"
     show_import_modal: bool = False
     import_json_text: str = ""
-    import_preview: list[Transaction] = []
+    import_preview: list[ImportPreviewRow] = []
+    import_count: int = 0
+    import_skipped: int = 0
+    import_progress: int = 0
+    import_page: int = 0
+    import_page_count: int = 0
+    import_min_date: str = ""
+    import_max_date: str = ""
+    import_totals: dict[str, float] = {}
+    import_invalid_reasons: list[dict] = []
+    import_new_count: int = 0
+    import_exact_count: int = 0
+    import_near_count: int = 0
+    import_skip_exact: bool = True
+    import_skip_near: bool = False
+    csv_date_column: str = "date"
+    csv_amount_column: str = "amount"
+    csv_memo_column: str = "memo"
+    csv_type_column: str = "type"
+    is_importing: bool = False
     import_error: str = ""
-    deleted_history: list[Transaction] = []
+    recent_operations: list[OperationSummary] = []
+    undo_title: str = ""
+    redo_title: str = ""
+    selected_lookup: dict[str, bool] = {}
+    batch_memo: str = ""
+    closed_periods: list[Checkpoint] = []
+    close_through_date: str = ""
+    _ledger: Ledger = Ledger()
+    _verified: set[str] = set()
+    # Manifest of the archived year segments, as saved under "archive".
+    _segments: list[Segment] = []
+    _data_version: int = 0
+    _import_spool: str = ""
+    _import_page_offsets: list[int] = []
 
     @rx.var
-    def potential_duplicates(self) -> list[str]:
-        """Identifies potential duplicate transactions."""
-        duplicates = set()
-        verified_set = set(self.verified_transactions)
-        transactions_to_check = [
-            t for t in self.transactions if t["id"] not in verified_set
-        ]
-        for i, t1 in enumerate(transactions_to_check):
-            if t1["id"] in duplicates:
-                continue
-            for j in range(i + 1, len(transactions_to_check)):
-                t2 = transactions_to_check[j]
-                if t1["id"] == t2["id"]:
-                    continue
-                if t1["amount"] == t2["amount"]:
-                    try:
-                        date1 = datetime.date.fromisoformat(t1['date'])
-                        date2 = datetime.date.fromisoformat(t2['date'])
-                        if abs(date1 - date2) <= datetime.timedelta(days=1):
-                            duplicates.add(t1["id"])
-                            duplicates.add(t2["id"])
-                    except ValueError as e:
-                        logging.exception(
-                            f"Error parsing dates for duplicate check: {e}"
-                        )
-        return sorted(list(duplicates))
+    def potential_duplicates(self) -> dict[str, bool]:
+        """Ids of potential duplicate transactions, as a lookup for the rows."""
+        return {
+            self._ledger.id_at(i): True
+            for group in duplicate_groups(self._ledger, self._verified)
+            for i in group
+        }
 
     @rx.var
-    def filtered_transactions(self) -> list[Transaction]:
-        """Applies search and filters to the transactions list."""
-        transactions = self.transactions
-        if self.search_query:
-            search_lower = self.search_query.lower()
-            transactions = [
-                t
-                for t in transactions
-                if search_lower in t["memo"].lower() or search_lower in str(t["amount"])
-            ]
-        if self.filter_type != "all":
-            transactions = [t for t in transactions if t["type"] == self.filter_type]
-        if self.filter_start_date:
-            transactions = [
-                t for t in transactions if t["date"] >= self.filter_start_date
-            ]
-        if self.filter_end_date:
-            transactions = [
-                t for t in transactions if t["date"] <= self.filter_end_date
-            ]
-        if self.filter_min_amount:
-            try:
-                min_amount = float(self.filter_min_amount)
-                transactions = [t for t in transactions if t["amount"] >= min_amount]
-            except ValueError as e:
-                logging.exception(f"Error: {e}")
-        if self.filter_max_amount:
-            try:
-                max_amount = float(self.filter_max_amount)
-                transactions = [t for t in transactions if t["amount"] <= max_amount]
-            except ValueError as e:
-                logging.exception(f"Error: {e}")
-        if self.filter_account_id != "all":
-            if self.filter_account_id == "cash":
-                transactions = [t for t in transactions if t["account_id"] is None]
-            else:
-                transactions = [
-                    t for t in transactions if t["account_id"] == self.filter_account_id
-                ]
-        return transactions
+    def verified_lookup(self) -> dict[str, bool]:
+        """Ids of the verified transactions, as a lookup for the rows."""
+        return dict.fromkeys(self._verified, True)
 
     @rx.var
-    def sorted_transactions(self) -> list[Transaction]:
-        """Transactions sorted based on selected field and order."""
-        key_map = {
-            "date": lambda t: t["date"],
-            "amount": lambda t: t["amount"],
-            "type": lambda t: t["type"],
-        }
-        sort_key = key_map.get(self.sort_by, key_map["date"])
-        reverse = self.sort_order == "desc"
-        return sorted(self.filtered_transactions, key=sort_key, reverse=reverse)
+    def _view_ledger(self) -> Ledger:
+        """The ledger plus the archived years that the search and filters reach."""
+        needed = filter_segments(self._segments, **self._view_filters())
+        try:
+            return segments.view_ledger(self._ledger, ARCHIVE_DIR, needed)
+        except (OSError, StorageError, ValueError) as e:
+            logging.error(f"Error reading archived transactions: {e}")
+            return self._ledger
+
+    @rx.var
+    def archived_through(self) -> str:
+        """Last day of the archived years, or "" if none are archived."""
+        return segments.archived_through(self._segments)
+
+    @rx.var
+    def _view_positions(self) -> list[int]:
+        """Positions in ``_view_ledger`` of the filtered transactions, in display order."""
+        return sort_transactions(
+            self._view_ledger,
+            filter_transactions(self._view_ledger, **self._view_filters()),
+            self.sort_by,
+            self.sort_order,
+        )
+
+    @rx.var
+    def visible_count(self) -> int:
+        """Number of transactions matching the search and filters."""
+        return len(self._view_positions)
 
     @rx.var
     def transactions_with_hebrew_dates(self) -> list[dict]:
         """Returns transactions with Hebrew date and account name added."""
         accounts_map = {acc["id"]: acc["name"] for acc in self.accounts}
         result = []
-        for t in self.sorted_transactions:
-            t_copy = dict(t)
-            t_copy["hebrew_date"] = get_hebrew_date_string(t["date"])
-            t_copy["account_name"] = accounts_map.get(t.get("account_id"), "")
-            result.append(t_copy)
+        for t in self._view_ledger.rows(self._view_positions):
+            t["hebrew_date"] = get_hebrew_date_string(t["date"])
+            t["account_name"] = accounts_map.get(t["account_id"], "")
+            result.append(t)
         return result
 
     @rx.var
@@ -187,20 +233,57 @@ class TransactionState(rx.State):
             return ""
         return get_hebrew_date_string(self.filter_end_date)
 
+    @rx.var
+    def _analytics(self) -> LedgerAnalytics:
+        """NumPy snapshot of the ledger that the analytics vars read from."""
+        return LedgerAnalytics(self._ledger)
+
+    @rx.var
+    def _balance(self) -> LedgerAnalytics | periods.Totals:
+        """Totals from the latest closed period's checkpoint plus the open rows."""
+        return periods.balance(self._analytics, self.closed_periods)
+
     @rx.var
     def total_income(self) -> float:
         """Calculates the total income from all transactions."""
-        return sum((t["amount"] for t in self.transactions if t["type"] == "income"))
+        return from_cents(self._balance.sum_cents("income"))
 
     @rx.var
     def total_maaser(self) -> float:
         """Calculates the total maaser given from all transactions."""
-        return sum((t["amount"] for t in self.transactions if t["type"] == "maaser"))
+        return from_cents(self._balance.sum_cents("maaser"))
 
     @rx.var
     def maaser_due(self) -> float:
         """Calculates the maaser due (10% of income minus maaser given)."""
-        return self.total_income * 0.1 - self.total_maaser
+        return maaser_summary(self._balance)["due"]
+
+    @rx.var
+    def closed_through(self) -> str:
+        """Last day of the latest closed period, or "" if none is closed."""
+        return periods.closed_through(self.closed_periods)
+
+    @rx.var
+    def closed_period_rows(self) -> list[dict[str, str]]:
+        """Closed periods for display, latest first."""
+        rows = []
+        for checkpoint in reversed(self.closed_periods):
+            cents = periods.Totals(checkpoint["cents"])
+            rows.append({
+                "start": checkpoint["start"] or "First transaction",
+                "end": checkpoint["end"],
+                "rows": f"{checkpoint['rows']:,}",
+                "income": f"${from_cents(cents.sum_cents('income')):,.2f}",
+                "maaser": f"${from_cents(cents.sum_cents('maaser')):,.2f}",
+                "carried_due": f"${maaser_summary(periods.Totals(checkpoint['carried_cents']))['due']:,.2f}",
+            })
+        return rows
+
+    @rx.var
+    def income_spread_label(self) -> str:
+        """Median and 90th percentile of single income amounts."""
+        median, p90 = self._analytics.percentiles("income", [50, 90])
+        return f"Median ${median:,.2f} · 90th percentile ${p90:,.2f}"
 
     @rx.var
     def maaser_percentage(self) -> float:
@@ -240,78 +323,60 @@ class TransactionState(rx.State):
 
     @rx.var
     def chart_data(self) -> list[dict[str, float | str]]:
-        """Prepares data for the analytics chart."""
-        from collections import defaultdict
-
-        monthly_data = defaultdict(lambda: {"income": 0.0, "maaser": 0.0})
-        for t in self.transactions:
-            month = datetime.datetime.strptime(t["date"], "%Y-%m-%d").strftime("%b %Y")
-            monthly_data[month][t["type"]] += t["amount"]
-        sorted_months = sorted(
-            monthly_data.keys(), key=lambda m: datetime.datetime.strptime(m, "%b %Y")
-        )
-        return [
+        """Prepares data for the analytics chart, with the running maaser due."""
+        months, cents = self._analytics.monthly_cents()
+        # Archived years all precede the rows still in the ledger.
+        archived_rows = []
+        carried = {"income": 0, "maaser": 0}
+        for month, month_cents in segments.monthly_cents(self._segments):
+            for kind in carried:
+                carried[kind] += month_cents.get(kind, 0)
+            archived_rows.append(
+                {
+                    "month": datetime.datetime.strptime(month, "%Y-%m").strftime("%b %Y"),
+                    "income": from_cents(month_cents.get("income", 0)),
+                    "maaser": from_cents(month_cents.get("maaser", 0)),
+                    "due": (carried["income"] - 10 * carried["maaser"]) / 1000,
+                }
+            )
+        return archived_rows + [
             {
-                "month": month,
-                "income": monthly_data[month]["income"],
-                "maaser": monthly_data[month]["maaser"],
+                "month": datetime.datetime.strptime(month, "%Y-%m").strftime("%b %Y"),
+                "income": from_cents(income),
+                "maaser": from_cents(maaser),
+                "due": due,
             }
-            for month in sorted_months
+            for month, income, maaser, due in zip(
+                months,
+                cents["income"].tolist(),
+                cents["maaser"].tolist(),
+                self._analytics.running_due(carried),
+            )
         ]
 
     @rx.var
     def transaction_patterns(self) -> dict[Literal["income", "maaser"], list[dict]]:
         """Analyzes historical data to identify transaction patterns."""
-        from collections import defaultdict, Counter
-        from datetime import datetime, timedelta
-
-        patterns = {"income": defaultdict(list), "maaser": defaultdict(list)}
-        for t in self.transactions:
-            patterns[t["type"]][t["memo"].lower().strip()].append(
+        ranked_patterns = {"income": [], "maaser": []}
+        for p in self._analytics.memo_patterns(True, datetime.date.today()):
+            if p["kind"] not in ranked_patterns:
+                continue
+            recency_score = 0.9 ** (p["recency_days"] / 7)
+            score = (
+                p["frequency"] * 0.4
+                + recency_score * 0.35
+                + int(p["is_recurring"]) * 0.25
+            )
+            ranked_patterns[p["kind"]].append(
                 {
-                    "amount": t["amount"],
-                    "date": datetime.fromisoformat(t['date']),
+                    "memo": p["memo"].capitalize(),
+                    "frequency": p["frequency"],
+                    "avg_amount": p["avg_amount"],
+                    "common_amount": p["common_amount"],
+                    "score": score,
+                    "is_recurring": p["is_recurring"],
                 }
             )
-        ranked_patterns = {"income": [], "maaser": []}
-        today = datetime.now()
-        for type, memo_groups in patterns.items():
-            for memo, transactions in memo_groups.items():
-                if not memo:
-                    continue
-                frequency = len(transactions)
-                last_used_date = max((t["date"] for t in transactions))
-                recency_days = (today - last_used_date).days
-                recency_score = 0.9 ** (recency_days / 7)
-                amounts = [t["amount"] for t in transactions]
-                avg_amount = sum(amounts) / len(amounts)
-                common_amount = Counter(amounts).most_common(1)[0][0]
-                is_recurring = False
-                if len(transactions) > 2:
-                    dates = sorted([t["date"] for t in transactions])
-                    intervals = [
-                        (dates[i] - dates[i - 1]).days for i in range(1, len(dates))
-                    ]
-                    avg_interval = sum(intervals) / len(intervals)
-                    if avg_interval > 5:
-                        variance = sum(
-                            ((i - avg_interval) ** 2 for i in intervals)
-                        ) / len(intervals)
-                        if variance < 5:
-                            is_recurring = True
-                score = (
-                    frequency * 0.4 + recency_score * 0.35 + int(is_recurring) * 0.25
-                )
-                ranked_patterns[type].append(
-                    {
-                        "memo": memo.capitalize(),
-                        "frequency": frequency,
-                        "avg_amount": avg_amount,
-                        "common_amount": common_amount,
-                        "score": score,
-                        "is_recurring": is_recurring,
-                    }
-                )
         ranked_patterns["income"].sort(key=lambda p: p["score"], reverse=True)
         ranked_patterns["maaser"].sort(key=lambda p: p["score"], reverse=True)
         return ranked_patterns
@@ -332,51 +397,153 @@ class TransactionState(rx.State):
     async def on_load(self):
         """Load data from local JSON file on app startup."""
         async with self:
-            if os.path.exists(DATA_FILE):
-                try:
-                    with open(DATA_FILE, "r") as f:
-                        data = json.load(f)
-                        self.transactions = data.get("transactions", [])
-                        self.accounts = data.get("accounts", [])
-                        self.verified_transactions = data.get("verified_transactions", [])
-                except Exception as e:
-                    logging.exception(f"Error loading data: {e}")
-            else:
-                self.transactions = []
-                self.accounts = []
-                self.verified_transactions = []
+            self._load_data()
+
+    def _load_data(self):
+        """Replaces in-memory data with the latest saved version."""
+        try:
+            with metrics.LOAD_SECONDS.time(ledger="transactions"):
+                data, self._data_version = load_ledger(DATA_FILE)
+        except Exception as e:
+            logging.exception(f"Error loading data: {e}")
+            return
+        self._ledger = data["transactions"]
+        metrics.TRANSACTIONS.set(len(self._ledger), ledger="transactions")
+        self.accounts = data.get("accounts", [])
+        self._verified = set(data.get("verified_transactions", []))
+        self.closed_periods = data.get("closed_periods", [])
+        self._segments = data.get("archive", [])
+        self._refresh_history()
 
     def _save_data(self):
-        """Saves all data to a local JSON file with backup."""
+        """Saves all data to a local JSON file (snapshotted by ``app.snapshots``).
+
+        If another worker saved first, the stale write is dropped and the
+        latest data is reloaded so the user can repeat the change.
+        """
+        # The ledger is changed in place; reassign it so the vars derived
+        # from it are recomputed.
+        self._ledger = self._ledger
         data = {
-            "transactions": self.transactions,
+            "transactions": self._ledger,
             "accounts": self.accounts,
-            "verified_transactions": self.verified_transactions,
+            "verified_transactions": sorted(self._verified),
+            "closed_periods": self.closed_periods,
+            "archive": self._segments,
         }
-        
-        if os.path.exists(DATA_FILE):
-            try:
-                shutil.copy2(DATA_FILE, BACKUP_FILE)
-            except Exception as e:
-                logging.error(f"Error creating backup: {e}")
-            
         try:
-            with open(DATA_FILE, "w") as f:
-                json.dump(data, f, indent=2)
+            with metrics.SAVE_SECONDS.time(ledger="transactions"):
+                self._data_version = save_ledger(DATA_FILE, data, self._data_version)
+            metrics.TRANSACTIONS.set(len(self._ledger), ledger="transactions")
+        except StaleWriteError as e:
+            metrics.SAVE_FAILURES.inc(ledger="transactions", reason="stale")
+            logging.warning(f"Rejected stale save: {e}")
+            self._load_data()
+            return rx.toast.warning(
+                "Your data was changed in another window and has been reloaded. "
+                "Please repeat your last change."
+            )
         except Exception as e:
+            metrics.SAVE_FAILURES.inc(ledger="transactions", reason="error")
             logging.error(f"Error saving data: {e}")
 
-    def _save_transactions(self):
-        """Helper to save transactions to local storage."""
-        self._save_data()
-
-    def _save_verified_transactions(self):
-        """Helper to save verified transactions to local storage."""
-        self._save_data()
+    def _save_segments(self, previous: list[Segment]):
+        """Saves after ``_segments`` changed from ``previous``, then deletes
+        the segment files that the data file no longer (or never) lists."""
+        changed = self._segments
+        version = self._data_version
+        conflict = self._save_data()
+        if self._data_version != version:
+            segments.discard(ARCHIVE_DIR, previous, changed)
+        else:
+            segments.discard(ARCHIVE_DIR, changed, [*previous, *self._segments])
+        return conflict
 
     def _save_accounts(self):
         """Helper to save accounts to local storage."""
-        self._save_data()
+        return self._save_data()
+
+    def _closed(self, *dates: str) -> bool:
+        """Whether any of ``dates`` falls in a closed period."""
+        through = periods.closed_ordinal(self.closed_periods)
+        return bool(through) and any(date_ordinal(date) <= through for date in dates)
+
+    def _closed_error(self):
+        return rx.toast.error(
+            f"The books are closed through {self.closed_through}. "
+            "Reopen the period in Settings to change transactions in it."
+        )
+
+    def _refresh_history(self):
+        log = oplog.get_log(OPLOG_FILE)
+        self.undo_title = oplog.label(log.latest(undone=False))
+        self.redo_title = oplog.label(log.latest(undone=True))
+
+    def _record(self, kind: str, title: str, detail: str, changes: list[dict | None]):
+        """Saves the data, then logs ``changes`` as one operation to undo."""
+        changes = [change for change in changes if change]
+        version = self._data_version
+        conflict = self._save_data()
+        if not changes or self._data_version == version:
+            return conflict
+        try:
+            operation = oplog.get_log(OPLOG_FILE).record(kind, title, detail, changes)
+        except (OSError, StorageError) as e:
+            logging.error(f"Error logging operation: {e}")
+            return
+        self.recent_operations = [
+            oplog.summary(operation),
+            *self.recent_operations,
+        ][:RECENT_OPERATIONS]
+        self._refresh_history()
+
+    def _change_operation(self, operation_id: str, undone: bool):
+        """Undoes (or redoes) a logged operation and saves the result."""
+        log = oplog.get_log(OPLOG_FILE)
+        operation = log.get(operation_id)
+        if operation is None or operation["undone"] == undone:
+            self._refresh_history()
+            return rx.toast.info("That change is no longer in the undo history.")
+        if periods.touches_closed(
+            self._ledger, operation["changes"], periods.closed_ordinal(self.closed_periods)
+        ):
+            return self._closed_error()
+        try:
+            oplog.apply_changes(self._ledger, operation["changes"], self._verified, undone)
+        except oplog.ConflictError as e:
+            return rx.toast.error(f"{'Undo' if undone else 'Redo'} failed: {e}")
+        version = self._data_version
+        conflict = self._save_data()
+        if self._data_version == version:
+            return conflict
+        try:
+            log.mark(operation_id, undone)
+        except (OSError, StorageError) as e:
+            logging.error(f"Error logging operation: {e}")
+        self.recent_operations = [
+            {**op, "undone": undone} if op["id"] == operation_id else op
+            for op in self.recent_operations
+        ]
+        self._refresh_history()
+
+    def _view_filters(self) -> dict[str, str]:
+        return {
+            "search_query": self.search_query,
+            "filter_type": self.filter_type,
+            "filter_start_date": self.filter_start_date,
+            "filter_end_date": self.filter_end_date,
+            "filter_min_amount": self.filter_min_amount,
+            "filter_max_amount": self.filter_max_amount,
+            "filter_account_id": self.filter_account_id,
+        }
+
+    def _export_params(self) -> dict[str, str]:
+        """View parameters that export jobs use to reproduce the list."""
+        return {
+            **self._view_filters(),
+            "sort_by": self.sort_by,
+            "sort_order": self.sort_order,
+        }
 
     def _validate_form(self) -> bool:
         """Helper to validate form fields."""
@@ -384,7 +551,7 @@ class TransactionState(rx.State):
             self.form_error = "Amount and Date are required."
             return False
         try:
-            float(self.form_amount)
+            to_cents(self.form_amount)
         except ValueError as e:
             logging.exception(f"Error: {e}")
             self.form_error = "Amount must be a valid number."
@@ -405,10 +572,28 @@ class TransactionState(rx.State):
 
     def _reset_import_state(self):
         self.import_json_text = ""
-        self.import_preview = []
+        self._clear_import_results()
         self.import_error = ""
         return rx.clear_selected_files("json_upload")
 
+    def _clear_import_results(self):
+        discard_spool(self._import_spool)
+        self._import_spool = ""
+        self.import_preview = []
+        self.import_count = 0
+        self.import_skipped = 0
+        self.import_progress = 0
+        self.import_page = 0
+        self.import_page_count = 0
+        self.import_min_date = ""
+        self.import_max_date = ""
+        self.import_totals = {}
+        self.import_invalid_reasons = []
+        self.import_new_count = 0
+        self.import_exact_count = 0
+        self.import_near_count = 0
+        self._import_page_offsets = []
+
     @rx.event
     def open_import_modal(self):
         self.show_import_modal = True
@@ -447,59 +632,140 @@ class TransactionState(rx.State):
         self.show_form_modal = False
         self._reset_form_fields()
 
-    def _validate_and_parse_json(self, json_content: str):
-        import json
+    def _csv_columns(self) -> dict[str, str]:
+        return {
+            "date": self.csv_date_column,
+            "amount": self.csv_amount_column,
+            "memo": self.csv_memo_column,
+            "type": self.csv_type_column,
+        }
 
-        self.import_preview = []
+    def _start_import(self) -> StreamingImport:
+        self._clear_import_results()
         self.import_error = ""
+        return StreamingImport(
+            parse_transaction_item,
+            group_by="type",
+            index=DuplicateIndex(self._ledger.rows(), "type"),
+        )
+
+    def _finish_import(self, stage: ImportStage):
+        """Completes a staged import and exposes its preview and counts."""
+        stage.finish()
+        self._import_spool = stage.spool.path
+        self._import_page_offsets = stage.spool.page_offsets
+        self.import_count = stage.spool.count
+        self.import_skipped = stage.invalid_count
+        self.import_min_date = stage.min_date
+        self.import_max_date = stage.max_date
+        self.import_totals = stage.totals
+        self.import_invalid_reasons = [
+            {"reason": reason, "count": count}
+            for reason, count in stage.invalid_reasons.most_common()
+        ]
+        self.import_new_count = stage.match_counts["new"]
+        self.import_exact_count = stage.match_counts["exact"]
+        self.import_near_count = stage.match_counts["near"]
+        self.import_page_count = len(stage.spool.page_offsets)
+        self.import_progress = 100
+        if self.import_count:
+            self._load_import_page(0)
+        else:
+            self.import_error = "No valid transactions found."
+
+    def _fail_import(self, stage: ImportStage, e: Exception):
+        """Discards a failed import and reports why it failed."""
+        stage.abort()
+        logging.exception(f"Import failed: {e}")
+        self.import_error = describe_import_error(e)
+
+    def _validate_and_parse_json(self, json_content: str):
+        importer = self._start_import()
         try:
-            data = json.loads(json_content)
-            if not isinstance(data, list):
-                self.import_error = "Invalid JSON format: must be an array of objects."
-                return
-            preview_list = []
-            for item in data:
-                if not isinstance(item, dict):
-                    continue
-                if not all((k in item for k in ["type", "amount", "date"])):
-                    continue
-                if item["type"] not in ["income", "maaser"]:
-                    continue
-                try:
-                    amount = float(item["amount"])
-                except (ValueError, TypeError) as e:
-                    logging.exception(f"Error parsing amount during import: {e}")
-                    continue
-                new_transaction: Transaction = {
-                    "id": str(uuid.uuid4()),
-                    "type": item["type"],
-                    "amount": amount,
-                    "date": item.get("date", datetime.date.today().isoformat()),
-                    "memo": item.get("memo", ""),
-                    "account_id": item.get("account_id"),
-                }
-                preview_list.append(new_transaction)
-            if not preview_list:
-                self.import_error = "No valid transactions found in the provided JSON."
-            self.import_preview = preview_list
-        except json.JSONDecodeError as e:
-            logging.exception(f"JSON Decode Error: {e}")
-            self.import_error = "Invalid JSON. Please check the syntax."
+            importer.feed_text(json_content)
+            self._finish_import(importer)
         except Exception as e:
-            logging.exception(f"Unexpected error during JSON validation: {e}")
-            self.import_error = f"An unexpected error occurred: {e}"
+            self._fail_import(importer, e)
 
     @rx.event
     async def handle_uploaded_file(self, files: list[rx.UploadFile]):
+        """Parses uploaded JSON, CSV, OFX or QIF files in parallel worker processes.
+
+        Each file is staged by its own worker; the results are merged and
+        screened for duplicates against the ledger and each other.
+        """
         if not files:
             self.import_error = "No file selected."
             return
+        self._clear_import_results()
+        self.import_error = ""
+        self.is_importing = True
+        yield
+        paths = []
+        jobs = []
         try:
-            file_content = await files[0].read()
-            self._validate_and_parse_json(file_content.decode("utf-8"))
+            for upload in files:
+                paths.append(await copy_upload_to_temp(upload))
+            jobs = [
+                asyncio.ensure_future(
+                    run_in_import_pool(
+                        stage_import_file,
+                        path,
+                        format_for_filename(upload.filename),
+                        "transaction",
+                        self._csv_columns(),
+                    )
+                )
+                for path, upload in zip(paths, files)
+            ]
+            for done, job in enumerate(asyncio.as_completed(jobs), start=1):
+                await job
+                self.import_progress = min(99, done * 100 // len(jobs))
+                yield
+            results = [job.result() for job in jobs]
+            # Indexing the ledger and reading back every staged row would
+            # block the event loop for seconds on large imports.
+            stage = await asyncio.to_thread(
+                lambda: merge_staged_files(
+                    results, "type", DuplicateIndex(self._ledger.rows(), "type")
+                )
+            )
+            self._finish_import(stage)
+            errors = [
+                f"{upload.filename}: {result['error']}"
+                for upload, result in zip(files, results)
+                if result["error"]
+            ]
+            if errors:
+                self.import_error = " ".join(errors)
         except Exception as e:
-            logging.exception(f"Error reading uploaded file: {e}")
+            logging.exception(f"Error reading uploaded files: {e}")
             self.import_error = f"Error reading file: {e}"
+        finally:
+            for path in paths:
+                discard_spool(path)
+            # Files staged before a failure, or still being staged, are not
+            # merged; their spools go once their jobs are done.
+            for job in jobs:
+                job.add_done_callback(discard_staged_file)
+            self.is_importing = False
+
+    def _load_import_page(self, page: int):
+        """Reads one page of staged rows back from the import spool."""
+        self.import_page = page
+        self.import_preview = read_spool_page(
+            self._import_spool, self._import_page_offsets[page]
+        )
+
+    @rx.event
+    def next_import_page(self):
+        if self.import_page + 1 < self.import_page_count:
+            self._load_import_page(self.import_page + 1)
+
+    @rx.event
+    def prev_import_page(self):
+        if self.import_page > 0:
+            self._load_import_page(self.import_page - 1)
 
     @rx.event
     def validate_and_preview_json(self):
@@ -510,14 +776,52 @@ class TransactionState(rx.State):
 
     @rx.event
     def confirm_import(self):
-        if not self.import_preview:
+        if not self.import_count:
             return
-        self.transactions.extend(self.import_preview)
-        self._save_transactions()
+        skip_matches = set()
+        if self.import_skip_exact:
+            skip_matches.add("exact")
+        if self.import_skip_near:
+            skip_matches.add("near")
+        imported_count = 0
+        closed_count = 0
+        through = periods.closed_ordinal(self.closed_periods)
+        start = len(self._ledger)
+        with metrics.IMPORT_SECONDS.time(ledger="transactions"):
+            for batch in iter_accepted_batches(self._import_spool, skip_matches):
+                if through:
+                    open_rows = [row for row in batch if date_ordinal(row["date"]) > through]
+                    closed_count += len(batch) - len(open_rows)
+                    batch = open_rows
+                self._ledger.extend(batch)
+                imported_count += len(batch)
+            if imported_count:
+                rows = [self._ledger.stored_row(i) for i in range(start, len(self._ledger))]
+                conflict = self._record(
+                    "import",
+                    "Transactions imported",
+                    f"{imported_count:,} rows",
+                    [oplog.inserted(rows)],
+                )
+        if not imported_count:
+            self._reset_import_state()
+            self.show_import_modal = False
+            if closed_count:
+                return rx.toast.info(
+                    f"Nothing to import: {closed_count} rows are dated in a closed "
+                    "period and the rest were skipped duplicates."
+                )
+            return rx.toast.info("Nothing to import: every row was a skipped duplicate.")
         self._reset_import_state()
         self.show_import_modal = False
+        if conflict:
+            return conflict
+        metrics.IMPORT_ROWS.inc(imported_count, ledger="transactions")
+        skipped = (
+            f" Skipped {closed_count} dated in a closed period." if closed_count else ""
+        )
         return rx.toast.success(
-            f"Successfully imported {len(self.import_preview)} transactions."
+            f"Successfully imported {imported_count} transactions.{skipped}"
         )
 
     @rx.event
@@ -532,94 +836,276 @@ class TransactionState(rx.State):
         """Adds or updates a transaction."""
         if not self._validate_form():
             return
+        cents = to_cents(self.form_amount)
         transaction_data = {
             "type": self.form_type,
-            "amount": float(self.form_amount),
+            "amount_cents": cents,
             "date": self.form_date,
             "memo": self.form_memo,
             "account_id": self.form_account_id
             if self.form_account_id != "cash"
             else None,
         }
+        changes = []
         if self.is_editing and self.current_transaction_id:
-            index_to_update = -1
-            for i, t in enumerate(self.transactions):
-                if t["id"] == self.current_transaction_id:
-                    index_to_update = i
-                    break
+            index_to_update = self._ledger.index_of(self.current_transaction_id)
             if index_to_update != -1:
-                self.transactions[index_to_update] = {
-                    "id": self.current_transaction_id,
-                    **transaction_data,
-                }
+                before = self._ledger.stored_row(index_to_update)
+                if self._closed(before["date"], self.form_date):
+                    self.form_error = (
+                        f"The books are closed through {self.closed_through}. "
+                        "Reopen the period in Settings to change this transaction."
+                    )
+                    return
+                self._ledger.replace(
+                    index_to_update,
+                    {"id": self.current_transaction_id, **transaction_data},
+                )
+                changes.append(
+                    oplog.updated(before, self._ledger.stored_row(index_to_update))
+                )
+            kind, title = "edit", "Transaction edited"
         else:
-            new_transaction: Transaction = {"id": str(uuid.uuid4()), **transaction_data}
-            self.transactions.append(new_transaction)
+            if self._closed(self.form_date):
+                self.form_error = (
+                    f"The books are closed through {self.closed_through}; "
+                    "choose a later date or reopen the period in Settings."
+                )
+                return
+            self._ledger.append({"id": str(uuid.uuid4()), **transaction_data})
+            changes.append(oplog.inserted([self._ledger.stored_row(len(self._ledger) - 1)]))
+            kind, title = "add", "Transaction added"
         self.close_form_modal()
-        self._save_transactions()
+        return self._record(kind, title, transaction_data["memo"], changes)
 
     @rx.event
     def delete_transaction(self, transaction_id: str):
-        """Deletes a transaction by its ID and adds it to history."""
-        for t in self.transactions:
-            if t["id"] == transaction_id:
-                self.deleted_history.append(t)
-                break
-        
-        self.transactions = [t for t in self.transactions if t["id"] != transaction_id]
-        self.verified_transactions = [
-            vid for vid in self.verified_transactions if vid != transaction_id
-        ]
-        self._save_transactions()
-        self._save_verified_transactions()
+        """Deletes a transaction by its ID, as an operation that can be undone."""
+        index = self._ledger.index_of(transaction_id)
+        changes = []
+        memo = ""
+        if index != -1:
+            row = self._ledger.stored_row(index)
+            if self._closed(row["date"]):
+                return self._closed_error()
+            memo = row["memo"]
+            self._ledger.delete(index)
+            changes.append(oplog.removed([row]))
+        if transaction_id in self._verified:
+            changes.append(oplog.verified([transaction_id], False))
+            self._verified.discard(transaction_id)
+        return self._record("delete", "Transaction deleted", memo, changes)
+
+    @rx.event
+    def undo_operation(self, operation_id: str):
+        return self._change_operation(operation_id, undone=True)
 
     @rx.event
-    def undo_delete(self, transaction_id: str):
-        """Restores a specific transaction from history."""
-        restored = None
-        for t in self.deleted_history:
-            if t["id"] == transaction_id:
-                restored = t
-                break
-        
-        if restored:
-            self.transactions.append(restored)
-            self.deleted_history = [t for t in self.deleted_history if t["id"] != transaction_id]
-            self._save_transactions()
+    def redo_operation(self, operation_id: str):
+        return self._change_operation(operation_id, undone=False)
 
     @rx.event
-    def close_undo_banner(self, transaction_id: str):
-        """Removes a transaction from the undo history."""
-        self.deleted_history = [t for t in self.deleted_history if t["id"] != transaction_id]
+    def undo_last(self):
+        operation = oplog.get_log(OPLOG_FILE).latest(undone=False)
+        if operation:
+            return self._change_operation(operation["id"], undone=True)
+
+    @rx.event
+    def redo_last(self):
+        operation = oplog.get_log(OPLOG_FILE).latest(undone=True)
+        if operation:
+            return self._change_operation(operation["id"], undone=False)
+
+    @rx.event
+    def dismiss_operation(self, operation_id: str):
+        """Hides an operation from the undo banner; it stays in the history."""
+        self.recent_operations = [
+            op for op in self.recent_operations if op["id"] != operation_id
+        ]
 
     @rx.event
     def toggle_verified(self, transaction_id: str):
         """Toggles the verified status of a transaction."""
-        if transaction_id in self.verified_transactions:
-            self.verified_transactions = [
-                vid for vid in self.verified_transactions if vid != transaction_id
-            ]
+        value = transaction_id not in self._verified
+        if value:
+            self._verified.add(transaction_id)
         else:
-            self.verified_transactions.append(transaction_id)
-        self._save_verified_transactions()
+            self._verified.discard(transaction_id)
+        index = self._ledger.index_of(transaction_id)
+        return self._record(
+            "verify",
+            "Marked verified" if value else "Verification removed",
+            self._ledger.memo_at(index) if index != -1 else "",
+            [oplog.verified([transaction_id], value)],
+        )
+
+    @rx.var
+    def selected_count(self) -> int:
+        return len(self.selected_lookup)
 
     @rx.event
-    def export_to_csv(self) -> rx.event.EventSpec:
-        """Exports current transactions to a CSV file."""
-        import csv
-        from io import StringIO
+    def toggle_selected(self, transaction_id: str):
+        if transaction_id in self.selected_lookup:
+            self.selected_lookup.pop(transaction_id)
+        else:
+            self.selected_lookup[transaction_id] = True
+
+    @rx.event
+    def select_visible(self):
+        """Adds every row matching the search and filters to the selection."""
+        self.selected_lookup = {
+            **self.selected_lookup,
+            **dict.fromkeys(map(self._view_ledger.id_at, self._view_positions), True),
+        }
+
+    @rx.event
+    def clear_selection(self):
+        self.selected_lookup = {}
+
+    def _archived_selected(self, positions: dict[str, int]) -> list[str]:
+        """The selected ids missing from ``positions`` (the live ledger's) that
+        are in archived years, which a search or date range can show."""
+        missing = [id_ for id_ in self.selected_lookup if id_ not in positions]
+        if not missing:
+            return []
+        found = []
+        for segment in self._segments:
+            try:
+                ledger = segments.load_segment(ARCHIVE_DIR, segment)
+            except (OSError, StorageError, ValueError) as e:
+                logging.error(f"Error reading archived transactions: {e}")
+                continue
+            found.extend(ledger.positions_of(missing))
+        return found
+
+    def _update_selected(self, kind: str, title: str, fields: dict):
+        """Sets ``fields`` on every selected row as one save and one operation."""
+        positions = self._ledger.positions_of(self.selected_lookup)
+        if self._archived_selected(positions) or self._closed(
+            *map(self._ledger.date_at, positions.values())
+        ):
+            return self._closed_error()
+        if not positions:
+            self.selected_lookup = {}
+            return
+        changes = []
+        for i in positions.values():
+            before = self._ledger.stored_row(i)
+            self._ledger.replace(i, {**before, **fields})
+            changes.append(oplog.updated(before, self._ledger.stored_row(i)))
+        return self._record(kind, title, count_label(len(positions), "transaction"), changes)
+
+    @rx.event
+    def set_selected_account(self, account_id: str):
+        return self._update_selected(
+            "edit",
+            "Account changed",
+            {"account_id": account_id if account_id != "cash" else None},
+        )
+
+    @rx.event
+    def apply_batch_memo(self):
+        if not self.batch_memo:
+            return
+        memo, self.batch_memo = self.batch_memo, ""
+        return self._update_selected("edit", "Memo changed", {"memo": memo})
+
+    @rx.event
+    def verify_selected(self):
+        # Verification marks may change in closed periods, archived years too.
+        positions = self._ledger.positions_of(self.selected_lookup)
+        ids = [
+            id_
+            for id_ in [*positions, *self._archived_selected(positions)]
+            if id_ not in self._verified
+        ]
+        if not ids:
+            return rx.toast.info("The selected transactions are already verified.")
+        self._verified.update(ids)
+        return self._record(
+            "verify",
+            "Marked verified",
+            count_label(len(ids), "transaction"),
+            [oplog.verified(ids, True)],
+        )
+
+    @rx.event
+    def delete_selected(self):
+        """Deletes the selected transactions as one save and one operation."""
+        positions = self._ledger.positions_of(self.selected_lookup)
+        if self._archived_selected(positions) or self._closed(
+            *map(self._ledger.date_at, positions.values())
+        ):
+            return self._closed_error()
+        self.selected_lookup = {}
+        if not positions:
+            return
+        rows = [self._ledger.stored_row(i) for i in positions.values()]
+        verified_ids = [id_ for id_ in positions if id_ in self._verified]
+        self._ledger.delete_many(positions.values())
+        self._verified.difference_update(verified_ids)
+        return self._record(
+            "delete",
+            "Transactions deleted",
+            count_label(len(rows), "transaction"),
+            [oplog.removed(rows), oplog.verified(verified_ids, False) if verified_ids else None],
+        )
 
-        output = StringIO()
-        writer = csv.writer(output)
-        writer.writerow(["ID", "Type", "Amount", "Date", "Memo"])
-        for t in self.sorted_transactions:
-            writer.writerow(
-                [t["id"], t["type"], t["amount"], t["date"], t["memo"]]
+    @rx.event
+    def close_period(self):
+        """Closes the books through ``close_through_date``, freezing its totals."""
+        try:
+            checkpoint = periods.close(
+                self._analytics, self.closed_periods, self.close_through_date
             )
-        csv_data = output.getvalue()
-        return rx.download(
-            data=csv_data, filename=f"maaser_transactions_{datetime.date.today()}.csv"
+        except ValueError as e:
+            return rx.toast.error(str(e))
+        self.closed_periods = [*self.closed_periods, checkpoint]
+        self.close_through_date = ""
+        previous = self._segments
+        through = segments.archive_through(
+            periods.closed_ordinal(self.closed_periods), datetime.date.today()
         )
+        try:
+            self._segments, archived = segments.archive(
+                ARCHIVE_DIR, self._ledger, previous, through
+            )
+        except (OSError, StorageError, ValueError) as e:
+            # The period is still closed; its years stay in the data file.
+            logging.error(f"Error archiving closed years: {e}")
+            archived = []
+        self._ledger.delete_many(archived)
+        conflict = self._save_segments(previous)
+        if conflict:
+            return conflict
+        return rx.toast.success(
+            f"Closed the books through {checkpoint['end']} "
+            f"({count_label(checkpoint['rows'], 'transaction')})."
+        )
+
+    @rx.event
+    def reopen_period(self):
+        """Reopens the latest closed period so its transactions can change."""
+        if not self.closed_periods:
+            return
+        end = self.closed_through
+        previous = self._segments
+        try:
+            kept, rows = segments.restore(
+                ARCHIVE_DIR, previous, periods.closed_ordinal(self.closed_periods[:-1])
+            )
+        except (OSError, StorageError, ValueError) as e:
+            logging.error(f"Error restoring archived years: {e}")
+            return rx.toast.error(
+                "The archived years of this period could not be read, so it stays closed."
+            )
+        self.closed_periods = self.closed_periods[:-1]
+        self._segments = kept
+        self._ledger.extend(rows)
+        conflict = self._save_segments(previous)
+        if conflict:
+            return conflict
+        return rx.toast.info(f"Reopened the period ending {end}.")
 
     @rx.event
     def reset_filters(self):
@@ -639,13 +1125,13 @@ class TransactionState(rx.State):
             return
         new_account: BankAccount = {"id": str(uuid.uuid4()), "name": name}
         self.accounts.append(new_account)
-        self._save_accounts()
+        return self._save_accounts()
 
     @rx.event
     def delete_account(self, account_id: str):
         """Deletes a bank account by its ID."""
         self.accounts = [acc for acc in self.accounts if acc["id"] != account_id]
-        self._save_accounts()
+        return self._save_accounts()
 
     @rx.event
     def toggle_sort_order(self):
@@ -0,0 +1,150 @@
+"""File-backed JSON storage shared by all backend workers.
+
+Every data file is guarded by an advisory lock on a sibling ``.lock`` file and
+carries a ``version`` stamp that is bumped on each successful save. Writers
+pass the version they loaded; if another worker saved in between, the write is
+rejected with ``StaleWriteError`` instead of silently clobbering its changes.
+"""
+
+import contextlib
+import json
+import os
+import re
+import tempfile
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows has no flock; fall back to unlocked access.
+    fcntl = None
+
+TRANSACTION_DATA_FILE = "data.json"
+BUSINESS_DATA_FILE = "business_data.json"
+TRANSACTION_OPLOG_FILE = "data_oplog.jsonl"
+BUSINESS_OPLOG_FILE = "business_data_oplog.jsonl"
+
+LOCK_TIMEOUT = 10.0
+LOCK_RETRY_DELAY = 0.02
+LOCK_MAX_RETRY_DELAY = 0.5
+VERSION_TAIL_BYTES = 64
+_TRAILING_VERSION = re.compile(rb'"version":\s*(\d+)\s*}\s*$')
+
+
+class StorageError(Exception):
+    """Base class for storage failures."""
+
+
+class LockTimeoutError(StorageError):
+    """Raised when a data file lock cannot be acquired in time."""
+
+
+class StaleWriteError(StorageError):
+    """Raised when a save is based on an outdated version of the file."""
+
+    def __init__(self, path: str, expected_version: int, current_version: int):
+        super().__init__(
+            f"{path} is at version {current_version}, "
+            f"but the write was based on version {expected_version}"
+        )
+        self.path = path
+        self.expected_version = expected_version
+        self.current_version = current_version
+
+
+@contextlib.contextmanager
+def file_lock(path: str, shared: bool = False, timeout: float = LOCK_TIMEOUT):
+    """Hold an advisory lock for ``path``, retrying with backoff until timeout."""
+    with open(f"{path}.lock", "a") as lock_file:
+        if fcntl is None:
+            yield
+            return
+        mode = (fcntl.LOCK_SH if shared else fcntl.LOCK_EX) | fcntl.LOCK_NB
+        deadline = time.monotonic() + timeout
+        delay = LOCK_RETRY_DELAY
+        while True:
+            try:
+                fcntl.flock(lock_file.fileno(), mode)
+                break
+            except BlockingIOError:
+                if time.monotonic() >= deadline:
+                    raise LockTimeoutError(f"Timed out waiting for lock on {path}")
+                time.sleep(delay)
+                delay = min(delay * 2, LOCK_MAX_RETRY_DELAY)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _read_unlocked(path: str) -> tuple[dict, int]:
+    if not os.path.exists(path):
+        return {}, 0
+    with open(path, "r") as f:
+        data = json.load(f)
+    return data, data.get("version", 0)
+
+
+def _read_version_unlocked(path: str) -> int:
+    if not os.path.exists(path):
+        return 0
+    with open(path, "rb") as f:
+        f.seek(max(os.path.getsize(path) - VERSION_TAIL_BYTES, 0))
+        match = _TRAILING_VERSION.search(f.read())
+    if match:
+        return int(match.group(1))
+    return _read_unlocked(path)[1]
+
+
+def _write_atomic(path: str, data: dict):
+    """Write to a temp file in the same directory and rename it into place."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(fd, "w") as f:
+            json.dump(data, f, indent=2)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def load_data(path: str) -> tuple[dict, int]:
+    """Returns the contents of ``path`` and its version (``({}, 0)`` if missing)."""
+    with file_lock(path, shared=True):
+        return _read_unlocked(path)
+
+
+def read_version(path: str) -> int:
+    """Returns the version of ``path`` without parsing the whole file.
+
+    Saves write the version stamp last, so it is read from the file's tail;
+    files in any other layout fall back to a full load.
+    """
+    with file_lock(path, shared=True):
+        return _read_version_unlocked(path)
+
+
+def save_data(
+    path: str,
+    data: dict,
+    expected_version: int,
+) -> int:
+    """Atomically saves ``data`` if the file is still at ``expected_version``.
+
+    Returns the new version. Raises ``StaleWriteError`` if another writer has
+    saved since ``expected_version`` was loaded.
+    """
+    with file_lock(path):
+        current_version = _read_version_unlocked(path)
+        if current_version != expected_version:
+            raise StaleWriteError(path, expected_version, current_version)
+        new_version = current_version + 1
+        # The stamp goes last, where read_version finds it.
+        body = {key: value for key, value in data.items() if key != "version"}
+        _write_atomic(path, {**body, "version": new_version})
+    return new_version
@@ -0,0 +1,37 @@
+"""Start-up work done before the first session asks for it.
+
+``warm_up`` is registered as a lifespan task. In a worker thread, so the
+server accepts connections straight away, it parses both data files into the
+ledger cache in ``app.ledger``, converts every date in them into the Hebrew
+date cache, and builds the NumPy analytics once, which loads the parts of
+NumPy that are imported on first use. The first page load then copies a
+parsed ledger and finds its dates converted.
+"""
+
+import asyncio
+import datetime
+import logging
+
+from app.analytics import LedgerAnalytics
+from app.ledger import load_ledger
+from app.states.transaction_state import get_hebrew_date_string
+from app.storage import BUSINESS_DATA_FILE, TRANSACTION_DATA_FILE
+
+LEDGER_FILES = ((TRANSACTION_DATA_FILE, "type"), (BUSINESS_DATA_FILE, "status"))
+
+
+def warm_caches():
+    """Fills the ledger, Hebrew date and NumPy caches. Blocking."""
+    for path, kind_field in LEDGER_FILES:
+        data, _ = load_ledger(path, kind_field)
+        ledger = data["transactions"]
+        for ordinal in set(ledger.date_ordinals):
+            get_hebrew_date_string(datetime.date.fromordinal(ordinal).isoformat())
+        LedgerAnalytics(ledger).monthly_cents()
+
+
+async def warm_up():
+    try:
+        await asyncio.to_thread(warm_caches)
+    except Exception as e:
+        logging.exception(f"Error warming up caches: {e}")
@@ -0,0 +1,10 @@
+"""Benchmarks for the ledger states, run outside the Reflex server.
+
+``generator`` builds seeded synthetic ledgers; ``run`` times every computed
+var and event handler against them and compares with a stored JSON baseline::
+
+    python -m benchmarks.run --sizes 1k,10k,100k --compare benchmarks/baselines/default.json
+
+``loadtest`` drives many concurrent websocket sessions against a running
+backend and reports latency percentiles, delta sizes and server memory.
+"""
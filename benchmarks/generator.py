@@ -0,0 +1,170 @@
+"""Seeded synthetic personal and business ledgers.
+
+The same ``seed`` and size always produce the same rows, so benchmark runs
+are comparable. Ledgers cover ten years ending 2024-12-31 and mimic real
+use: monthly salaries and standing donations with fixed amounts, one-off
+income and gifts with log-normal amounts, repeated memos in varying case,
+a share of cash rows without an account, and about 1% near duplicates (the
+same amount a day apart), half of which are marked verified.
+
+Run as a module to write both data files into a directory, for instance to
+serve a copy of the app under load::
+
+    python -m benchmarks.generator /tmp/loadtest --size 10k
+"""
+
+import argparse
+import datetime
+import json
+import os
+import random
+import uuid
+
+from app.storage import BUSINESS_DATA_FILE, TRANSACTION_DATA_FILE
+
+SIZES = {"1k": 1_000, "10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+DEFAULT_SEED = 5784
+FIRST_DAY = datetime.date(2015, 1, 1).toordinal()
+LAST_DAY = datetime.date(2024, 12, 31).toordinal()
+DUPLICATE_RATE = 0.01
+
+ACCOUNT_NAMES = ["Checking", "Savings", "Credit Card"]
+# (memo, type, fixed amount or None, share of rows)
+PERSONAL_PATTERNS = [
+    ("Salary", "income", 6250.00, 0.18),
+    ("Rental income", "income", 1800.00, 0.06),
+    ("Freelance", "income", None, 0.08),
+    ("Dividends", "income", None, 0.04),
+    ("Gift", "income", None, 0.04),
+    ("Yeshiva", "maaser", 360.00, 0.12),
+    ("Kollel", "maaser", 180.00, 0.12),
+    ("Shul membership", "maaser", 150.00, 0.06),
+    ("Tzedakah box", "maaser", None, 0.16),
+    ("Hachnasas kallah", "maaser", None, 0.06),
+    ("Food bank", "maaser", None, 0.08),
+]
+BUSINESS_MEMOS = [
+    "Client lunch",
+    "Taxi",
+    "Office supplies",
+    "Software subscription",
+    "Conference",
+    "Hotel",
+    "Flight",
+    "Parking",
+]
+
+
+def _id(rng: random.Random) -> str:
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def _amount_cents(rng: random.Random, median: float) -> int:
+    return max(1, round(rng.lognormvariate(0, 0.9) * median * 100))
+
+
+def _memo(rng: random.Random, memo: str) -> str:
+    """Memos are mostly typed the same way, sometimes in another case."""
+    roll = rng.random()
+    if roll < 0.05:
+        return memo.lower()
+    if roll < 0.08:
+        return f" {memo.upper()}"
+    return memo
+
+
+def _with_duplicates(rng: random.Random, rows: list[dict]) -> tuple[list[dict], list[str]]:
+    """Turns ~1% of rows into near duplicates of an earlier row; returns the
+    rows and the ids of the duplicates marked verified."""
+    verified = []
+    for i in rng.sample(range(1, len(rows)), int(len(rows) * DUPLICATE_RATE)):
+        original = rows[rng.randrange(i)]
+        ordinal = datetime.date.fromisoformat(original["date"]).toordinal()
+        rows[i] = {
+            **original,
+            "id": rows[i]["id"],
+            "date": datetime.date.fromordinal(
+                min(ordinal + rng.randint(0, 1), LAST_DAY)
+            ).isoformat(),
+        }
+        if rng.random() < 0.5:
+            verified.append(rows[i]["id"])
+    return rows, verified
+
+
+def personal_ledger(size: int, seed: int = DEFAULT_SEED) -> dict:
+    """The contents of ``data.json`` for a ledger of ``size`` transactions."""
+    rng = random.Random(seed)
+    accounts = [{"id": _id(rng), "name": name} for name in ACCOUNT_NAMES]
+    account_ids = [a["id"] for a in accounts] + [None]
+    patterns = [p[:3] for p in PERSONAL_PATTERNS]
+    weights = [p[3] for p in PERSONAL_PATTERNS]
+    rows = []
+    for _ in range(size):
+        memo, kind, fixed = rng.choices(patterns, weights)[0]
+        if fixed is None:
+            cents = _amount_cents(rng, 2500 if kind == "income" else 90)
+        else:
+            cents = round(fixed * 100)
+        rows.append(
+            {
+                "id": _id(rng),
+                "type": kind,
+                "amount_cents": cents,
+                "date": datetime.date.fromordinal(
+                    rng.randint(FIRST_DAY, LAST_DAY)
+                ).isoformat(),
+                "memo": _memo(rng, memo),
+                "account_id": rng.choice(account_ids),
+            }
+        )
+    rows, verified = _with_duplicates(rng, rows)
+    return {"transactions": rows, "accounts": accounts, "verified_transactions": verified}
+
+
+def business_ledger(size: int, seed: int = DEFAULT_SEED) -> dict:
+    """The contents of ``business_data.json`` for ``size`` expenses."""
+    rng = random.Random(seed + 1)
+    rows = []
+    for _ in range(size):
+        ordinal = rng.randint(FIRST_DAY, LAST_DAY)
+        # Older expenses have mostly been reimbursed.
+        reimbursed = rng.random() < 0.95 - 0.6 * (ordinal - FIRST_DAY) / (LAST_DAY - FIRST_DAY)
+        rows.append(
+            {
+                "id": _id(rng),
+                "amount_cents": _amount_cents(rng, 45),
+                "date": datetime.date.fromordinal(ordinal).isoformat(),
+                "memo": _memo(rng, rng.choice(BUSINESS_MEMOS)),
+                "status": "reimbursed" if reimbursed else "pending",
+                "account_id": None,
+            }
+        )
+    rows, _ = _with_duplicates(rng, rows)
+    return {"transactions": rows}
+
+
+def write_ledger_files(directory: str, size: int, seed: int = DEFAULT_SEED):
+    """Writes both generated ledgers into ``directory`` under the app's file names."""
+    for name, data in (
+        (TRANSACTION_DATA_FILE, personal_ledger(size, seed)),
+        (BUSINESS_DATA_FILE, business_ledger(size, seed)),
+    ):
+        with open(os.path.join(directory, name), "w") as f:
+            json.dump({**data, "version": 1}, f)
+
+
+def main(argv: list[str] | None = None):
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.generator", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("directory")
+    parser.add_argument("--size", choices=SIZES, default="10k")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    args = parser.parse_args(argv)
+    os.makedirs(args.directory, exist_ok=True)
+    write_ledger_files(args.directory, SIZES[args.size], args.seed)
+
+
+if __name__ == "__main__":
+    main()
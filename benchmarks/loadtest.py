@@ -0,0 +1,358 @@
+"""Drives simulated browser sessions against a running app over its websocket.
+
+Each session connects to the backend's socket.io endpoint the way a browser
+tab does, then repeatedly loads the pages, searches, filters, adds a
+transaction, toggles one verified and back, and imports pasted JSON. Events
+the server queues back (page ``on_load`` handlers, for instance) are sent on
+as the frontend would, so an action's latency covers everything up to its
+final update.
+
+Sessions run concurrently at each level of ``--clients``. Per level the
+report has p50/p95/p99 latency and delta sizes per action, throughput, and
+(with ``--server-pid``) the backend's resident memory, read from ``/proc``
+for the process and its workers. Everything stays on the local machine; the
+app is best run on a copy with generated data, since sessions add rows::
+
+    python -m benchmarks.generator /tmp/loadtest --size 10k
+    cd /tmp/loadtest  # holding a copy of the app
+    reflex run --env prod --backend-only --backend-port 8000
+    python -m benchmarks.loadtest --url http://localhost:8000 --clients 1,10,50 --server-pid <pid>
+
+Needs the asyncio socket.io client: ``pip install "python-socketio[asyncio-client]"``.
+"""
+
+import argparse
+import asyncio
+import datetime
+import functools
+import json
+import os
+import random
+import statistics
+import sys
+import time
+import uuid
+
+import socketio
+from reflex import constants
+from reflex.constants.state import FIELD_MARKER
+from reflex.state import OnLoadInternalState, State
+
+# Imported so that every state the server names in chained events is known.
+from app.states.business_expense_state import BusinessExpenseState
+from app.states.export_state import ExportState
+from app.states.transaction_state import TransactionState
+from benchmarks.generator import DEFAULT_SEED
+
+# Reflex serves socket.io at this path, under a namespace of the same name.
+EVENT_PATH = str(constants.Endpoint.EVENT)
+HYDRATE = f"{State.get_full_name()}.{constants.CompileVars.HYDRATE}"
+ON_LOAD = f"{OnLoadInternalState.get_full_name()}.on_load_internal"
+TRANSACTIONS = TransactionState.get_full_name()
+ROWS_VAR = f"transactions_with_hebrew_dates{FIELD_MARKER}"
+# Updates slower than this count as a failed action.
+TIMEOUT_S = 60.0
+CONNECT_UPDATE_TIMEOUT_S = 5.0
+# A background handler sends an update when its ``async with self`` block
+# exits and another when it returns; the app's ``on_load`` handlers have one
+# block each.
+BACKGROUND_UPDATES = 2
+
+
+def _percentile(values: list[float], q: int) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[q - 1]
+
+
+def _process_rss_bytes(pid: int) -> int:
+    """Resident memory of ``pid`` and its descendants (Linux only)."""
+    total = 0
+    try:
+        with open(f"/proc/{pid}/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1]) * 1024
+        for task in os.listdir(f"/proc/{pid}/task"):
+            with open(f"/proc/{pid}/task/{task}/children") as f:
+                total += sum(_process_rss_bytes(int(child)) for child in f.read().split())
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    return total
+
+
+@functools.cache
+def _is_background(name: str) -> bool:
+    path, _, name = name.rpartition(".")
+    # ``hydrate`` is handled by middleware rather than a registered handler.
+    handler = State.get_class_substate(path).event_handlers.get(name)
+    return handler is not None and handler.is_background
+
+
+class Session:
+    """One simulated browser tab."""
+
+    def __init__(self, url: str, results: dict[str, dict[str, list]]):
+        self.url = url
+        self.token = str(uuid.uuid4())
+        self.pathname = "/"
+        self.results = results
+        self.transaction_ids: list[str] = []
+        self.failures = 0
+        self.events = 0
+        self._updates = asyncio.Queue()
+        # Browsers take updates of any size; aiohttp closes the connection on
+        # messages over 4 MB unless told otherwise.
+        self._sio = socketio.AsyncClient(
+            reconnection=False, websocket_extra_options={"max_msg_size": 0}
+        )
+        self._sio.on("event", self._updates.put_nowait, namespace=EVENT_PATH)
+
+    async def connect(self):
+        await self._sio.connect(
+            f"{self.url}?token={self.token}",
+            transports=["websocket"],
+            namespaces=[EVENT_PATH],
+            socketio_path=EVENT_PATH,
+        )
+        # Linking the token to the connection sends one router update first.
+        try:
+            await asyncio.wait_for(self._updates.get(), CONNECT_UPDATE_TIMEOUT_S)
+        except asyncio.TimeoutError:
+            pass
+
+    async def disconnect(self):
+        await self._sio.disconnect()
+
+    def _router_data(self) -> dict:
+        return {"pathname": self.pathname, "query": {}, "asPath": self.pathname}
+
+    def _event(self, name: str, **payload) -> dict:
+        return {
+            "token": self.token,
+            "name": name,
+            "router_data": self._router_data(),
+            "payload": payload,
+        }
+
+    def _remember(self, delta: dict):
+        rows = delta.get(TRANSACTIONS, {}).get(ROWS_VAR)
+        if rows:
+            self.transaction_ids = [row["id"] for row in rows[:20]]
+
+    async def _send(self, events: list[dict]) -> int:
+        """Sends ``events`` and the backend events they chain; returns the
+        delta bytes received."""
+        delta_bytes = 0
+        pending = list(events)
+        # As in the browser, the next event goes out once the previous one's
+        # final update arrives; background handlers answer that at once and
+        # send their changes later, as updates with ``final`` unset.
+        processing = False
+        background_updates = 0
+        while pending or processing or background_updates > 0:
+            if pending and not processing:
+                event = pending.pop(0)
+                await self._sio.emit("event", event, namespace=EVENT_PATH)
+                self.events += 1
+                processing = True
+                if _is_background(event["name"]):
+                    background_updates += BACKGROUND_UPDATES
+                continue
+            update = await asyncio.wait_for(self._updates.get(), TIMEOUT_S)
+            delta = update.get("delta") or {}
+            delta_bytes += len(json.dumps(delta, separators=(",", ":")))
+            self._remember(delta)
+            # Like the browser, fill in the token and page of queued events.
+            pending.extend(
+                {
+                    **event,
+                    "token": self.token,
+                    "router_data": event.get("router_data") or self._router_data(),
+                }
+                for event in update.get("events") or []
+                if not event["name"].startswith("_")
+            )
+            if update.get("final") is None:
+                background_updates -= 1
+            elif update.get("final"):
+                processing = False
+        return delta_bytes
+
+    async def action(self, label: str, *events: dict):
+        start = time.perf_counter()
+        try:
+            delta_bytes = await self._send(list(events))
+        except (asyncio.TimeoutError, socketio.exceptions.SocketIOError):
+            self.failures += 1
+            return
+        result = self.results.setdefault(label, {"latency_ms": [], "delta_bytes": []})
+        result["latency_ms"].append((time.perf_counter() - start) * 1000)
+        result["delta_bytes"].append(delta_bytes)
+
+    async def open_page(self, pathname: str):
+        self.pathname = pathname
+        await self.action(f"load {pathname}", self._event(HYDRATE), self._event(ON_LOAD))
+
+    async def run_round(self, rng: random.Random):
+        await self.open_page("/")
+        await self.action(
+            "search",
+            self._event(f"{TRANSACTIONS}.set_search_query", value="salary"),
+        )
+        await self.action("clear search", self._event(f"{TRANSACTIONS}.set_search_query", value=""))
+        await self.action(
+            "filter",
+            self._event(f"{TRANSACTIONS}.set_filter_type", value=rng.choice(["income", "maaser"])),
+        )
+        await self.action("reset filters", self._event(f"{TRANSACTIONS}.reset_filters"))
+        await self.action(
+            "add",
+            self._event(f"{TRANSACTIONS}.open_new_transaction_modal"),
+            self._event(f"{TRANSACTIONS}.set_form_amount", value=f"{rng.uniform(1, 500):.2f}"),
+            self._event(f"{TRANSACTIONS}.set_form_memo", value="Load test"),
+            self._event(f"{TRANSACTIONS}.handle_form_submit"),
+        )
+        if self.transaction_ids:
+            toggle = self._event(
+                f"{TRANSACTIONS}.toggle_verified",
+                transaction_id=rng.choice(self.transaction_ids),
+            )
+            await self.action("toggle", toggle)
+            await self.action("toggle", toggle)
+        rows = [
+            {
+                "type": rng.choice(["income", "maaser"]),
+                "amount": round(rng.uniform(1, 500), 2),
+                "date": datetime.date(2024, rng.randint(1, 12), rng.randint(1, 28)).isoformat(),
+                "memo": f"Load test import {self.token[:8]}",
+            }
+            for _ in range(5)
+        ]
+        await self.action(
+            "import",
+            self._event(f"{TRANSACTIONS}.open_import_modal"),
+            self._event(f"{TRANSACTIONS}.set_import_json_text", value=json.dumps(rows)),
+            self._event(f"{TRANSACTIONS}.validate_and_preview_json"),
+            self._event(f"{TRANSACTIONS}.confirm_import"),
+        )
+        await self.open_page("/analytics")
+        await self.open_page("/business-expenses")
+
+
+async def _sample_rss(pid: int, samples: list[int]):
+    while True:
+        samples.append(_process_rss_bytes(pid))
+        await asyncio.sleep(0.5)
+
+
+async def run_level(url: str, clients: int, rounds: int, seed: int, pid: int | None) -> dict:
+    """Runs ``clients`` concurrent sessions for ``rounds`` rounds each."""
+    results = {}
+    sessions = [Session(url, results) for _ in range(clients)]
+    rss_samples = []
+    sampler = asyncio.create_task(_sample_rss(pid, rss_samples)) if pid else None
+    await asyncio.gather(*(session.connect() for session in sessions))
+    start = time.perf_counter()
+
+    async def run(session: Session, rng: random.Random):
+        for _ in range(rounds):
+            await session.run_round(rng)
+
+    await asyncio.gather(
+        *(run(session, random.Random(seed + i)) for i, session in enumerate(sessions))
+    )
+    elapsed = time.perf_counter() - start
+    await asyncio.gather(*(session.disconnect() for session in sessions))
+    if sampler:
+        sampler.cancel()
+    return {
+        "clients": clients,
+        "elapsed_s": round(elapsed, 2),
+        "events_per_s": round(sum(s.events for s in sessions) / elapsed, 1),
+        "failures": sum(s.failures for s in sessions),
+        "server_rss_mb": round(rss_samples[-1] / 2**20, 1) if rss_samples else None,
+        "server_peak_rss_mb": round(max(rss_samples) / 2**20, 1) if rss_samples else None,
+        "actions": {
+            label: {
+                "count": len(result["latency_ms"]),
+                "p50_ms": round(_percentile(result["latency_ms"], 50), 2),
+                "p95_ms": round(_percentile(result["latency_ms"], 95), 2),
+                "p99_ms": round(_percentile(result["latency_ms"], 99), 2),
+                "delta_median_bytes": int(statistics.median(result["delta_bytes"])),
+                "delta_max_bytes": max(result["delta_bytes"]),
+            }
+            for label, result in results.items()
+        },
+    }
+
+
+def print_level(level: dict):
+    rss = (
+        f", server RSS {level['server_rss_mb']} MB (peak {level['server_peak_rss_mb']} MB)"
+        if level["server_rss_mb"] is not None
+        else ""
+    )
+    print(
+        f"\n{level['clients']} client(s): {level['events_per_s']} events/s, "
+        f"{level['failures']} failure(s){rss}"
+    )
+    print(f"  {'action':<24}{'count':>7}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'delta B':>10}{'max B':>10}")
+    for label, action in level["actions"].items():
+        print(
+            f"  {label:<24}{action['count']:>7}{action['p50_ms']:>10.1f}{action['p95_ms']:>10.1f}"
+            f"{action['p99_ms']:>10.1f}{action['delta_median_bytes']:>10}{action['delta_max_bytes']:>10}"
+        )
+
+
+async def run_load_test(url: str, levels: list[int], rounds: int, seed: int, pid: int | None) -> dict:
+    report = {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "url": url,
+            "rounds": rounds,
+            "seed": seed,
+        },
+        "levels": [],
+    }
+    for clients in levels:
+        level = await run_level(url, clients, rounds, seed, pid)
+        print_level(level)
+        report["levels"].append(level)
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.loadtest", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--url", default="http://localhost:8000", help="Backend URL.")
+    parser.add_argument(
+        "--clients",
+        default="1,5,10,25",
+        help="Comma-separated numbers of concurrent sessions, run in turn.",
+    )
+    parser.add_argument("--rounds", type=int, default=3, help="Rounds of actions per session.")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--server-pid", type=int, help="Backend process to measure RSS of.")
+    parser.add_argument("--save", help="Write the report to this JSON file.")
+    args = parser.parse_args(argv)
+    try:
+        levels = [int(clients) for clients in args.clients.split(",")]
+    except ValueError:
+        parser.error(f"Invalid --clients: {args.clients}")
+    if args.server_pid and not os.path.exists(f"/proc/{args.server_pid}/status"):
+        parser.error(f"No process {args.server_pid} to measure (RSS is read from /proc).")
+
+    report = asyncio.run(
+        run_load_test(args.url, levels, args.rounds, args.seed, args.server_pid)
+    )
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    return 1 if any(level["failures"] for level in report["levels"]) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
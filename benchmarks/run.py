@@ -0,0 +1,229 @@
+"""Times the ledger states' computed vars and event handlers on generated data.
+
+Each state is created outside the server, loaded from generated data files
+in a temporary directory, and then:
+
+* every computed var is timed from a cold cache, as after a change to the
+  ledger, so each timing includes the vars it depends on and Reflex's
+  return type check;
+* the event handlers that load, save and edit the ledger are timed as the
+  app calls them, including the file writes.
+
+Results are medians (and minimums) in milliseconds per size. ``--save``
+writes them as a JSON baseline; ``--compare`` reports benchmarks that got
+slower than a baseline by more than ``--threshold`` and exits with status 1
+if any did::
+
+    python -m benchmarks.run --sizes 1k,10k --save benchmarks/baselines/default.json
+    python -m benchmarks.run --sizes 1k,10k --compare benchmarks/baselines/default.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+from reflex.state import State
+
+from app.states.business_expense_state import BusinessExpenseState
+from app.states.transaction_state import TransactionState
+from benchmarks.generator import DEFAULT_SEED, SIZES, write_ledger_files
+
+# Timings that differ by less than this are noise, whatever the ratio.
+NOISE_FLOOR_MS = 1.0
+
+
+def _state(state_cls):
+    root = State(_reflex_internal_init=True)
+    return root.get_substate(state_cls.get_full_name().split(".")[1:])
+
+
+def _expire_computed_vars(state):
+    """Drops every cached computed var value, as a ledger change would."""
+    for var in type(state).computed_vars.values():
+        state.__dict__.pop(var._cache_attr, None)
+
+
+def _fill_form(state, memo: str = "Benchmark"):
+    state.is_editing = False
+    state.form_amount = "123.45"
+    state.form_date = "2024-06-01"
+    state.form_memo = memo
+
+
+def _delete_one(state):
+    state.delete_transaction(state._ledger.id_at(len(state._ledger) // 2))
+
+
+def _undo_last_delete(state):
+    state.undo_last()
+
+
+def _toggle_verified(state):
+    state.toggle_verified(state._ledger.id_at(0))
+
+
+def _toggle_status(state):
+    state.toggle_status(state._ledger.id_at(0))
+
+
+# name -> (run, reset); ``reset`` runs untimed after each repetition.
+HANDLERS = {
+    TransactionState: {
+        "on_load": (lambda s: s._load_data(), None),
+        "_save_data": (lambda s: s._save_data(), None),
+        "handle_form_submit": (
+            lambda s: (_fill_form(s), s.handle_form_submit()),
+            None,
+        ),
+        "delete_transaction": (_delete_one, _undo_last_delete),
+        "toggle_verified": (_toggle_verified, None),
+    },
+    BusinessExpenseState: {
+        "on_load": (lambda s: s._load_data(), None),
+        "_save_data": (lambda s: s._save_data(), None),
+        "handle_form_submit": (
+            lambda s: (_fill_form(s), s.handle_form_submit()),
+            None,
+        ),
+        "delete_transaction": (_delete_one, _undo_last_delete),
+        "toggle_status": (_toggle_status, None),
+    },
+}
+# View settings the computed vars are timed under, as a user would have them.
+VIEW_SETTINGS = {
+    TransactionState: {"sort_by": "amount", "memo_input_value": "k"},
+    BusinessExpenseState: {"filter_status": "pending", "memo_input_value": "t"},
+}
+
+
+def _time(run, reset, state, repeat: int) -> dict[str, float]:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run(state)
+        timings.append((time.perf_counter() - start) * 1000)
+        if reset:
+            reset(state)
+    return {
+        "median_ms": round(statistics.median(timings), 3),
+        "min_ms": round(min(timings), 3),
+    }
+
+
+def bench_state(state_cls, repeat: int) -> dict[str, dict[str, float]]:
+    """Times the computed vars, then the handlers, of a freshly loaded state."""
+    state = _state(state_cls)
+    state._load_data()
+    for name, value in VIEW_SETTINGS[state_cls].items():
+        setattr(state, name, value)
+    results = {}
+    for name in sorted(state_cls.computed_vars):
+        _expire_computed_vars(state)
+        results[f"{state_cls.__name__}.{name}"] = _time(
+            lambda s: getattr(s, name), _expire_computed_vars, state, repeat
+        )
+    for name, (run, reset) in HANDLERS[state_cls].items():
+        results[f"{state_cls.__name__}.{name}"] = _time(run, reset, state, repeat)
+    return results
+
+
+def run_benchmarks(sizes: list[str], repeat: int, seed: int) -> dict:
+    results = {}
+    cwd = os.getcwd()
+    for size in sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            write_ledger_files(directory, SIZES[size], seed)
+            # The states read and write their data files relative to the
+            # working directory.
+            os.chdir(directory)
+            try:
+                results[size] = {}
+                for state_cls in HANDLERS:
+                    results[size].update(bench_state(state_cls, repeat))
+            finally:
+                os.chdir(cwd)
+        print(f"{size}: {len(results[size])} benchmarks", file=sys.stderr)
+    return {
+        "meta": {
+            "created": datetime.datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "seed": seed,
+            "repeat": repeat,
+        },
+        "results": results,
+    }
+
+
+def compare(report: dict, baseline: dict, threshold: float) -> list[str]:
+    """Benchmarks slower than the baseline by more than ``threshold`` times."""
+    regressions = []
+    for size, results in report["results"].items():
+        for name, timing in results.items():
+            before = baseline["results"].get(size, {}).get(name)
+            if before is None:
+                continue
+            now, then = timing["median_ms"], before["median_ms"]
+            if now > then * threshold and now - then > NOISE_FLOOR_MS:
+                regressions.append(
+                    f"{size:>5} {name}: {then:.2f} ms -> {now:.2f} ms ({now / then:.2f}x)"
+                )
+    return regressions
+
+
+def print_report(report: dict):
+    for size, results in report["results"].items():
+        print(f"\n{size}")
+        for name, timing in results.items():
+            print(f"  {name:<52}{timing['median_ms']:>12.2f} ms{timing['min_ms']:>12.2f} ms")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.run", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument(
+        "--sizes",
+        default="1k,10k,100k",
+        help=f"Comma-separated ledger sizes out of {', '.join(SIZES)}.",
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--save", help="Write the results to this JSON file.")
+    parser.add_argument("--compare", help="Compare with this JSON baseline.")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=1.25,
+        help="Slowdown ratio reported as a regression.",
+    )
+    args = parser.parse_args(argv)
+    sizes = args.sizes.split(",")
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"Unknown sizes: {', '.join(unknown)}")
+
+    report = run_benchmarks(sizes, args.repeat, args.seed)
+    print_report(report)
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(report, json.load(f), args.threshold)
+        print(f"\n{len(regressions)} regression(s) against {args.compare}")
+        for line in regressions:
+            print(f"  {line}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
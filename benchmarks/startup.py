@@ -0,0 +1,116 @@
+"""Reports where start-up time goes and what the warm-up saves.
+
+Each measurement runs in a fresh interpreter:
+
+* ``import app.app`` under ``python -X importtime``, broken down by
+  top-level package (self time) and by app module (cumulative and self);
+* a session's first render on generated data (loading the ledger and
+  computing every var of the dashboard state) in a cold process, and again
+  after ``app.warmup.warm_caches``, as the server does at start-up::
+
+    python -m benchmarks.startup --size 10k
+"""
+
+import argparse
+import collections
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+from benchmarks.generator import DEFAULT_SEED, SIZES, write_ledger_files
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RENDER_SCRIPT = (
+    "import json, sys\n"
+    "from benchmarks.startup import first_render\n"
+    "print(json.dumps(first_render(sys.argv[1], sys.argv[2] == 'warm')))\n"
+)
+
+
+def _run_python(args: list[str]) -> subprocess.CompletedProcess:
+    env = {**os.environ, "PYTHONPATH": ROOT, "REFLEX_TELEMETRY_ENABLED": "false"}
+    return subprocess.run(
+        [sys.executable, *args], cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+
+
+def import_times() -> list[tuple[str, int, int]]:
+    """(module, self us, cumulative us) for each module ``app.app`` imports."""
+    result = _run_python(["-X", "importtime", "-c", "import app.app"])
+    modules = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "[us]" in line:
+            continue
+        own, cumulative, name = line.removeprefix("import time:").split("|")
+        modules.append((name.strip(), int(own), int(cumulative)))
+    return modules
+
+
+def first_render(directory: str, warm: bool) -> dict[str, float]:
+    """Times a dashboard session's first render. Run in a fresh interpreter."""
+    start = time.perf_counter()
+    from benchmarks.run import _state
+    from app.states.transaction_state import TransactionState
+    from app.warmup import warm_caches
+
+    os.chdir(directory)
+    imported = time.perf_counter()
+    if warm:
+        warm_caches()
+    warmed = time.perf_counter()
+    state = _state(TransactionState)
+    state._load_data()
+    for name in TransactionState.computed_vars:
+        getattr(state, name)
+    rendered = time.perf_counter()
+    return {
+        "import_ms": round((imported - start) * 1000, 1),
+        "warm_up_ms": round((warmed - imported) * 1000, 1),
+        "first_render_ms": round((rendered - warmed) * 1000, 1),
+    }
+
+
+def print_import_report(modules: list[tuple[str, int, int]], top: int):
+    total = sum(own for _, own, _ in modules)
+    print(f"import app.app: {total / 1000:.0f} ms, {len(modules)} modules")
+    by_package = collections.Counter()
+    for name, own, _ in modules:
+        by_package[name.split(".")[0]] += own
+    print("\n  by package (self time)")
+    for package, own in by_package.most_common(top):
+        print(f"    {package:<40}{own / 1000:>10.1f} ms")
+    print("\n  app modules (cumulative, self)")
+    app_modules = [m for m in modules if m[0] == "app" or m[0].startswith("app.")]
+    for name, own, cumulative in sorted(app_modules, key=lambda m: -m[2])[:top]:
+        print(f"    {name:<40}{cumulative / 1000:>10.1f} ms{own / 1000:>10.1f} ms")
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="python -m benchmarks.startup", description=__doc__.split("\n\n")[0]
+    )
+    parser.add_argument("--size", choices=SIZES, default="10k")
+    parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+    parser.add_argument("--top", type=int, default=15, help="Rows per import table.")
+    args = parser.parse_args(argv)
+
+    print_import_report(import_times(), args.top)
+    with tempfile.TemporaryDirectory() as directory:
+        write_ledger_files(directory, SIZES[args.size], args.seed)
+        print(f"\nfirst render, {args.size} ledger")
+        for mode in ("cold", "warm"):
+            result = _run_python(["-c", RENDER_SCRIPT, directory, mode])
+            timing = json.loads(result.stdout.splitlines()[-1])
+            print(
+                f"  {mode:<6}import {timing['import_ms']:>8.1f} ms"
+                f"   warm-up {timing['warm_up_ms']:>8.1f} ms"
+                f"   first render {timing['first_render_ms']:>8.1f} ms"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())